@@ -1,4 +1,20 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError, \
+    ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+import compilation.settings as settings
+from compilation.config_codec import recode_record
+from compilation.result_spool import ResultSpool, UNCERTAIN_CID
+
+# Answers of a proxy telling that the API did not handle the request
+_NOT_HANDLED_STATUS = [502, 503]
 
 class APIManager:
 
@@ -22,23 +38,54 @@ class APIManager:
     #     ('key', 'mykeyhere'),
     # )
 
+    # Seconds to wait for the API before giving up a request
+    DEFAULT_TIMEOUT = 60
+
+    # Retries of a request when the connection fails or the API is
+    # unavailable, with an exponential backoff
+    DEFAULT_RETRIES = 3
+    DEFAULT_BACKOFF = 2
+
     def __init__(self):
         self.address = ""
         self.headers = []
         self.auth = []
         self.params = []
+        self.timeout = self.DEFAULT_TIMEOUT
+        # Whether the API accepts many results in a single request, None
+        # until the first batch is sent (see sendPostBatch)
+        self.batch_supported = None
 
         self.setAddress(self.DEFAULT_API_ADDRESS)
         self.setHeaders(self.DEFAULT_HEADERS)
         self.setAuth(self.DEFAULT_AUTH)
         self.setParams(self.DEFAULT_PARAMS)
 
+        # One persistent session, so that the connection is kept alive
+        # between the requests
+        self.session = requests.Session()
+        # POST is not retried by default. Only the failures where the API
+        # did not handle the request are retried, to avoid duplicated results:
+        # no read retry, and no 504, which may come once the result is stored.
+        retry_arguments = {
+            'total': self.DEFAULT_RETRIES,
+            'read': 0,
+            'backoff_factor': self.DEFAULT_BACKOFF,
+            'status_forcelist': [502, 503]
+        }
+        try:
+            retry = Retry(allowed_methods=None, **retry_arguments)
+        except TypeError:  # urllib3 < 1.26
+            retry = Retry(method_whitelist=None, **retry_arguments)
+        self.session.mount("http://", HTTPAdapter(max_retries=retry))
+        self.session.mount("https://", HTTPAdapter(max_retries=retry))
+
     def setAddress(self, address):
         self.address = address
 
     def setHeaders(self, headers):
         self.headers = headers
-    
+
     def setAuth(self, auth):
         self.auth = auth
 
@@ -46,7 +93,313 @@ class APIManager:
         self.params = params
 
     def sendGet(self):
-        return requests.get(self.address, headers=self.headers, auth=self.auth, params=self.params)
+        return self.session.get(self.address, headers=self.headers, auth=self.auth, params=self.params,
+                                timeout=self.timeout)
 
     def sendPost(self, json):
-        return requests.post(self.address, headers=self.headers, auth=self.auth, params=self.params, json=json)
+        return self.session.post(self.address, headers=self.headers, auth=self.auth, params=self.params, json=json,
+                                 timeout=self.timeout)
+
+    def sendPostBatch(self, json_list):
+        """Send many results in a single request. The first batch tells
+        whether the API accepts batches: if it answers anything but the list
+        of the cid, the results are to be sent one at a time from then on.
+
+        :param json_list: results to send
+        :type json_list: list
+        :return: the cid of each result, in the same order, or None if they\
+        are to be sent one at a time (the API does not accept batches, or\
+        rejected this one). The cid are ``0`` if the API did not handle the\
+        batch, ``UNCERTAIN_CID`` (see `ResultSpool <result_spool.html>`_)\
+        if it may have stored it.
+        :rtype: list
+        """
+        if self.batch_supported is False:
+            return None
+        response = self.sendPost(json_list)
+        try:
+            cids = response.json() if response.status_code == 201 else None
+        except ValueError:
+            cids = None
+        if isinstance(cids, list) and len(cids) == len(json_list):
+            self.batch_supported = True
+            return cids
+        if self.batch_supported is None:
+            self.batch_supported = False
+            # an API of single results may have stored something anyway
+            if response.status_code == 201:
+                return [UNCERTAIN_CID] * len(json_list)
+            return None
+        if 400 <= response.status_code < 500:
+            return None
+        if response.status_code in _NOT_HANDLED_STATUS:
+            return [0] * len(json_list)
+        return [UNCERTAIN_CID] * len(json_list)
+
+
+## __is_request_not_sent
+# @brief Return True if a request failed before being sent to the API.
+def __is_request_not_sent(error):
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    reason = error.args[0]
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+## send_records
+# @brief Send records to the API, by batch if there are many of them.
+# @return The list of the cid of each record, 0 when it was not accepted.
+def send_records(api_manager, records,
+                 codec_directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Send records to the API, in a single request if there are many of
+    them and the API accepts batches. If the API does not accept batches,
+    rejects the batch, or if it could not be sent, each record is sent on
+    its own. When a record may have been stored (server error, timeout,
+    unexpected answer), its cid is ``UNCERTAIN_CID`` (see `ResultSpool
+    <result_spool.html>`_): it must not be sent again automatically, to
+    avoid duplicated results. The configurations are sent in the\
+    encoding of the API (see `recode_record <config_codec.html>`_); a\
+    record whose configuration can't be decoded is not sent.
+
+    :param api_manager: API manager to send the records with
+    :type api_manager: APIManager
+    :param records: results to send
+    :type records: list
+    :param codec_directory: directory of the tables of the encoded\
+    configurations
+    :type codec_directory: str
+    :return: the cid of each record, in the same order, ``0`` when it was\
+    not accepted, ``UNCERTAIN_CID`` when it may have been stored
+    :rtype: list
+    """
+    sendable = list()
+    for index, record in enumerate(records):
+        try:
+            sendable.append((index, recode_record(
+                record, settings.CONFIG_ENCODING, codec_directory)))
+        except (OSError, ValueError):
+            pass
+    cids = [0] * len(records)
+    for (index, _), cid in zip(sendable, __send_records(
+            api_manager, [record for _, record in sendable])):
+        cids[index] = cid
+    return cids
+
+
+## __send_records
+def __send_records(api_manager, records):
+    if not len(records):
+        return list()
+    if len(records) > 1:
+        try:
+            cids = api_manager.sendPostBatch(records)
+        except requests.RequestException as error:
+            if not __is_request_not_sent(error):
+                return [UNCERTAIN_CID] * len(records)
+            cids = None
+        if cids is not None:
+            return cids
+    cids = list()
+    for record in records:
+        try:
+            response = api_manager.sendPost(record)
+        except requests.RequestException as error:
+            cids.append(0 if __is_request_not_sent(error) else UNCERTAIN_CID)
+            continue
+        cids.append(__response_cid(response))
+    return cids
+
+
+## __response_cid
+# @brief Return the cid given by the API to a single result.
+def __response_cid(response):
+    if 400 <= response.status_code < 500 \
+            or response.status_code in _NOT_HANDLED_STATUS:
+        return 0
+    try:
+        cid = response.json() if response.status_code == 201 else None
+    except ValueError:
+        cid = None
+    if isinstance(cid, int) and not isinstance(cid, bool) and cid > 0:
+        return cid
+    return UNCERTAIN_CID
+
+
+## Uploader
+# @brief Send the results to the API in background, by batch.
+# @details The results are stored in the spool, queued and sent by a
+# background thread, so that the compilation never waits for the network. The
+# results the API does not accept stay pending in the spool, and are sent again
+# later.
+class Uploader:
+    """Sends the results to the TuxML API in background, by batch.
+
+    ``submit`` stores a result in the spool (see `ResultSpool
+    <result_spool.html>`_), queues it and returns immediately a
+    `concurrent.futures.Future`_ of its cid (``0`` if the API did not
+    accept it). A background thread sends the queued results, many at
+    once when possible. The results the API did not accept stay pending
+    in the spool and are sent again by ``flush_spool``, which is called
+    periodically and when closing the uploader. The results the API may
+    have stored (e.g. timeout) are marked as uncertain in the spool and
+    never sent again automatically.
+
+    A value of a result can be the future of the cid of another result
+    (e.g. ``cid_base`` of an incremental compilation): it is replaced by
+    the cid before storing and sending the result.
+
+    :param api_manager: API manager to send the results with. Default to\
+    a new one.
+    :type api_manager: APIManager
+    :param spool_file: path to the spool (SQLite file)
+    :type spool_file: str
+    :param batch_size: maximum number of results per request
+    :type batch_size: int
+    :param flush_interval: seconds between two attempts to send the\
+    pending results of the spool
+    :type flush_interval: float
+
+    .. _concurrent.futures.Future: https://docs.python.org/3/library/concurrent.futures.html#future-objects
+    """
+    def __init__(self, api_manager=None,
+                 spool_file=settings.SPOOL_FILE,
+                 batch_size=settings.UPLOAD_BATCH_SIZE,
+                 flush_interval=settings.UPLOAD_FLUSH_INTERVAL):
+        if api_manager is None:
+            api_manager = APIManager()
+        self.__api_manager = api_manager
+        self.__spool = ResultSpool(spool_file)
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__queue = queue.Queue()
+        # ids in the spool of the queued results, not to send them twice
+        self.__queued_rids = set()
+        self.__queued_rids_lock = threading.Lock()
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__work, daemon=True)
+        self.__thread.start()
+
+    def submit(self, json_data):
+        """Store a result in the spool and queue it to be sent.
+
+        :param json_data: the result
+        :type json_data: dict
+        :return: future of the cid given by the API, ``0`` on failure
+        :rtype: `concurrent.futures.Future`_
+        """
+        assert not self.__closed, "The uploader is closed."
+        rid = None
+        # A result depending on another one is stored once resolved
+        if not any(isinstance(value, Future) for value in json_data.values()):
+            rid = self.__spool.append(json_data)
+            with self.__queued_rids_lock:
+                self.__queued_rids.add(rid)
+        future = Future()
+        self.__queue.put((json_data, rid, future))
+        return future
+
+    def close(self):
+        """Send every queued result, retry the pending ones of the spool,
+        and stop the background thread.
+
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__spool.close()
+
+    def flush_spool(self):
+        """Send again the pending results of the spool. The ones that may
+        have been stored by the API are not: only an explicit replay sends
+        them (``kernel_generator.py --replay-uncertain``).
+
+        :return: number of results still pending in the spool
+        :rtype: int
+        """
+        with self.__queued_rids_lock:
+            queued_rids = set(self.__queued_rids)
+        pending = [(rid, record) for rid, record in self.__spool.pending()
+                   if rid not in queued_rids]
+        for i in range(0, len(pending), self.__batch_size):
+            chunk = pending[i:i + self.__batch_size]
+            cids = send_records(self.__api_manager,
+                                [record for _, record in chunk])
+            for (rid, _), cid in zip(chunk, cids):
+                if cid:
+                    self.__spool.mark_sent(rid, cid)
+        return self.__spool.count_pending()
+
+    ## __work
+    # @brief Background thread: send the queued results, by batch.
+    def __work(self):
+        last_flush = 0
+        stop = False
+        while not stop:
+            if time.time() - last_flush >= self.__flush_interval:
+                self.__safe_flush_spool()
+                last_flush = time.time()
+            try:
+                item = self.__queue.get(timeout=self.__flush_interval)
+            except queue.Empty:
+                continue
+            batch = list()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.__batch_size:
+                    break
+                try:
+                    item = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+            stop = item is None
+            self.__send_batch(batch)
+        self.__safe_flush_spool()
+
+    ## __safe_flush_spool
+    # @brief Flush the spool, the background thread must never die.
+    def __safe_flush_spool(self):
+        try:
+            self.flush_spool()
+        except Exception:
+            pass
+
+    ## __send_batch
+    # @brief Send a batch of (json_data, rid, future) and resolve the futures.
+    # @details A result depending on the cid of a result of the same batch is
+    # sent after it.
+    def __send_batch(self, batch):
+        pending = list()
+        for item in batch:
+            if any(isinstance(value, Future) and not value.done()
+                   for value in item[0].values()):
+                self.__send_pending(pending)
+                pending = list()
+            pending.append(item)
+        self.__send_pending(pending)
+
+    def __send_pending(self, pending):
+        if not len(pending):
+            return
+        records, rids = list(), list()
+        for json_data, rid, _ in pending:
+            record = {
+                key: value.result() if isinstance(value, Future) else value
+                for key, value in json_data.items()}
+            if rid is None:
+                rid = self.__spool.append(record)
+            records.append(record)
+            rids.append(rid)
+        cids = send_records(self.__api_manager, records)
+        for (_, _, future), rid, cid in zip(pending, rids, cids):
+            if cid:
+                self.__spool.mark_sent(rid, cid)
+            with self.__queued_rids_lock:
+                self.__queued_rids.discard(rid)
+            # 0 for the dependent results when the cid is not known
+            future.set_result(max(cid, 0))
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+
+"""Benchmark of the TuxML pipeline
+
+A fixed set of configurations is built through `Compiler.run
+<compiler.html>`_: ``tinyconfig`` with each preset of the compilation
+directory (``*.config``, given to ``KCONFIG_ALLCONFIG``), and the
+configuration files given with ``--config``. The time spent in each phase
+is written as JSON, so that the overhead of TuxML apart from the kernel
+compilation itself can be followed from one version to the other:
+
+* ``config_generation``, ``make``, ``autofix`` and ``compressed_sizes``,
+  as measured by the compiler;
+* ``size_report`` (with ``--check_size``) and ``boot`` (with ``--boot``);
+* ``upload``: the preparation of the result sent to the API, i.e. the
+  retention and compression of the logs and the JSON encoding. Nothing is
+  sent, so that the database is not filled with benchmark builds.
+
+The kernel tree is cleaned before each build, so that every ``make`` is a
+full one. In the container::
+
+    /TuxML/compilation/benchmark.py --repeat 3 --output /TuxML/benchmark.json
+
+:version: 1
+"""
+# @file benchmark.py
+
+import argparse
+import base64
+import glob
+import json
+import os
+import statistics
+import time
+
+import compilation.settings as settings
+from compilation.boot_checker import BootChecker
+from compilation.compiler import Compiler
+from compilation.configuration import create_configuration
+from compilation.environment import get_environment_details
+from compilation.log_retention import get_retained_logs
+from compilation.main import create_logger, reset_kernel_tree, retrieve_sizes
+from compilation.package_manager import PackageManager
+
+## BENCHMARK_PHASES
+# @brief Names of the timed phases, in order.
+BENCHMARK_PHASES = ["config_generation", "make", "autofix",
+                    "compressed_sizes", "size_report", "boot", "upload"]
+
+
+## parser
+# @brief Parse the commandline and return the parsed argument.
+def parser():
+    parser = argparse.ArgumentParser(
+        description="Build a fixed set of configurations and write the time "
+                    "spent in each phase of TuxML as JSON."
+    )
+    parser.add_argument(
+        "--presets",
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "*.config"))),
+        help="Optional. Presets built with tinyconfig. Default to the "
+             "*.config files of the compilation directory."
+    )
+    parser.add_argument(
+        "--config",
+        nargs="*",
+        default=list(),
+        help="Optional. Configuration files (.config) to build too."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Optional. Number of builds of each configuration. Default to 1."
+    )
+    parser.add_argument(
+        "--cpu_cores",
+        type=int,
+        default=0,
+        help="Optional. Number of cpu cores to use. Default to 0, which mean "
+             "all the cores."
+    )
+    parser.add_argument(
+        "--boot",
+        action="store_true",
+        help="Optional. Time the boot of the compiled kernels."
+    )
+    parser.add_argument(
+        "--check_size",
+        action="store_true",
+        help="Optional. Time the additional size measurements."
+    )
+    parser.add_argument(
+        "--output",
+        default=settings.BENCHMARK_FILE,
+        help="Optional. JSON file to write the timings in. Default to "
+             "{}.".format(settings.BENCHMARK_FILE)
+    )
+    parser.add_argument(
+        "-s", "--silent",
+        action="store_true",
+        help="Prevent printing on standard output when compiling."
+    )
+    return parser.parse_args()
+
+
+## get_benchmark_cases
+# @brief Return the configurations to build: tinyconfig with each preset, then
+# the given configuration files.
+def get_benchmark_cases(presets, configs):
+    """Gives the configurations built by the benchmark.
+
+    :param presets: paths to the presets built with ``tinyconfig``
+    :type presets: list
+    :param configs: paths to configuration files (``.config``)
+    :type configs: list
+    :return: ``{'name': str, 'tiny': bool, 'preset': path or None,\
+    'config': path or None}`` for each configuration
+    :rtype: list
+    """
+    cases = list()
+    for preset in presets:
+        cases.append({'name': "tinyconfig+{}".format(os.path.basename(preset)),
+                      'tiny': True, 'preset': preset, 'config': None})
+    for config in configs:
+        cases.append({'name': os.path.basename(config), 'tiny': False,
+                      'preset': None, 'config': config})
+    return cases
+
+
+## __time_upload
+# @brief Return the time spent preparing the result sent to the API.
+def __time_upload(logger, compilation_result, success):
+    start_timer = time.time()
+    json_data = {
+        name: value for name, value in compilation_result.items()
+        if not isinstance(value, bytes)
+    }
+    logs = get_retained_logs(logger, success, settings.LOG_RETENTION,
+                             settings.LOG_RETENTION_TAIL_LINES,
+                             settings.UPLOAD_COMPRESSED_LOGS)
+    for name, log in logs.items():
+        if settings.UPLOAD_COMPRESSED_LOGS:
+            log = base64.b64encode(log).decode()
+        json_data[name] = log
+    json.dumps(json_data)
+    return time.time() - start_timer
+
+
+## run_benchmark_case
+# @brief Build a configuration and return the time spent in each phase.
+def run_benchmark_case(case, logger, configuration, package_manager,
+                       boot=False, check_size=False):
+    """Build a configuration from a clean kernel tree and time each phase.
+
+    :param case: the configuration (See :py:func:`get_benchmark_cases`)
+    :type case: dict
+    :param logger: the logger
+    :type logger: `Logger <logger.html>`_
+    :param configuration: configuration info (See\
+    `create_configuration <configuration.html>`_)
+    :type configuration: dict
+    :param package_manager: package manager
+    :type package_manager: `PackageManager <package_manager.html>`_
+    :param boot: time the boot of the kernel
+    :type boot: bool
+    :param check_size: time the additional size measurements
+    :type check_size: bool
+    :return: ``{'name', 'success', 'phases', 'total', 'overhead'}``:\
+    the time of each phase of :py:data:`BENCHMARK_PHASES` (None if it did\
+    not run), their sum, and the time not spent in ``make`` nor\
+    ``autofix``
+    :rtype: dict
+    """
+    reset_kernel_tree(logger, configuration['kernel_path'])
+    logger.timed_print_output("Benchmark of {}.".format(case['name']))
+    compiler = Compiler(
+        logger=logger,
+        package_manager=package_manager,
+        nb_core=configuration['core_used'],
+        kernel_path=configuration['kernel_path'],
+        kernel_version=configuration['kernel_version_compilation'],
+        tiny=case['tiny'],
+        config_file=case['config'],
+        preset_file=case['preset']
+    )
+    compiler.run()
+    success = compiler.is_successful()
+
+    phases = dict.fromkeys(BENCHMARK_PHASES)
+    phases.update(compiler.get_phase_times())
+    if success and check_size:
+        start_timer = time.time()
+        retrieve_sizes(configuration['kernel_path'],
+                       configuration['kernel_version_compilation'])
+        phases['size_report'] = time.time() - start_timer
+    if success and boot:
+        start_timer = time.time()
+        BootChecker(logger, configuration['kernel_path']).run()
+        phases['boot'] = time.time() - start_timer
+    phases['upload'] = __time_upload(
+        logger, compiler.get_compilation_dictionary(), success)
+
+    total = sum(phase for phase in phases.values() if phase is not None)
+    return {'name': case['name'], 'success': success, 'phases': phases,
+            'total': total,
+            'overhead': total - phases['make'] - phases['autofix']}
+
+
+## summarize_benchmark
+# @brief Return the mean time of each phase, for each configuration.
+def summarize_benchmark(results):
+    """Gives the mean time of each phase over the successful builds of each
+    configuration.
+
+    :param results: results of :py:func:`run_benchmark_case`
+    :type results: list
+    :return: ``{name: {phase: mean time}}``, a phase being None if it\
+    never ran
+    :rtype: dict
+    """
+    summary = dict()
+    for name in dict.fromkeys(result['name'] for result in results):
+        runs = [result for result in results
+                if result['name'] == name and result['success']]
+        summary[name] = dict()
+        for phase in BENCHMARK_PHASES + ["total", "overhead"]:
+            times = [run['phases'].get(phase, run.get(phase)) for run in runs]
+            times = [value for value in times if value is not None]
+            summary[name][phase] = statistics.mean(times) if times else None
+    return summary
+
+
+if __name__ == "__main__":
+    args = parser()
+    logger = create_logger(args.silent)
+    package_manager = PackageManager(logger, settings.DEPENDENCIES_FILE)
+    package_manager.update_system()
+    configuration = create_configuration(args.cpu_cores)
+
+    results = list()
+    for case in get_benchmark_cases(args.presets, args.config):
+        for _ in range(args.repeat):
+            results.append(run_benchmark_case(
+                case, logger, configuration, package_manager, args.boot,
+                args.check_size))
+
+    benchmark = {
+        'date': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        'tuxml_version': settings.TUXML_VERSION,
+        'kernel_version': configuration['kernel_version_compilation'],
+        'core_used': configuration['core_used'],
+        'hardware': get_environment_details()['hardware'],
+        'results': results,
+        'summary': summarize_benchmark(results)
+    }
+    with open(args.output, "w") as json_file:
+        json.dump(benchmark, json_file, indent=4)
+    logger.timed_print_output(
+        "Benchmark written in {}.".format(args.output))
@@ -1,12 +1,19 @@
 # @file boot_checker.py
 
 import bz2
+import os
 import subprocess
-from time import time, sleep
+from threading import Event, Thread
 
 from compilation.logger import COLOR_ERROR, COLOR_SUCCESS
 from compilation.settings import BOOTING_KERNEL_PATH, INITRAMFS_PATH, \
-    MAX_TIME_BOOT
+    MAX_TIME_BOOT, BOOT_MEMORY, BOOT_CPUS
+
+
+## kvm_available
+# @brief Return True if QEMU can use KVM, i.e. /dev/kvm exists and is usable.
+def kvm_available():
+    return os.access("/dev/kvm", os.R_OK | os.W_OK)
 
 
 ## BootChecker
@@ -14,29 +21,50 @@ from compilation.settings import BOOTING_KERNEL_PATH, INITRAMFS_PATH, \
 # @author ROYON CHALENDARD Julien
 # @author HAMON Cyril
 # @author SAFFRAY Paul
+# @details By default, the boot messages are written in the boot file of the
+# logger. Give boot_file to write them elsewhere, e.g. when booting many
+# kernels at the same time (see boot_farm.py), and executable_path to boot
+# another image than the bzImage of kernel_path.
 class BootChecker:
-    def __init__(self, logger, kernel_path):
+    def __init__(self, logger, kernel_path, boot_file=None,
+                 executable_path=None):
         self.__logger = logger
         self.__executable_path = BOOTING_KERNEL_PATH.format(kernel_path)
+        if executable_path is not None:
+            self.__executable_path = executable_path
+        self.__boot_file = boot_file
 
         # Variables results
         self.__boot_success = False
         self.__boot_time = 0
         self.__result_dictionary = {}
 
+        # Output of QEMU, and boot time (-1 on kernel panic) once known
+        self.__output = bytearray()
+        self.__result = None
+        self.__finished = Event()
+
     def run(self):
-        self.__logger.reset_boot_pipe()
+        if self.__boot_file is None:
+            self.__logger.reset_boot_pipe()
+            boot_pipe = self.__logger.get_boot_pipe()
+        else:
+            boot_pipe = open(self.__boot_file, 'w')
         self.__logger.timed_print_output("Checking if the kernel can boot.")
 
         boot_process = self.__bootprocess_create()
-
-        timer_begin = time()
-        while (time() - timer_begin) < MAX_TIME_BOOT:
-            if self.__have_finished():
-                break
-            sleep(1)
+        # The serial output is read as it arrives: the end of the boot is known
+        # as soon as its line is printed
+        reader = Thread(target=self.__read_output,
+                        args=(boot_process, boot_pipe), daemon=True)
+        reader.start()
+        self.__finished.wait(MAX_TIME_BOOT)
 
         boot_process.kill()
+        boot_process.wait()
+        reader.join()
+        if self.__boot_file is not None:
+            boot_pipe.close()
         self.__boot_time = self.__get_result()
         if self.__boot_time == -2:
             self.__logger.timed_print_output(
@@ -58,35 +86,55 @@ class BootChecker:
         self.__set_result_dictionary()
 
     def __bootprocess_create(self):
+        args = ["qemu-system-x86_64",
+                "-kernel", self.__executable_path,
+                "-initrd", INITRAMFS_PATH,
+                "-nographic",
+                "-append", "console=ttyS0",
+                "-m", BOOT_MEMORY,
+                "-smp", str(BOOT_CPUS)]
+        # Hardware acceleration if possible, emulation (TCG) otherwise
+        if kvm_available():
+            args.append("-enable-kvm")
         return subprocess.Popen(
-            args="qemu-system-x86_64 -kernel {} -initrd {} -nographic "
-                 "-append \"console=ttyS0\"".format(
-                    self.__executable_path,
-                    INITRAMFS_PATH),
-            shell=True,
-            stdout=self.__logger.get_boot_pipe(),
+            args=args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT
         )
 
-    def __have_finished(self):
-        with open(self.__logger.get_boot_file(), 'r') as output:
-            content = output.read()
-            return "Boot took" in content or "Kernel panic" in content
+    ## __read_output
+    # @brief Log the output of QEMU line by line, and look for the end of the
+    # boot in each of them.
+    def __read_output(self, boot_process, boot_pipe):
+        for raw_line in iter(boot_process.stdout.readline, b""):
+            self.__output.extend(raw_line)
+            line = raw_line.decode(errors="replace")
+            boot_pipe.write(line)
+            boot_pipe.flush()
+            if self.__result is not None:
+                continue
+            if "Boot took" in line:
+                try:
+                    self.__result = float(line.split("Boot took")[1].split()[0])
+                except (IndexError, ValueError):
+                    self.__result = -1
+                self.__finished.set()
+            elif "Kernel panic" in line:
+                self.__result = -1
+                self.__finished.set()
+        boot_process.stdout.close()
+        self.__finished.set()
 
     def __get_result(self):
-        with open(self.__logger.get_boot_file(), 'r') as output:
-            for line in output.read().splitlines():
-                if "Boot took" in line:
-                    return float(line.split(' ')[2])
-                if "Kernel panic" in line:
-                    return -1
+        if self.__result is None:
             return -2
+        return self.__result
 
     def __set_result_dictionary(self):
         self.__result_dictionary = {
             "boot_time": self.__boot_time,
-            "boot_log_file": bz2.compress(
-                open(self.__logger.get_boot_file(), "rb").read())
+            "boot_log_file": bz2.compress(bytes(self.__output))
         }
 
     ## is_successful
@@ -0,0 +1,82 @@
+"""Concurrent boot tests of the compiled kernels
+
+The kernels to boot are queued and booted by a pool of threads, each one
+running its own QEMU virtual machine (see `BootChecker
+<boot_checker.html>`_). The compilation of the next kernel does not wait
+for the boot of the previous one anymore.
+
+:version: 1
+"""
+# @file boot_farm.py
+
+import itertools
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import compilation.settings as settings
+from compilation.boot_checker import BootChecker
+
+
+## BootFarm
+# @brief Boot many kernels at the same time, in background.
+# @details The bzImage is copied when the boot is submitted, so that the kernel
+# tree can be used by the next compilation right away.
+class BootFarm:
+    """Boots many kernels at the same time, in background.
+
+    ``submit`` copies the ``bzImage`` of a compiled kernel and returns a
+    `concurrent.futures.Future`_ of its boot dictionary (see
+    :py:meth:`BootChecker.get_boot_dictionary`). The boot messages of each
+    kernel are written in their own file of ``settings.LOG_DIRECTORY``.
+
+    :param logger: the logger
+    :type logger: `Logger <logger.html>`_
+    :param max_boots: maximum number of kernels booted at the same time
+    :type max_boots: int
+
+    .. _concurrent.futures.Future: https://docs.python.org/3/library/concurrent.futures.html#future-objects
+    """
+    def __init__(self, logger, max_boots=settings.MAX_CONCURRENT_BOOTS):
+        self.__logger = logger
+        self.__executor = ThreadPoolExecutor(max_workers=max(1, max_boots))
+        self.__directory = tempfile.mkdtemp(prefix="boot_farm_")
+        self.__counter = itertools.count()
+
+    def submit(self, kernel_path):
+        """Queue the boot of a compiled kernel.
+
+        :param kernel_path: path to the compiled Linux kernel
+        :type kernel_path: str
+        :return: future of the boot dictionary
+        :rtype: `concurrent.futures.Future`_
+        """
+        number = next(self.__counter)
+        image = os.path.join(self.__directory, "bzImage_{}".format(number))
+        shutil.copyfile(settings.BOOTING_KERNEL_PATH.format(kernel_path),
+                        image)
+        boot_file = os.path.join(settings.LOG_DIRECTORY,
+                                 "boot_{}.log".format(number))
+        return self.__executor.submit(self.__boot, kernel_path, image,
+                                      boot_file)
+
+    def close(self):
+        """Wait for the queued boots to end, and remove the copied
+        kernels.
+
+        """
+        self.__executor.shutdown(wait=True)
+        shutil.rmtree(self.__directory, ignore_errors=True)
+
+    ## __boot
+    # @brief Boot a copied kernel and remove it.
+    def __boot(self, kernel_path, image, boot_file):
+        try:
+            boot_checker = BootChecker(self.__logger, kernel_path,
+                                       boot_file=boot_file,
+                                       executable_path=image)
+            boot_checker.run()
+            return boot_checker.get_boot_dictionary()
+        finally:
+            os.remove(image)
@@ -12,10 +12,24 @@ import shutil
 import time
 import os
 import bz2
+import tempfile
 import threading
 
 from compilation.logger import *
 import compilation.settings as settings
+from compilation.compressed_size import get_compressed_sizes
+from compilation.config_generator import get_config_generator, new_seed
+from compilation.size_schema import compressed_sizes_record, \
+    format_compressed_sizes
+
+# Lines of the compilation error output telling that a file or a command is
+# missing:
+# - "file.c:48:19: fatal error: <file.h>: No such file or directory"
+# - "make[4]: <command>: Command not found"
+# - "/bin/sh: 1: <command>: not found"
+# - "./scripts/gcc-plugin.sh: 11: ./scripts/gcc-plugin.sh: <package>: not found"
+_MISSING_DEPENDENCY_PATTERN = re.compile(
+    r"(?P<file>fatal error)|(?P<command>Command not found)|(?P<sh>not found)")
 
 
 ## Compiler
@@ -49,10 +63,26 @@ class Compiler:
     :type config_file: str
     :param compiler_exec: compiler to use
     :type compiler_exec: str
+    :param ccache: compile through ccache, using\
+    ``settings.CCACHE_DIRECTORY`` as cache
+    :type ccache: bool
+    :param preset_file: path to the preset values of the generated\
+    configuration (``KCONFIG_ALLCONFIG``). Default to None, which means\
+    ``settings.CONFIG_PRESET_FILE``.
+    :type preset_file: str
+    :param output_path: directory of the built files (``make O=``), so\
+    that many builds can share the kernel directory, which is left\
+    untouched. Default to None, which means building in the kernel\
+    directory.
+    :type output_path: str
+    :param seed: seed of the random configuration (``KCONFIG_SEED``), to\
+    generate it again. Default to None, which means a new one.
+    :type seed: int
     """    
     def __init__(self, logger, package_manager, nb_core, kernel_path,
                  kernel_version, tiny=False, config_file=None,
-                 compiler_exec='gcc', arch='x86_64'):
+                 compiler_exec='gcc', arch='x86_64', ccache=False,
+                 preset_file=None, output_path=None, seed=None):
         """Constructor method
 
         """
@@ -70,23 +100,41 @@ class Compiler:
         self.__config_file = config_file
         self.__compiler_exec = compiler_exec
         self.__arch = arch
+        self.__ccache = ccache
+        self.__preset_file = preset_file
+        if preset_file is None:
+            self.__preset_file = settings.CONFIG_PRESET_FILE
+        # .config, vmlinux and the other built files are in output_path
+        self.__output_path = kernel_path
+        self.__make_output = ""
+        if output_path is not None:
+            self.__output_path = output_path
+            self.__make_output = "O={}".format(output_path)
 
         # Variables results
         self.__compilation_success = False
         self.__compilation_time = 0
         self.__kernel_size = -1
-        self.__kernel_compressed_size = ""
+        self.__kernel_compressed_size = compressed_sizes_record()
+        # "estimated" from the only build or "measured" by rebuilding, None
+        # if the sizes were not computed
+        self.__compressed_sizes_method = None
+        self.__cache_hit_rate = -1
+        # ccache statistics of this build only (CCACHE_STATSLOG), the
+        # counters of the shared cache include the concurrent builds
+        self.__ccache_stats_log = None
+        # How the configuration was generated, and the seed of a random one
+        self.__config_generator = "make"
+        self.__seed = seed
+        self.__config_seed = None
         self.__result_dictionary = {}
+        # Time spent in each phase of run, see get_phase_times
+        self.__phase_times = dict.fromkeys(
+            ["config_generation", "make", "autofix", "compressed_sizes"], 0)
 
-        # Presetting of __kernel_compressed_size
-        for compression in settings.KERNEL_COMPRESSION_TYPE:
-            for typ in ["-bzImage", "-vmlinux", ""]:
-                self.__kernel_compressed_size = "{}{}{} : -1 , ".format(
-                    self.__kernel_compressed_size,
-                    compression,
-                    typ
-                )
-        self.__kernel_compressed_size = self.__kernel_compressed_size[:-3]
+        # Missing files/packages found while compiling
+        self.__missing_files = list()
+        self.__missing_packages = list()
 
     ## run
     # @author PICARD Michaël
@@ -98,16 +146,23 @@ class Compiler:
         about the process.
 
         """
-        if self.__linux_config_generator(self.__tiny, self.__config_file, self.__arch) == -1:
+        start_timer = time.time()
+        os.makedirs(self.__output_path, exist_ok=True)
+        config_generated = self.__linux_config_generator(
+            self.__tiny, self.__config_file, self.__arch) != -1
+        self.__phase_times['config_generation'] = time.time() - start_timer
+        if not config_generated:
             self.__compilation_success = False
             self.__set_result_dictionary()
             return -1 # no config file generated
         self.__do_a_compilation()
 
         if self.__compilation_success:
+            start_timer = time.time()
             self.__kernel_size = self.__retrieve_kernel_size(
-                "{}/vmlinux".format(self.__kernel_path))
+                "{}/vmlinux".format(self.__output_path))
             self.__get_compressed_kernel_size()
+            self.__phase_times['compressed_sizes'] = time.time() - start_timer
 
         self.__set_result_dictionary()
 
@@ -128,6 +183,15 @@ class Compiler:
         self.__logger.reset_stderr_pipe()
         self.__compilation_success = True
 
+        if self.__ccache:
+            start_installation_timer = time.time()
+            self.__ccache = self.__prepare_ccache()
+            install_time_cpt += time.time() - start_installation_timer
+        if self.__ccache:
+            stats_file, self.__ccache_stats_log = tempfile.mkstemp(
+                prefix="ccache_stats_")
+            os.close(stats_file)
+
         while self.__compilation_success and not self.__compile(start_compilation_timer):
             start_installation_timer = time.time()
 
@@ -151,6 +215,20 @@ class Compiler:
         end_compilation_timer = time.time()
         self.__compilation_time = \
             end_compilation_timer - start_compilation_timer - install_time_cpt
+        # The update of the system made before this compilation (if any) is
+        # installation time too
+        install_time_cpt += self.__package_manager.pop_update_time()
+        self.__phase_times['make'] = self.__compilation_time
+        self.__phase_times['autofix'] = install_time_cpt
+
+        if self.__ccache:
+            hits, misses = self.__get_ccache_statistics()
+            os.remove(self.__ccache_stats_log)
+            self.__ccache_stats_log = None
+            if hits + misses > 0:
+                self.__cache_hit_rate = hits / (hits + misses)
+            self.__logger.timed_print_output(
+                "ccache hit rate: {}".format(self.__cache_hit_rate))
 
         # Logging compilation result
         if self.is_successful():
@@ -196,22 +274,23 @@ class Compiler:
         if specific_config is not None:
             self.__logger.timed_print_output("Using specific KCONFIG file.")
             shutil.copyfile(
-                specific_config, "{}/.config".format(self.__kernel_path))
+                specific_config, "{}/.config".format(self.__output_path))
         elif tiny:
             self.__logger.timed_print_output(
                 "Tiny config with preset values:")
-            with open(settings.CONFIG_PRESET_FILE, 'r') as preset_list:
+            with open(self.__preset_file, 'r') as preset_list:
                 self.__logger.print_output(preset_list.read())
 
             try:
                 subprocess.run(
-                args="KCONFIG_ALLCONFIG={} ARCH={} make CC={} HOSTCC={} -C {} tinyconfig -j{}"
+                args="KCONFIG_ALLCONFIG={} ARCH={} make CC={} HOSTCC={} -C {} {} tinyconfig -j{}"
                     .format(
-                    settings.CONFIG_PRESET_FILE,
+                    self.__preset_file,
                     arch,
                     self.__compiler_exec,
                     self.__compiler_exec,
                     self.__kernel_path,
+                    self.__make_output,
                     self.__nb_core
                 ),
                 shell=True,
@@ -226,18 +305,39 @@ class Compiler:
         else:
             self.__logger.print_output(
                 "Random config based on the following preset values:")
-            with open(settings.CONFIG_PRESET_FILE, 'r') as preset_list:
+            with open(self.__preset_file, 'r') as preset_list:
                 self.__logger.print_output(preset_list.read())
 
+            # The seed is always chosen here, so that it is known
+            self.__config_seed = self.__seed
+            if self.__config_seed is None:
+                self.__config_seed = new_seed()
+            # The Kconfig files are parsed once for all the compilations
+            generator = None
+            if settings.KCONFIGLIB_RANDCONFIG:
+                generator = get_config_generator(
+                    self.__kernel_path, arch, self.__compiler_exec,
+                    self.__kernel_version)
+            if generator is not None:
+                generator.generate("{}/.config".format(self.__output_path),
+                                   self.__preset_file, self.__config_seed)
+                self.__config_generator = "kconfiglib"
+                self.__logger.timed_print_output(
+                    "Random config generated with kconfiglib, seed {}.".format(
+                        self.__config_seed))
+                return
+
             try:
                 subprocess.run(
-                args="KCONFIG_ALLCONFIG={} ARCH={} make CC={} HOSTCC={} -C {} randconfig -j{}"
+                args="KCONFIG_SEED={} KCONFIG_ALLCONFIG={} ARCH={} make CC={} HOSTCC={} -C {} {} randconfig -j{}"
                     .format(
-                    settings.CONFIG_PRESET_FILE,
+                    self.__config_seed,
+                    self.__preset_file,
                     arch,
                     self.__compiler_exec,
                     self.__compiler_exec,
                     self.__kernel_path,
+                    self.__make_output,
                     self.__nb_core
                 ),
                 shell=True,
@@ -253,18 +353,26 @@ class Compiler:
 
     ## __log_output
     # @author AMIARD Anthony
-    # @version 1
+    # @version 2
     # @brief Print logs in a file with the time
     # Print the logs from pipe_to_read in the log file pipe_to_write prefixed
     # with the time at which the compilation started (start_compilation_timer)
+    # The written lines are compressed on the fly by calling compress
+    # regularly.
     def __log_output(self,
                      pipe_to_read,
                      pipe_to_write,
-                     start_compilation_timer):
-        for line in iter(pipe_to_read.readline, ""):
+                     start_compilation_timer,
+                     compress=None):
+        for number, line in enumerate(iter(pipe_to_read.readline, ""), 1):
             now = time.time() - start_compilation_timer
             now_f = time.strftime("[%H:%M:%S] ", time.gmtime(now))
             print(now_f + line, end="", file=pipe_to_write, flush=True)
+            if compress is not None \
+                    and not number % settings.LOG_COMPRESSION_LINES:
+                compress()
+        if compress is not None:
+            compress()
 
     ## __compile
     # @author LEBRETON Mickaël, PICARD Michaël, AMIARD Anthony
@@ -293,28 +401,36 @@ class Compiler:
         :rtype: bool
         """
         self.__logger.timed_print_output("Compilation in progress")
+        compiler_exec = self.__compiler_exec
+        if self.__ccache:
+            compiler_exec = "ccache {}".format(self.__compiler_exec)
         popen = subprocess.Popen(
             [
                 "make",
-                "CC={}".format(self.__compiler_exec),
+                "CC={}".format(compiler_exec),
                 "HOSTCC={}".format(self.__compiler_exec),
                 "-C",
                 self.__kernel_path,
                 "-j{}".format(self.__nb_core)
-            ],
+            ] + self.__make_output.split(),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            env=self.__get_ccache_environment()
         )
-        # Logging of stdout is made in another thread while logging of stderr is
-        # made in this thread
+        # Logging of stdout is made in another thread while logging and
+        # analysis of stderr is made in this thread
         tout = threading.Thread(target=self.__log_output,
                                 args=(popen.stdout,
                                       self.__logger.get_stdout_pipe(), 
-                                      start_compilation_timer))
+                                      start_compilation_timer,
+                                      self.__logger.compress_stdout))
         tout.deamon = True
         tout.start()
-        for line in iter(popen.stderr.readline, ""):
+        self.__missing_files = list()
+        self.__missing_packages = list()
+        aborted = False
+        for number, line in enumerate(iter(popen.stderr.readline, ""), 1):
             now = time.time() - start_compilation_timer
             now_f = time.strftime("[%H:%M:%S] ", time.gmtime(now))
             print(
@@ -323,6 +439,16 @@ class Compiler:
                 file=self.__logger.get_stderr_pipe(),
                 flush=True
             )
+            if not number % settings.LOG_COMPRESSION_LINES:
+                self.__logger.compress_stderr()
+            if self.__analyse_line(line) and not aborted \
+                    and settings.ABORT_COMPILATION_ON_MISSING_DEPENDENCY:
+                # The build will fail: no need to wait for the other jobs
+                self.__logger.timed_print_output(
+                    "Missing file/package found, stopping the compilation.",
+                    color=COLOR_ERROR)
+                popen.terminate()
+                aborted = True
         failure = popen.wait()
         popen.stdout.close()
         popen.stderr.close()
@@ -338,37 +464,137 @@ class Compiler:
                 color=COLOR_ERROR)
             return False
 
+    ## __prepare_ccache
+    # @version 1
+    # @brief Check that ccache can be used, installing it if needed.
+    # @return True if ccache can be used.
+    def __prepare_ccache(self):
+        """Check that ccache and its cache directory are available. Install
+        ccache with the package manager if needed.
+
+        :return: either ccache can be used or not
+        :rtype: bool
+        """
+        if not os.path.isdir(settings.CCACHE_DIRECTORY):
+            self.__logger.timed_print_output(
+                "No cache directory {}, compiling without ccache.".format(
+                    settings.CCACHE_DIRECTORY),
+                color=COLOR_ERROR)
+            return False
+        if shutil.which("ccache") is None \
+                and not self.__package_manager.install_package(["ccache"]):
+            self.__logger.timed_print_output(
+                "Unable to install ccache, compiling without it.",
+                color=COLOR_ERROR)
+            return False
+        return True
+
+    ## __get_ccache_environment
+    # @version 1
+    # @brief Return the environment of make, pointing ccache to the shared
+    # cache.
+    def __get_ccache_environment(self):
+        """Gives the environment to run make with. When ccache is used, it
+        points ccache to the shared cache directory, and to the statistics
+        log of the build.
+
+        :return: environment variables, or None to inherit the current\
+        environment
+        :rtype: dict
+        """
+        if not self.__ccache:
+            return None
+        environment = dict(os.environ)
+        environment["CCACHE_DIR"] = settings.CCACHE_DIRECTORY
+        environment["CCACHE_MAXSIZE"] = settings.CCACHE_MAX_SIZE
+        if self.__ccache_stats_log is not None:
+            environment["CCACHE_STATSLOG"] = self.__ccache_stats_log
+        return environment
+
+    ## __get_ccache_statistics
+    # @version 2
+    # @brief Return the number of cache hits and misses of this build.
+    # @return (hits, misses)
+    def __get_ccache_statistics(self):
+        """Read the statistics of this build, from the log ccache writes
+        them in (``CCACHE_STATSLOG``, ccache 4): the counters of the shared
+        cache also count the builds of the other containers and worker
+        slots. An empty log (e.g. ccache 3, which ignores it) gives no\
+        statistics, hence a hit rate of -1.
+
+        :return: Tuple like so: ``(hits, misses)``
+        :rtype: tuple
+        """
+        hits, misses = 0, 0
+        try:
+            with open(self.__ccache_stats_log, "r") as stats_log:
+                # "# <source file>" then one counter per line
+                for line in stats_log:
+                    line = line.strip()
+                    if line in ("direct_cache_hit", "preprocessed_cache_hit"):
+                        hits += 1
+                    elif line == "cache_miss":
+                        misses += 1
+        except OSError:
+            pass
+        return hits, misses
+
+    ## __analyse_line
+    # @author LEBRETON Mickaël, PICARD Michaël
+    # @version 3
+    # @brief Analyse a line of the compilation error output, as it is written.
+    # @return True if the line tells that the compilation fails because of a
+    # missing file or command.
+    def __analyse_line(self, line):
+        """Analyses a line of the compilation error output (without the time
+        prefix). The missing files and packages it tells about are added to
+        the ones found during the compilation.
+
+        :param line: line of the compilation error output
+        :type line: str
+        :return: either the compilation fails because of a missing file or\
+        command or not. A ``not found`` message from a shell does not\
+        always make the compilation fail, hence ``False`` is returned.
+        :rtype: bool
+        """
+        match = _MISSING_DEPENDENCY_PATTERN.search(line)
+        if match is None:
+            return False
+        fields = line.split(":")
+        try:
+            if match.lastgroup == "file":
+                # case "file.c:48:19: fatal error: <file.h>: No such file or directory"
+                self.__missing_files.append(fields[4].strip())
+            elif match.lastgroup == "command":
+                # case "make[4]: <command>: Command not found"
+                self.__missing_packages.append(fields[1].strip())
+            elif len(fields) == 4:
+                # case "/bin/sh: 1: <command>: not found"
+                self.__missing_packages.append(fields[2].strip())
+            else:
+                # ./scripts/gcc-plugin.sh: 11: ./scripts/gcc-plugin.sh: <package>: not found
+                self.__missing_packages.append(fields[3].strip())
+        except IndexError:
+            return False
+        return match.lastgroup == "command" \
+            or "No such file or directory" in line
+
     ## log_analyser
     # @author LEBRETON Mickaël, PICARD Michaël
-    # @version 2
-    # @brief Analyse settings.STDERR_FILE
+    # @version 3
+    # @brief Give the result of the analysis of the compilation error output.
+    # @details The analysis is made while compiling, see __analyse_line.
     # @return (status, missing_files, missing_packages)
     def __log_analyser(self):
-        """Analyses ``settings.STDERR_FILE`` (log file).
+        """Gives the missing files and packages found in the error output of
+        the last compilation, while it was running.
 
         :return: Tuple like so: ``(status, missing_files,
         missing_packages)``
         :rtype: tuple
         """
-        self.__logger.timed_print_output(
-            "Analysing {}".format(settings.STDERR_FILE))
-        files, packages = list(), list()
-
-        with open(settings.STDERR_FILE, 'r') as err_logs:
-            for line in err_logs:
-                if re.search("fatal error", line):
-                    # case "file.c:48:19: fatal error: <file.h>: No such file or directory"
-                    files.append(line.split(":")[4].strip())
-                elif re.search("Command not found", line):
-                    # case "make[4]: <command> : command not found"
-                    packages.append(line.split(":")[1].strip())
-                elif re.search("not found", line):
-                    if len(line.split(":")) == 4:
-                        # case "/bin/sh: 1: <command>: not found"
-                        packages.append(line.split(":")[2].strip())
-                    else:
-                        # ./scripts/gcc-plugin.sh: 11: ./scripts/gcc-plugin.sh: <package>: not found
-                        packages.append(line.split(":")[3].strip())
+        files = list(self.__missing_files)
+        packages = list(self.__missing_packages)
 
         success = len(files) > 0 or len(packages) > 0
         if success:
@@ -406,6 +632,19 @@ class Compiler:
         """
         return self.__result_dictionary
 
+    ## get_phase_times
+    # @brief Return the time spent in each phase of the previous run.
+    def get_phase_times(self):
+        """Gives the time spent, in seconds, in each phase of the previous
+        run: ``config_generation``, ``make`` (without the installation of\
+        the missing dependencies), ``autofix`` (installation of the missing\
+        dependencies) and ``compressed_sizes``.
+
+        :return: ``{phase: time}``
+        :rtype: dict
+        """
+        return dict(self.__phase_times)
+
     ## __retrieve_kernel_size
     # @author PICARD Michaël
     # @version 1
@@ -432,35 +671,59 @@ class Compiler:
 
     ## __get_compressed_kernel_size
     # @author LE MASLE Alexis, PICARD Michaël
-    # @version 2
+    # @version 4
     # @brief Get the size of the 18 differents compressed kernels
-    # @return A string representing the result. The string is formatted like
-    # "<compressed_kernel> : <size>"(" , <compressed_kernel> : <size>")*
+    # @details By default, the sizes are computed from the only build (see
+    # compressed_size.py). Set settings.FAST_COMPRESSED_KERNEL_SIZE to False to
+    # rebuild the kernel once per compression type instead. The sizes are
+    # stored as a record of size_schema.py.
     def __get_compressed_kernel_size(self):
         """Get size of each compressed kernel using 18 types of compression.
 
-        :return: description of the result like so:
-        ``<compressed_kernel> : <size> (, <compressed_kernel> :
-        <size>)*``
-        :rtype: str
+        """
+        if not settings.FAST_COMPRESSED_KERNEL_SIZE:
+            self.__get_compressed_kernel_size_with_make()
+            return
+
+        self.__logger.timed_print_output("Computing compressed kernel size.")
+        self.__kernel_compressed_size = compressed_sizes_record(
+            get_compressed_sizes(self.__output_path, self.__nb_core))
+        # the size change of the decompressor is not taken into account
+        self.__compressed_sizes_method = "estimated"
+        self.__logger.timed_print_output(
+            "Successfully retrieve compressed kernel size.",
+            color=COLOR_SUCCESS
+        )
+
+    ## __get_compressed_kernel_size_with_make
+    # @author LE MASLE Alexis, PICARD Michaël
+    # @version 3
+    # @brief Get the size of the 18 differents compressed kernels by rebuilding
+    # the kernel for each compression type.
+    def __get_compressed_kernel_size_with_make(self):
+        """Get size of each compressed kernel using 18 types of compression,
+        by rebuilding the kernel with each compression option.
+
         """
         self.__logger.timed_print_output("Computing compressed kernel size.")
 
         # saving the configuration file
-        with open("{}/.config".format(self.__kernel_path), "rb") as config:
+        with open("{}/.config".format(self.__output_path), "rb") as config:
             basic_config = config.read()
 
-        self.__kernel_compressed_size = ""
+        self.__kernel_compressed_size = compressed_sizes_record()
+        self.__compressed_sizes_method = "measured"
         for i in range(len(settings.KERNEL_COMPRESSION_TYPE)):
             compression = settings.KERNEL_COMPRESSION_TYPE[i]
             extension = settings.KERNEL_COMPRESSION_EXTENSIONS[i]
 
             self.__enable_only_one_compression_option(compression)
             subprocess.run(
-                args="make CC={} HOSTCC={} -C {} -j{}".format(
+                args="make CC={} HOSTCC={} -C {} {} -j{}".format(
                     self.__compiler_exec,
                     self.__compiler_exec,
                     self.__kernel_path,
+                    self.__make_output,
                     self.__nb_core
                 ),
                 shell=True,
@@ -468,44 +731,34 @@ class Compiler:
                 stderr=subprocess.DEVNULL
             )
             # bzImage
-            self.__kernel_compressed_size = "{}{}-bzImage : {} , ".format(
-                self.__kernel_compressed_size,
-                compression,
+            self.__kernel_compressed_size["{}-bzImage".format(compression)] = \
                 self.__retrieve_kernel_size(
                     "{}/arch/x86/boot/bzImage".format(
-                        self.__kernel_path))
-            )
+                        self.__output_path))
             # vmlinux
-            self.__kernel_compressed_size = "{}{}-vmlinux : {} , ".format(
-                self.__kernel_compressed_size,
-                compression,
+            self.__kernel_compressed_size["{}-vmlinux".format(compression)] = \
                 self.__retrieve_kernel_size(
                     "{}/arch/x86/boot/compressed/vmlinux".format(
-                        self.__kernel_path))
-            )
+                        self.__output_path))
             # compressed
-            path = "{}/arch/x86/boot/compressed".format(self.__kernel_path)
+            path = "{}/arch/x86/boot/compressed".format(self.__output_path)
             size = -1
             for file in os.listdir(path):
                 if os.path.isfile(os.path.join(path, file)) and file.endswith(extension):
                     size = self.__retrieve_kernel_size(os.path.join(path, file))
                     break
-            self.__kernel_compressed_size = "{}{} : {} , ".format(
-                self.__kernel_compressed_size,
-                compression,
-                size
-            )
-        self.__kernel_compressed_size = self.__kernel_compressed_size[:-3]
+            self.__kernel_compressed_size[compression] = size
 
         # reset the configuration file to its earlier state
-        with open("{}/.config".format(self.__kernel_path), "wb") as config:
+        with open("{}/.config".format(self.__output_path), "wb") as config:
             config.write(basic_config)
             config.flush()
             subprocess.run(
-                args="make CC={} HOSTCC={} -C {} -j{}".format(
+                args="make CC={} HOSTCC={} -C {} {} -j{}".format(
                     self.__compiler_exec,
                     self.__compiler_exec,
                     self.__kernel_path,
+                    self.__make_output,
                     self.__nb_core
                 ),
                 shell=True,
@@ -568,7 +821,7 @@ class Compiler:
             args="sed 's|{}|{}|' -i {}/.config".format(
                 before,
                 after,
-                self.__kernel_path
+                self.__output_path
             ),
             shell=True,
             stdout=subprocess.DEVNULL,
@@ -584,6 +837,18 @@ class Compiler:
         """
         return self.__kernel_path
 
+    ## get_output_path
+    # @brief Return the directory of the built files, where the .config is.
+    def get_output_path(self):
+        """Gives the directory of the built files (``.config``,\
+        ``vmlinux``...): the output directory if any, the kernel directory\
+        otherwise.
+
+        :return: path to the directory of the built files
+        :rtype: str
+        """
+        return self.__output_path
+
     ## __set_result_dictionary
     # @author PICARD Michaël
     # @version 1
@@ -594,26 +859,32 @@ class Compiler:
         """
 
         try:
-            config  = open("{}/.config".format(self.__kernel_path), "rb").read()
+            config  = open("{}/.config".format(self.__output_path), "rb").read()
         except:
             config = bytes() # empty 
 
+        # compressed while written, see log_compression.py
+        logs = self.__logger.get_compressed_logs()
         self.__result_dictionary = {
             "compilation_date": time.strftime("%Y-%m-%d %H:%M:%S",
                                               time.localtime(time.time())),
             "compilation_time": self.__compilation_time,
             "config_file": bz2.compress(config),
-            "stdout_log_file": bz2.compress(
-                open(self.__logger.get_stdout_file(), "rb").read()),
-            "stderr_log_file": bz2.compress(
-                open(self.__logger.get_stderr_file(), "rb").read()),
-            "user_output_file": bz2.compress(
-                open(self.__logger.get_user_output_file(), "rb").read()),
+            "stdout_log_file": logs['stdout_log_file'],
+            "stderr_log_file": logs['stderr_log_file'],
+            "user_output_file": logs['user_output_file'],
+            "log_compression": self.__logger.get_log_compression(),
             "compiled_kernel_size": self.__kernel_size,
-            "compressed_compiled_kernel_size": self.__kernel_compressed_size,
+            "compressed_compiled_kernel_size": format_compressed_sizes(
+                self.__kernel_compressed_size),
+            "compressed_sizes": self.__kernel_compressed_size,
+            "compressed_sizes_method": self.__compressed_sizes_method,
             "dependencies": " ".join(
                 self.__package_manager.get_package_list_copy()),
             "number_cpu_core_used": self.__nb_core,
+            "cache_hit_rate": self.__cache_hit_rate,
+            "config_generator": self.__config_generator,
+            "config_seed": self.__config_seed,
             "compiled_kernel_version": self.__kernel_version
         }
     
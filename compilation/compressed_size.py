@@ -0,0 +1,187 @@
+"""Fast computation of the compressed kernel sizes
+
+Instead of rebuilding the kernel once per compression option, the
+payload produced by the only build (``arch/x86/boot/compressed/vmlinux.bin``
+plus its relocations) is compressed in-process with every algorithm, the
+same way ``scripts/Makefile.lib`` does it. The size of the compressed
+``vmlinux`` and of the ``bzImage`` are then deduced from the ones of the
+build, by replacing the payload it embeds.
+
+:version: 1
+"""
+# @file compressed_size.py
+
+import bz2
+import gzip
+import lzma
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import compilation.settings as settings
+
+_COMPRESSED_DIRECTORY = "{}/arch/x86/boot/compressed"
+_BZIMAGE = "{}/arch/x86/boot/bzImage"
+
+# Size of the trailer appended by size_append in scripts/Makefile.lib: the
+# uncompressed size, as a 32 bits little endian integer.
+_SIZE_APPEND_LENGTH = 4
+# Compression types whose command appends it (cmd_bzip2, cmd_lzma, cmd_xzkern,
+# cmd_lzo, cmd_lz4): cmd_gzip does not, gzip keeps the size in its own footer.
+_SIZE_APPENDED = {"BZIP2", "LZMA", "XZ", "LZO", "LZ4"}
+
+
+## __compress_xz
+# @brief Same options as scripts/xz_wrap.sh for x86.
+def __compress_xz(data):
+    return lzma.compress(
+        data,
+        format=lzma.FORMAT_XZ,
+        check=lzma.CHECK_CRC32,
+        filters=[
+            {"id": lzma.FILTER_X86},
+            {"id": lzma.FILTER_LZMA2, "preset": 6, "dict_size": 32 << 20}
+        ]
+    )
+
+
+## __compress_with_tool
+# @brief Compress data with an external tool reading on its standard input.
+# @details Used for lzo and lz4, which have no codec in the standard library.
+def __compress_with_tool(args, data):
+    try:
+        return subprocess.run(
+            args=args,
+            input=data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+## __compress
+# @brief Compress data like the kernel does for the given compression type.
+# @return The compressed data, or None if the compression is not available.
+def __compress(compression, data):
+    if compression == "GZIP":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if compression == "BZIP2":
+        return bz2.compress(data, 9)
+    if compression == "LZMA":
+        return lzma.compress(data, format=lzma.FORMAT_ALONE, preset=9)
+    if compression == "XZ":
+        return __compress_xz(data)
+    if compression == "LZO":
+        return __compress_with_tool(["lzop", "-9", "-c"], data)
+    if compression == "LZ4":
+        return __compress_with_tool(["lz4", "-l", "-9", "-c"], data)
+    raise KeyError("Unknown compression type {}.".format(compression))
+
+
+## __compressed_payload_size
+# @brief Return the size of the payload once compressed, trailer included if
+# the kernel appends one.
+def __compressed_payload_size(compression, data):
+    compressed = __compress(compression, data)
+    if compressed is None:
+        return -1
+    if compression in _SIZE_APPENDED:
+        return len(compressed) + _SIZE_APPEND_LENGTH
+    return len(compressed)
+
+
+## __read_payload
+# @brief Return the uncompressed payload embedded in the compressed vmlinux.
+# @details It is vmlinux.bin.all when the kernel needs relocations, and
+# vmlinux.bin otherwise.
+def __read_payload(compressed_directory):
+    for name in ["vmlinux.bin.all", "vmlinux.bin"]:
+        path = os.path.join(compressed_directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as payload:
+                return payload.read()
+    return None
+
+
+## __built_payload_size
+# @brief Return the size of the compressed payload produced by the build.
+# @details The compression used by the build is read from the .config, so that
+# payloads left by previous builds are never taken into account.
+def __built_payload_size(kernel_path, compressed_directory):
+    try:
+        with open("{}/.config".format(kernel_path), "r") as config:
+            options = set(line.strip() for line in config)
+    except OSError:
+        return -1
+    for compression, extension in zip(settings.KERNEL_COMPRESSION_TYPE,
+                                      settings.KERNEL_COMPRESSION_EXTENSIONS):
+        if "CONFIG_KERNEL_{}=y".format(compression) in options:
+            return __file_size(os.path.join(
+                compressed_directory, "vmlinux.bin{}".format(extension)))
+    return -1
+
+
+## __file_size
+def __file_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return -1
+
+
+## get_compressed_sizes
+# @brief Compute the sizes of the kernel for every compression type.
+# @return A dictionary {compression: (bzImage, vmlinux, payload)}. A size is
+# -1 when it can't be computed.
+def get_compressed_sizes(kernel_path, nb_core=1):
+    """Compute the size of the ``bzImage``, of the compressed ``vmlinux``
+    and of the compressed payload for each compression type of
+    ``settings.KERNEL_COMPRESSION_TYPE``, from a single build.
+
+    The payloads are compressed in parallel. The ``bzImage`` and
+    ``vmlinux`` sizes are the ones of the build where the payload is
+    replaced by the one of each compression type: they are exact for the
+    compression used by the build and they do not take into account the
+    size difference between the decompressors otherwise.
+
+    :param kernel_path: path to the compiled Linux kernel
+    :type kernel_path: str
+    :param nb_core: number of compressions to run at the same time
+    :type nb_core: int
+    :return: ``{compression: (bzImage, vmlinux, payload)}``
+    :rtype: dict
+    """
+    compressed_directory = _COMPRESSED_DIRECTORY.format(kernel_path)
+    sizes = {compression: (-1, -1, -1)
+             for compression in settings.KERNEL_COMPRESSION_TYPE}
+
+    data = __read_payload(compressed_directory)
+    if data is None:
+        return sizes
+
+    with ThreadPoolExecutor(max_workers=max(1, nb_core)) as executor:
+        payload_sizes = dict(zip(
+            settings.KERNEL_COMPRESSION_TYPE,
+            executor.map(
+                lambda compression: __compressed_payload_size(compression,
+                                                              data),
+                settings.KERNEL_COMPRESSION_TYPE)))
+
+    built_payload_size = __built_payload_size(kernel_path,
+                                              compressed_directory)
+    bzimage_size = __file_size(_BZIMAGE.format(kernel_path))
+    vmlinux_size = __file_size(
+        os.path.join(compressed_directory, "vmlinux"))
+
+    for compression, payload_size in payload_sizes.items():
+        if payload_size < 0 or built_payload_size < 0:
+            sizes[compression] = (-1, -1, payload_size)
+            continue
+        delta = payload_size - built_payload_size
+        sizes[compression] = (
+            bzimage_size + delta if bzimage_size >= 0 else -1,
+            vmlinux_size + delta if vmlinux_size >= 0 else -1,
+            payload_size
+        )
+    return sizes
@@ -0,0 +1,437 @@
+#!/usr/bin/python3
+
+"""Compact encoding of the configurations (``.config``)
+
+A ``.config`` is tens of KB of text, sent with every result. Most of it is
+known beforehand: the symbols of a kernel version are always the same, in
+the same order, and most of them keep the value of ``make allnoconfig``.
+A ``ConfigCodec`` holds this table for a kernel version, the names of the
+symbols in menu order and the values of the allnoconfig baseline, and
+encodes a configuration against it:
+
+* ``bitset``: two bits per symbol of the table (absent, not set, ``y`` or
+  ``m``), plus the other values (numbers, strings...) that differ from
+  the baseline;
+* ``diff``: the values that differ from the baseline, and the symbols of
+  the baseline missing from the configuration. Smaller for the tiny
+  configurations, close to the baseline.
+
+The symbols unknown to the table are kept apart, so that any configuration
+can be encoded. The encoded configuration is a string,
+``<codec>:<kernel version>:<table digest>:<data>``, the data being
+compressed with zlib and base64 encoded. Decoding it gives the same
+assignments, in the same order; the comments of the ``.config`` (header,
+menu titles) are not kept, ``make olddefconfig`` writes them again.
+
+The tables are created in the container from the Kconfig files, with the
+optional ``kconfiglib`` package (see `ConfigGenerator
+<config_generator.html>`_), and saved in
+``settings.CONFIG_CODEC_DIRECTORY`` to decode the configurations later.
+The API has none of them: the configurations of the spool and of the JSON
+files are encoded (``settings.SPOOL_CONFIG_ENCODING``), and sent in the
+encoding of ``settings.CONFIG_ENCODING``, the plain ``.config`` by
+default (see :py:func:`recode_record`)::
+
+    python3 -m compilation.config_codec decode build.json \\
+        --codec_directory Spool/config_codecs
+
+:version: 1
+"""
+# @file config_codec.py
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import zlib
+
+import functools
+
+import compilation.settings as settings
+from compilation.config_generator import get_config_generator
+
+## CONFIG_CODECS
+# @brief Names of the encodings.
+CONFIG_CODECS = ["bitset", "diff"]
+
+# "CONFIG_<name>=<value>" or "# CONFIG_<name> is not set"
+_ASSIGNMENT_PATTERN = re.compile(
+    r"^(?:CONFIG_(?P<name>[A-Za-z0-9_]+)=(?P<value>.*)"
+    r"|# CONFIG_(?P<unset>[A-Za-z0-9_]+) is not set)$")
+# two bits per symbol of the bitset
+_TRISTATE_CODES = {"n": 1, "y": 2, "m": 3}
+_CODE_VALUES = {1: "n", 2: "y", 3: "m"}
+
+# (kernel path, arch, compiler) -> ConfigCodec, see get_config_codec
+_codecs = dict()
+_codecs_lock = threading.Lock()
+
+
+## parse_config
+# @brief Return the assignments of a configuration.
+def parse_config(text):
+    """Gives the assignments of a configuration, in order.
+
+    :param text: content of the ``.config``
+    :type text: str
+    :return: ``{name: value}``, the name without the ``CONFIG_`` prefix,\
+    the value being ``"n"`` for the symbols that are not set
+    :rtype: dict
+    """
+    values = dict()
+    for line in text.splitlines():
+        match = _ASSIGNMENT_PATTERN.match(line.strip())
+        if match is None:
+            continue
+        if match.group("unset") is not None:
+            values[match.group("unset")] = "n"
+        else:
+            values[match.group("name")] = match.group("value")
+    return values
+
+
+## format_config
+# @brief Return the content of the configuration with the given assignments.
+def format_config(values):
+    """Gives the ``.config`` made of the assignments.
+
+    :param values: ``{name: value}``, as given by :py:func:`parse_config`
+    :type values: dict
+    :return: content of the ``.config``
+    :rtype: str
+    """
+    return "".join(
+        "# CONFIG_{} is not set\n".format(name) if value == "n"
+        else "CONFIG_{}={}\n".format(name, value)
+        for name, value in values.items())
+
+
+## ConfigCodec
+# @brief Encode the configurations of a kernel version against its symbols
+# and its allnoconfig baseline.
+class ConfigCodec:
+    """Encodes the configurations of a kernel version.
+
+    :param kernel_version: version of the Linux kernel
+    :type kernel_version: str
+    :param symbols: names of the symbols, in menu order
+    :type symbols: list
+    :param baseline: assignments of ``make allnoconfig`` (See\
+    :py:func:`parse_config`)
+    :type baseline: dict
+    """
+    def __init__(self, kernel_version, symbols, baseline):
+        self.__kernel_version = kernel_version
+        self.__symbols = list(symbols)
+        self.__baseline = dict(baseline)
+        content = json.dumps([self.__symbols, self.__baseline])
+        self.__digest = hashlib.sha1(content.encode()).hexdigest()[:12]
+
+    ## load
+    # @brief Return the codec saved in a file.
+    @staticmethod
+    def load(path):
+        """Load a codec saved with :py:meth:`save`.
+
+        :param path: path to the file
+        :type path: str
+        :rtype: `ConfigCodec`
+        """
+        with open(path, "r") as codec_file:
+            table = json.load(codec_file)
+        return ConfigCodec(table['kernel_version'], table['symbols'],
+                           table['baseline'])
+
+    ## save
+    # @brief Save the codec in a directory and return the path of the file.
+    def save(self, directory):
+        """Save the table of the codec, to decode the configurations
+        later.
+
+        :param directory: directory of the tables
+        :type directory: str
+        :return: path to the file, ``<kernel version>-<digest>.json``
+        :rtype: str
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = get_config_codec_path(directory, self.__kernel_version,
+                                     self.__digest)
+        if not os.path.exists(path):
+            with tempfile.NamedTemporaryFile("w", dir=directory,
+                                             delete=False) as codec_file:
+                json.dump({'kernel_version': self.__kernel_version,
+                           'symbols': self.__symbols,
+                           'baseline': self.__baseline}, codec_file)
+            os.replace(codec_file.name, path)
+        return path
+
+    ## get_digest
+    def get_digest(self):
+        """Gives the digest of the table, recorded in the encoded\
+        configurations
+
+        :rtype: str
+        """
+        return self.__digest
+
+    ## encode
+    # @brief Return the encoded configuration.
+    def encode(self, text, codec="bitset"):
+        """Encode a configuration.
+
+        :param text: content of the ``.config``
+        :type text: str
+        :param codec: one of :py:data:`CONFIG_CODECS`
+        :type codec: str
+        :return: the encoded configuration, to decode with\
+        :py:meth:`decode`
+        :rtype: str
+        """
+        values = parse_config(text)
+        if codec == "bitset":
+            data = self.__encode_bitset(values)
+        elif codec == "diff":
+            data = self.__encode_diff(values)
+        else:
+            raise ValueError("Unknown config codec {}.".format(codec))
+        return ":".join([codec, self.__kernel_version, self.__digest,
+                         base64.b64encode(zlib.compress(data, 9)).decode()])
+
+    def __encode_bitset(self, values):
+        bits = bytearray((len(self.__symbols) + 3) // 4)
+        others = dict()
+        for index, name in enumerate(self.__symbols):
+            if name not in values:
+                continue
+            value = values[name]
+            code = _TRISTATE_CODES.get(value, 2)
+            bits[index // 4] |= code << (2 * (index % 4))
+            # y is implied, unless the baseline holds another kind of value
+            baseline = self.__baseline.get(name)
+            if (value not in _TRISTATE_CODES or baseline is not None
+                    and baseline not in _TRISTATE_CODES) \
+                    and value != baseline:
+                others[name] = value
+        others.update(self.__unknown_values(values))
+        return bytes(bits) + json.dumps(others).encode()
+
+    def __encode_diff(self, values):
+        changed = {name: value for name, value in values.items()
+                   if self.__baseline.get(name) != value}
+        absent = [name for name in self.__baseline if name not in values]
+        return json.dumps([changed, absent]).encode()
+
+    def __unknown_values(self, values):
+        known = set(self.__symbols)
+        return {name: value for name, value in values.items()
+                if name not in known}
+
+    ## decode
+    # @brief Return the content of an encoded configuration.
+    def decode(self, encoded):
+        """Decode a configuration encoded by :py:meth:`encode`.
+
+        :param encoded: the encoded configuration
+        :type encoded: str
+        :return: content of the ``.config``, without its comments
+        :rtype: str
+        :raises ValueError: if the configuration was not encoded with this\
+        table
+        """
+        codec, kernel_version, digest, data = encoded.split(":", 3)
+        if digest != self.__digest:
+            raise ValueError("Configuration encoded with the table {} of {}, "
+                             "not {}.".format(digest, kernel_version,
+                                              self.__digest))
+        data = zlib.decompress(base64.b64decode(data))
+        if codec == "bitset":
+            values, others = self.__decode_bitset(data)
+        elif codec == "diff":
+            values, others = self.__decode_diff(data)
+        else:
+            raise ValueError("Unknown config codec {}.".format(codec))
+        # the symbols unknown to the table come last
+        values.update(others)
+        return format_config(values)
+
+    def __decode_bitset(self, data):
+        size = (len(self.__symbols) + 3) // 4
+        bits, others = data[:size], json.loads(data[size:].decode())
+        values = dict()
+        for index, name in enumerate(self.__symbols):
+            code = (bits[index // 4] >> (2 * (index % 4))) & 3
+            if not code:
+                continue
+            if name in others:
+                values[name] = others.pop(name)
+            elif code == 2 and self.__baseline.get(name) is not None \
+                    and self.__baseline[name] not in _TRISTATE_CODES:
+                values[name] = self.__baseline[name]
+            else:
+                values[name] = _CODE_VALUES[code]
+        return values, others
+
+    def __decode_diff(self, data):
+        changed, absent = json.loads(data.decode())
+        absent = set(absent)
+        merged = {name: value for name, value in self.__baseline.items()
+                  if name not in absent}
+        merged.update(changed)
+        values = {name: merged.pop(name) for name in self.__symbols
+                  if name in merged}
+        # what is left is unknown to the table
+        return values, merged
+
+
+## get_config_codec_path
+# @brief Return the path to the table of a kernel version in a directory.
+def get_config_codec_path(directory, kernel_version, digest):
+    return os.path.join(directory, "{}-{}.json".format(kernel_version, digest))
+
+
+## get_config_codec
+# @brief Return the codec of a kernel tree, created and saved on the first
+# call.
+def get_config_codec(kernel_path, kernel_version, arch="x86_64",
+                     compiler_exec="gcc",
+                     directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Gives the codec of a kernel tree, created from its Kconfig files on
+    the first call, and saved in the directory of the tables.
+
+    :param kernel_path: path to the Linux kernel
+    :type kernel_path: str
+    :param kernel_version: version of the Linux kernel
+    :type kernel_version: str
+    :param arch: architecture
+    :type arch: str
+    :param compiler_exec: compiler
+    :type compiler_exec: str
+    :param directory: directory of the tables
+    :type directory: str
+    :return: the codec, or None if the Kconfig files can't be parsed (see\
+    `get_config_generator <config_generator.html>`_)
+    :rtype: `ConfigCodec`
+    """
+    key = (os.path.abspath(kernel_path), arch, compiler_exec)
+    with _codecs_lock:
+        if key not in _codecs:
+            _codecs[key] = None
+            generator = get_config_generator(kernel_path, arch, compiler_exec,
+                                             kernel_version)
+            if generator is not None:
+                with tempfile.TemporaryDirectory() as temporary_directory:
+                    path = os.path.join(temporary_directory, ".config")
+                    generator.write_allnoconfig(path)
+                    with open(path, "r") as baseline_file:
+                        baseline = parse_config(baseline_file.read())
+                _codecs[key] = ConfigCodec(kernel_version,
+                                           generator.get_symbol_names(),
+                                           baseline)
+                _codecs[key].save(directory)
+        return _codecs[key]
+
+
+## decode_config
+# @brief Return the content of an encoded configuration, with the table
+# saved in a directory.
+def decode_config(encoded, directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Decode a configuration with the table it was encoded with, saved
+    in the directory of the tables.
+
+    :param encoded: the encoded configuration
+    :type encoded: str
+    :param directory: directory of the tables
+    :type directory: str
+    :return: content of the ``.config``, without its comments
+    :rtype: str
+    :raises OSError: if the table is not in the directory
+    """
+    _, kernel_version, digest, _ = encoded.split(":", 3)
+    return __load_config_codec(
+        get_config_codec_path(directory, kernel_version, digest)
+    ).decode(encoded)
+
+
+## __load_config_codec
+# @brief Return the codec saved in a file, loaded once.
+@functools.lru_cache(maxsize=16)
+def __load_config_codec(path):
+    return ConfigCodec.load(path)
+
+
+## recode_record
+# @brief Return a result whose configuration is in the given encoding.
+def recode_record(record, codec=None,
+                  directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Gives a result whose configuration is in the given encoding, e.g.
+    the one of the API for a result of the spool. A plain configuration
+    stays plain: its table is not known.
+
+    :param record: the result
+    :type record: dict
+    :param codec: one of :py:data:`CONFIG_CODECS`, or None for the plain\
+    ``.config``
+    :type codec: str
+    :param directory: directory of the tables
+    :type directory: str
+    :return: the result itself if there is nothing to change, a copy\
+    otherwise
+    :rtype: dict
+    :raises OSError: if the table of the configuration is not in the\
+    directory
+    """
+    if record.get('config_encoding') in [None, codec]:
+        return record
+    record = dict(record)
+    del record['config_encoding']
+    _, kernel_version, digest, _ = record['config_file'].split(":", 3)
+    table = __load_config_codec(
+        get_config_codec_path(directory, kernel_version, digest))
+    record['config_file'] = table.decode(record['config_file'])
+    if codec is not None:
+        record['config_file'] = table.encode(record['config_file'], codec)
+        record['config_encoding'] = codec
+    return record
+
+
+## parser
+# @brief Parse the commandline and return the parsed argument.
+def parser():
+    parser = argparse.ArgumentParser(
+        description="Write the configurations of JSON results (see "
+                    "create_json_file in main.py) as .config files."
+    )
+    parser.add_argument(
+        "command",
+        choices=["decode"],
+        help="decode: write <result>.config next to each result."
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="JSON results."
+    )
+    parser.add_argument(
+        "--codec_directory",
+        default=settings.CONFIG_CODEC_DIRECTORY,
+        help="Optional. Directory of the tables. Default to "
+             "{}.".format(settings.CONFIG_CODEC_DIRECTORY)
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parser()
+    for file in args.files:
+        with open(file, "r") as json_file:
+            record = json.load(json_file)
+        config = record.get('config_file') or ""
+        if record.get('config_encoding') is not None:
+            config = decode_config(config, args.codec_directory)
+        with open("{}.config".format(os.path.splitext(file)[0]),
+                  "w") as config_file:
+            config_file.write(config)
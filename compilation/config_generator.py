@@ -0,0 +1,353 @@
+#!/usr/bin/python3
+
+"""In-process generation of random configurations with kconfiglib
+
+``make randconfig`` builds the ``conf`` tool and parses the whole Kconfig
+tree for each configuration. A ``ConfigGenerator`` parses the tree once
+per kernel tree, with the optional ``kconfiglib`` package, then draws as
+many random configurations as needed from it:
+
+* the values of the preset file (``KCONFIG_ALLCONFIG``) are kept;
+* every other visible bool and tristate symbol, and every choice, gets a
+  random value among the assignable ones, in menu order, like ``make
+  randconfig``; the other symbols keep their default value;
+* kconfiglib enforces the dependencies, so the configuration is valid.
+
+The draw only depends on the seed, which is returned so that the
+configuration can be generated again. Many configurations can be written
+at once::
+
+    python3 -m compilation.config_generator /TuxML/linux-4.13.3 \\
+        --number 1000 --seed 42 --output_directory configs
+
+:version: 1
+"""
+# @file config_generator.py
+
+import argparse
+import os
+import random
+import subprocess
+import threading
+import time
+
+try:
+    import kconfiglib
+except ImportError:
+    kconfiglib = None
+
+import compilation.settings as settings
+
+# (kernel path, arch, compiler) -> ConfigGenerator, see get_config_generator
+_generators = dict()
+_generators_lock = threading.Lock()
+# kconfiglib reads the environment of the process
+_environment_lock = threading.Lock()
+
+
+## __source_architecture
+# @brief Return the directory of arch/ of an architecture (SRCARCH).
+def __source_architecture(arch):
+    if arch in ["x86_64", "i386", "x86"]:
+        return "x86"
+    return arch
+
+
+## __compiler_version_text
+# @brief Return the first line of the version of the compiler.
+def __compiler_version_text(compiler_exec):
+    try:
+        return subprocess.run(
+            args=[compiler_exec, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True
+        ).stdout.split("\n")[0]
+    except OSError:
+        return ""
+
+
+## get_kconfig_environment
+# @brief Return the variables of the environment read by the Kconfig files.
+def get_kconfig_environment(kernel_path, arch="x86_64", compiler_exec="gcc",
+                            kernel_version=""):
+    """Gives the variables of the environment the Kconfig files of the
+    Linux kernel read, as set by its Makefile.
+
+    :param kernel_path: path to the Linux kernel
+    :type kernel_path: str
+    :param arch: architecture (``ARCH``)
+    :type arch: str
+    :param compiler_exec: compiler, whose options are checked by the\
+    recent Kconfig files
+    :type compiler_exec: str
+    :param kernel_version: version of the Linux kernel
+    :type kernel_version: str
+    :return: ``{variable: value}``
+    :rtype: dict
+    """
+    return {
+        "srctree": kernel_path,
+        "ARCH": arch,
+        "SRCARCH": __source_architecture(arch),
+        "KERNELVERSION": kernel_version,
+        "CC": compiler_exec,
+        "HOSTCC": compiler_exec,
+        "LD": "ld",
+        "CC_VERSION_TEXT": __compiler_version_text(compiler_exec)
+    }
+
+
+## new_seed
+# @brief Return a new random seed.
+def new_seed():
+    """Draw a new seed, e.g. when none is given.
+
+    :return: the seed
+    :rtype: int
+    """
+    return random.SystemRandom().randrange(1 << 32)
+
+
+## ConfigGenerator
+# @brief Generate random configurations of a kernel tree, parsing its Kconfig
+# files once.
+# @details The generation is thread safe: the builds of a worker can share a
+# generator.
+class ConfigGenerator:
+    """Generates random configurations of a Linux kernel tree, whose
+    Kconfig files are parsed once, when the generator is created.
+
+    :param kernel_path: path to the Linux kernel
+    :type kernel_path: str
+    :param arch: architecture
+    :type arch: str
+    :param compiler_exec: compiler
+    :type compiler_exec: str
+    :param kernel_version: version of the Linux kernel
+    :type kernel_version: str
+    :raises kconfiglib.KconfigError: if the Kconfig files can't be parsed
+    """
+    def __init__(self, kernel_path, arch="x86_64", compiler_exec="gcc",
+                 kernel_version=""):
+        assert kconfiglib is not None, "kconfiglib is not installed."
+        self.__lock = threading.Lock()
+        environment = get_kconfig_environment(kernel_path, arch,
+                                              compiler_exec, kernel_version)
+        # kconfiglib reads the environment while parsing only
+        with _environment_lock:
+            former = {name: os.environ.get(name) for name in environment}
+            os.environ.update(environment)
+            try:
+                self.__kconfig = kconfiglib.Kconfig(
+                    os.path.join(kernel_path, "Kconfig"), warn=False)
+            finally:
+                for name, value in former.items():
+                    if value is None:
+                        del os.environ[name]
+                    else:
+                        os.environ[name] = value
+
+    ## get_symbol_names
+    # @brief Return the names of the symbols, in menu order.
+    def get_symbol_names(self):
+        """Gives the names of the symbols of the tree, in the order of the
+        menus, which is the order of the ``.config`` files.
+
+        :return: the names, without the ``CONFIG_`` prefix
+        :rtype: list
+        """
+        names = dict()
+        for node in self.__kconfig.node_iter():
+            if isinstance(node.item, kconfiglib.Symbol):
+                names[node.item.name] = None
+        return list(names)
+
+    ## write_allnoconfig
+    # @brief Write the configuration of make allnoconfig.
+    def write_allnoconfig(self, path):
+        """Write the configuration of ``make allnoconfig``: every symbol
+        that can be disabled is.
+
+        :param path: path to the configuration file to write
+        :type path: str
+        """
+        with self.__lock:
+            self.__kconfig.unset_values()
+            for symbol in self.__kconfig.unique_defined_syms:
+                symbol.set_value(2 if symbol.is_allnoconfig_y else 0)
+            self.__kconfig.write_config(path, header="", save_old=False)
+
+    ## generate
+    # @brief Write a random configuration and return its seed.
+    def generate(self, path, preset_file=None, seed=None):
+        """Write a random configuration.
+
+        :param path: path to the configuration file (``.config``) to write
+        :type path: str
+        :param preset_file: path to the preset values\
+        (``KCONFIG_ALLCONFIG``), kept as they are. Default to None, which\
+        means no preset.
+        :type preset_file: str
+        :param seed: seed of the configuration. Default to None, which\
+        means a new one.
+        :type seed: int
+        :return: the seed, to generate the same configuration again
+        :rtype: int
+        """
+        if seed is None:
+            seed = new_seed()
+        rng = random.Random(seed)
+        with self.__lock:
+            # Loading the preset forgets the values of the previous draw
+            if preset_file is not None:
+                self.__kconfig.load_config(preset_file)
+            else:
+                self.__kconfig.unset_values()
+            done = set()
+            for node in self.__kconfig.node_iter():
+                item = node.item
+                if item in done:
+                    continue
+                if isinstance(item, kconfiglib.Choice):
+                    done.add(item)
+                    self.__randomize_choice(item, rng)
+                elif isinstance(item, kconfiglib.Symbol) \
+                        and item.choice is None:
+                    done.add(item)
+                    self.__randomize_symbol(item, rng)
+            self.__kconfig.write_config(
+                path,
+                header="# Random configuration generated with kconfiglib, "
+                       "seed {}\n".format(seed),
+                save_old=False)
+        return seed
+
+    @staticmethod
+    def __randomize_symbol(symbol, rng):
+        # The preset values are kept, and only bool and tristate symbols are
+        # drawn, like conf does
+        if symbol.user_value is not None \
+                or symbol.orig_type not in [kconfiglib.BOOL,
+                                            kconfiglib.TRISTATE] \
+                or not symbol.assignable:
+            return
+        symbol.set_value(rng.choice(symbol.assignable))
+
+    @staticmethod
+    def __randomize_choice(choice, rng):
+        if choice.user_value is not None or not choice.assignable:
+            return
+        mode = rng.choice(choice.assignable)
+        choice.set_value(mode)
+        visible = [symbol for symbol in choice.syms if symbol.visibility]
+        if mode == 2 and visible:
+            rng.choice(visible).set_value(2)
+        elif mode == 1:
+            for symbol in visible:
+                if symbol.assignable:
+                    symbol.set_value(rng.choice(symbol.assignable))
+
+
+## get_config_generator
+# @brief Return the generator of a kernel tree, parsed on the first call.
+def get_config_generator(kernel_path, arch="x86_64", compiler_exec="gcc",
+                         kernel_version=""):
+    """Gives the generator of random configurations of a kernel tree,
+    created on the first call only, so that the Kconfig files are parsed
+    once per kernel tree.
+
+    :param kernel_path: path to the Linux kernel
+    :type kernel_path: str
+    :param arch: architecture
+    :type arch: str
+    :param compiler_exec: compiler
+    :type compiler_exec: str
+    :param kernel_version: version of the Linux kernel
+    :type kernel_version: str
+    :return: the generator, or None if kconfiglib is not installed or can't\
+    parse the Kconfig files (``make randconfig`` is to be used instead)
+    :rtype: `ConfigGenerator`
+    """
+    if kconfiglib is None:
+        return None
+    key = (os.path.abspath(kernel_path), arch, compiler_exec)
+    with _generators_lock:
+        if key not in _generators:
+            try:
+                _generators[key] = ConfigGenerator(
+                    kernel_path, arch, compiler_exec, kernel_version)
+            except (kconfiglib.KconfigError, OSError):
+                _generators[key] = None
+        return _generators[key]
+
+
+## parser
+# @brief Parse the commandline and return the parsed argument.
+def parser():
+    parser = argparse.ArgumentParser(
+        description="Write random configurations of a Linux kernel tree, "
+                    "seeded, parsing its Kconfig files once."
+    )
+    parser.add_argument(
+        "kernel_path",
+        help="Path to the Linux kernel."
+    )
+    parser.add_argument(
+        "--number",
+        type=int,
+        default=1,
+        help="Optional. Number of configurations. Default to 1."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Optional. Seed of the first configuration, the next ones "
+             "using the next seeds. Default to a random one."
+    )
+    parser.add_argument(
+        "--preset",
+        default=settings.CONFIG_PRESET_FILE,
+        help="Optional. Preset values (KCONFIG_ALLCONFIG). Default to "
+             "{}.".format(settings.CONFIG_PRESET_FILE)
+    )
+    parser.add_argument(
+        "--arch",
+        default="x86_64",
+        help="Optional. Architecture. Default to x86_64."
+    )
+    parser.add_argument(
+        "--compiler",
+        default="gcc",
+        help="Optional. Compiler. Default to gcc."
+    )
+    parser.add_argument(
+        "--output_directory",
+        default=".",
+        help="Optional. Directory of the configurations, named "
+             "<seed>.config."
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parser()
+    if kconfiglib is None:
+        raise SystemExit("kconfiglib is not installed.")
+    start = time.time()
+    generator = ConfigGenerator(args.kernel_path, args.arch, args.compiler)
+    parsing_time = time.time() - start
+    first_seed = args.seed if args.seed is not None else new_seed()
+    os.makedirs(args.output_directory, exist_ok=True)
+    start = time.time()
+    for seed in range(first_seed, first_seed + args.number):
+        generator.generate(
+            os.path.join(args.output_directory, "{}.config".format(seed)),
+            args.preset, seed)
+    elapsed_time = time.time() - start
+    print("Kconfig parsed in {:.2f} s, {} configuration(s) generated in "
+          "{:.2f} s ({:.1f} configurations/s), seeds {} to {}.".format(
+              parsing_time, args.number, elapsed_time,
+              args.number / elapsed_time if elapsed_time else 0,
+              first_seed, first_seed + args.number - 1))
@@ -1,26 +1,114 @@
 ## @file database_management.py
 
-import MySQLdb
+import hashlib
+import json
+import sqlite3
+import threading
+
+# Only needed to connect to the MySQL database: the SQLite stand-in of
+# ingest_spool.py works without it
+try:
+    import MySQLdb
+except ImportError:
+    MySQLdb = None
+
+# Idle connections, by (host, user, database_name)
+__connection_pool = dict()
+# (host, user, database_name) of each connection given by the pool, by id
+__connection_keys = dict()
+# Ids (hid, sid) already fetched, by (database, table_name, content)
+__id_cache = dict()
+__lock = threading.Lock()
 
 
 ## fetch_connection_to_database
 # @author PICARD Michaël
-# @version 1
+# @version 2
 # @brief Connect yourself to your database, and return a connection on it.
+# @details The connection is taken from the pool if one is idle. Give it back
+# with release_connection_to_database.
 def fetch_connection_to_database(host, user, password, database_name):
-    return MySQLdb.connect(
+    assert MySQLdb is not None, "MySQLdb (mysqlclient) is not installed."
+    key = (host, user, database_name)
+    with __lock:
+        idle_connections = __connection_pool.get(key, list())
+        connection = idle_connections.pop() if idle_connections else None
+    if connection is not None:
+        try:
+            connection.ping()
+            return connection
+        except MySQLdb.Error:
+            with __lock:
+                __connection_keys.pop(id(connection), None)
+    connection = MySQLdb.connect(
         host=host,
         user=user,
         passwd=password,
         db=database_name
     )
+    with __lock:
+        __connection_keys[id(connection)] = key
+    return connection
+
+
+## release_connection_to_database
+# @version 1
+# @brief Give back a connection to the pool, to be reused by the next
+# fetch_connection_to_database.
+def release_connection_to_database(connection):
+    with __lock:
+        key = __connection_keys.get(id(connection))
+        if key is not None:
+            __connection_pool.setdefault(key, list()).append(connection)
+            return
+    connection.close()
+
+
+## __id_cache_key
+# @version 2
+# @brief Return the key of a row content in the id cache, or None if the ids
+# of the connection can't be cached.
+# @details A SQLite database is identified by its file, not by the connection:
+# the id of a closed connection can be given to a new one, on another
+# database. An in-memory database dies with its connection, so it is not
+# cached.
+def __id_cache_key(connection, table_name, dictionary):
+    if isinstance(connection, sqlite3.Connection):
+        path = next((row[2] for row in
+                     connection.execute("PRAGMA database_list")
+                     if row[1] == "main"), "")
+        if not path:
+            return None
+        database = ("sqlite", path)
+    else:
+        with __lock:
+            database = __connection_keys.get(id(connection))
+        if database is None:
+            return None
+    content = json.dumps(dictionary, sort_keys=True, default=str)
+    return (database, table_name,
+            hashlib.sha1(content.encode()).hexdigest())
+
+
+## __placeholder
+# @version 1
+# @brief Return the placeholder of the query parameters of the connection.
+# @details A SQLite database can stand in for the MySQL one, e.g. to load
+# results locally (see ingest_spool.py).
+def __placeholder(connection):
+    if isinstance(connection, sqlite3.Connection):
+        return "?"
+    return "%s"
 
 
 ## __insert_into_database
 # @author PICARD Michaël
-# @version 1
+# @version 2
 # @brief Insert a new row into the database
-def __insert_into_database(connection, cursor, table_name, content_dict):
+# @details With commit False, the row is part of the transaction of the
+# caller, which commits it.
+def __insert_into_database(connection, cursor, table_name, content_dict,
+                           commit=True):
     assert(len(content_dict))
 
     keys, values = list(), list()
@@ -30,10 +118,29 @@ def __insert_into_database(connection, cursor, table_name, content_dict):
     query_insert = "INSERT INTO {}({}) VALUES({})".format(
         table_name,
         ','.join(keys),
-        ','.join(["%s"] * len(values))
+        ','.join([__placeholder(connection)] * len(values))
     )
     cursor.execute(query_insert, values)
-    connection.commit()
+    if commit:
+        connection.commit()
+
+
+## __insert_many_into_database
+# @version 1
+# @brief Insert many rows into a table with a single executemany per set of
+# columns. The caller commits.
+def __insert_many_into_database(connection, cursor, table_name, content_dicts):
+    by_columns = dict()
+    for content_dict in content_dicts:
+        by_columns.setdefault(tuple(content_dict), list()).append(
+            list(content_dict.values()))
+    for keys, rows in by_columns.items():
+        query_insert = "INSERT INTO {}({}) VALUES({})".format(
+            table_name,
+            ','.join(keys),
+            ','.join([__placeholder(connection)] * len(keys))
+        )
+        cursor.executemany(query_insert, rows)
 
 
 ## __select_where_database
@@ -47,7 +154,8 @@ def __select_one_field_where_database(cursor, field_to_fetch, table_name, where_
     query_select = "SELECT {} FROM {} WHERE".format(
         field_to_fetch, table_name)
     for k, v in where_dict.items():
-        query_select = "{} {}=%s and".format(query_select, k)
+        query_select = "{} {}={} and".format(
+            query_select, k, __placeholder(cursor.connection))
         value.append(v)
     query_select = query_select[:-4]  # delete the last and
     query_select = "{} ORDER BY {} DESC".format(query_select, field_to_fetch)
@@ -56,23 +164,34 @@ def __select_one_field_where_database(cursor, field_to_fetch, table_name, where_
 
 ## __insert_if_not_exist_and_fetch_id
 # @author PICARD Michaël
-# @version 1
+# @version 2
 # @brief Return the id of a row, even if it has be insert into the method.
 # @details Try to fetch an id corresponding to the dictionary content. If it
-# fail, insert the dictionary content and retry to fetch the id.
-def __insert_if_not_exist_and_fetch_id(connection, cursor, dictionary, id_name, table_name):
+# fail, insert the dictionary content and retry to fetch the id. The ids are
+# cached: the same content never makes a second round trip.
+def __insert_if_not_exist_and_fetch_id(connection, cursor, dictionary, id_name, table_name,
+                                       commit=True):
     assert(len(dictionary))  # No empty dictionary!
 
+    cache_key = __id_cache_key(connection, table_name, dictionary)
+    with __lock:
+        if cache_key is not None and cache_key in __id_cache:
+            return __id_cache[cache_key]
+
     __select_one_field_where_database(cursor, id_name, table_name, dictionary)
     result = cursor.fetchone()
     if result is None:
-        __insert_into_database(connection, cursor, table_name, dictionary)
+        __insert_into_database(connection, cursor, table_name, dictionary,
+                               commit)
         result = cursor.lastrowid
         if result is None:
             raise NotImplementedError(
                 "Can't fetch {}.{} from database.".format(table_name, id_name))
     if type(result) is tuple:
         result = result[0]  # Should be useless, but just in case...
+    if cache_key is not None:
+        with __lock:
+            __id_cache[cache_key] = result
     return result
 
 
@@ -81,9 +200,10 @@ def __insert_if_not_exist_and_fetch_id(connection, cursor, dictionary, id_name,
 # @version 1
 # @brief If not exist, insert a new hardware configuration. Fetch the
 # corresponding hid.
-def insert_if_not_exist_and_fetch_hardware(connection, cursor, hardware):
+def insert_if_not_exist_and_fetch_hardware(connection, cursor, hardware,
+                                           commit=True):
     return __insert_if_not_exist_and_fetch_id(connection, cursor, hardware, 'hid',
-                                              'hardware_environment')
+                                              'hardware_environment', commit)
 
 
 ## insert_if_not_exist_and_fetch_software
@@ -91,17 +211,20 @@ def insert_if_not_exist_and_fetch_hardware(connection, cursor, hardware):
 # @version 1
 # @brief If not exist, insert a new software configuration. Fetch the
 # corresponding sid.
-def insert_if_not_exist_and_fetch_software(connection, cursor, software):
+def insert_if_not_exist_and_fetch_software(connection, cursor, software,
+                                           commit=True):
     return __insert_if_not_exist_and_fetch_id(connection, cursor, software, 'sid',
-                                              'software_environment')
+                                              'software_environment', commit)
 
 
 ## insert_and_fetch_compilation
 # @author PICARD Michaël
 # @version 1
 # @brief Insert new compilation result. Fetch the corresponding cid.
-def insert_and_fetch_compilation(connection, cursor, compilation):
-    __insert_into_database(connection, cursor, 'compilations', compilation)
+def insert_and_fetch_compilation(connection, cursor, compilation,
+                                 commit=True):
+    __insert_into_database(connection, cursor, 'compilations', compilation,
+                           commit)
     cid = cursor.lastrowid
     if cid is None:
         raise NotImplementedError("Can't fetch compilations.cid from database.")
@@ -132,3 +255,69 @@ def insert_boot_result(connection, cursor, boot):
 # @brief Insert additional size results.
 def insert_sizes(connection, cursor, sizes):
     __insert_into_database(connection, cursor, 'sizes', sizes)
+
+
+## insert_results_in_bulk
+# @version 1
+# @brief Insert the rows of many samples in a single transaction.
+# @details The compilations are inserted one by one, since their cid is needed,
+# and the other rows with one executemany per table. Nothing is inserted if one
+# of the rows fails.
+# @return The list of the cid of the samples.
+def insert_results_in_bulk(connection, samples):
+    """Insert the rows of many samples in a single transaction.
+
+    Each sample is a dictionary with the keys ``compilation``,
+    ``hardware``, ``software`` and the optional ones ``sizes``, ``boot``,
+    ``cid_base`` and ``incremental_level``. ``cid_base`` can be the index
+    of another sample of the list, as ``("sample", index)``, when the
+    base compilation is inserted at the same time.
+
+    :param connection: connection to the database (MySQL, or SQLite\
+    standing in for it)
+    :param samples: the samples to insert
+    :type samples: list
+    :return: the cid of each sample, in the same order
+    :rtype: list
+    """
+    cursor = connection.cursor()
+    cids = list()
+    incrementals, boots, sizes = list(), list(), list()
+    try:
+        for sample in samples:
+            compilation = dict(sample['compilation'])
+            compilation['hid'] = insert_if_not_exist_and_fetch_hardware(
+                connection, cursor, sample['hardware'], commit=False)
+            compilation['sid'] = insert_if_not_exist_and_fetch_software(
+                connection, cursor, sample['software'], commit=False)
+            cid = insert_and_fetch_compilation(connection, cursor, compilation,
+                                               commit=False)
+            cids.append(cid)
+
+            cid_base = sample.get('cid_base')
+            if isinstance(cid_base, tuple):
+                cid_base = cids[cid_base[1]]
+            if cid_base is not None:
+                incrementals.append({
+                    'cid': cid, 'cid_base': cid_base,
+                    'incremental_level': sample.get('incremental_level', 1)})
+            if sample.get('boot') is not None:
+                boots.append(dict(sample['boot'], cid=cid))
+            if sample.get('sizes') is not None:
+                sizes.append(dict(sample['sizes'], cid=cid))
+
+        __insert_many_into_database(connection, cursor,
+                                    'incrementals_compilations_relation',
+                                    incrementals)
+        __insert_many_into_database(connection, cursor, 'boot', boots)
+        __insert_many_into_database(connection, cursor, 'sizes', sizes)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        # The ids inserted by this transaction do not exist anymore
+        with __lock:
+            __id_cache.clear()
+        raise
+    finally:
+        cursor.close()
+    return cids
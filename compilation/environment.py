@@ -6,13 +6,20 @@
 # check the last report about the database for more info (or check the
 # database).
 
+import copy
+import hashlib
+import json
 import platform
 import distro
 import os
 import psutil
+import shutil
 import subprocess
 
-from compilation.settings import TUXML_VERSION
+from compilation.settings import TUXML_VERSION, ENVIRONMENT_CACHE_FILE
+
+# Environments already computed by this process, by fingerprint
+__environment_cache = dict()
 
 
 ## _get_system_details
@@ -174,17 +181,85 @@ def __get_software_details(clang_version=0):
     return software
 
 
+## __get_fingerprint
+# @version 1
+# @brief Return a fingerprint of the image and of the host, computed without
+# running any process.
+# @details The image is identified by the files the software details come from
+# (compilers, ldd, os-release), and the host by its boot id, its kernel and its
+# number of cpu.
+def __get_fingerprint(clang_version=0):
+    files = ["/etc/os-release"] + [
+        shutil.which(tool) or tool
+        for tool in ["ldd", "gcc", "clang", "clang-9"]]
+    stats = list()
+    for file in files:
+        try:
+            stat = os.stat(file)
+            stats.append([file, stat.st_ino, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            stats.append([file, None])
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as boot_id_file:
+            boot_id = boot_id_file.read().strip()
+    except OSError:
+        boot_id = None
+    identity = [TUXML_VERSION, clang_version, stats, boot_id,
+                platform.release(), os.cpu_count()]
+    return hashlib.sha1(json.dumps(identity).encode()).hexdigest()
+
+
+## __read_environment_cache
+# @version 1
+# @brief Return the environments stored in the cache file, by fingerprint.
+def __read_environment_cache():
+    try:
+        with open(ENVIRONMENT_CACHE_FILE, "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return dict()
+
+
+## __write_environment_cache
+# @version 1
+# @brief Store an environment in the cache file.
+# @details The cache is only an optimisation: failing to write it is ignored.
+def __write_environment_cache(fingerprint, environment):
+    cache = __read_environment_cache()
+    cache[fingerprint] = environment
+    try:
+        temporary_file = "{}.{}".format(ENVIRONMENT_CACHE_FILE, os.getpid())
+        with open(temporary_file, "w") as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(temporary_file, ENVIRONMENT_CACHE_FILE)
+    except OSError:
+        pass
+
+
 ## get_environment_details
 # @author LEBRETON Mickaël, PICARD Michaël
-# @version 2
+# @version 3
 # @brief Return a dictionary about the compilation environment.
-def get_environment_details(clang_version=0):
-    env = {
-        "hardware": __get_hardware_details(),
-        "software": __get_software_details(clang_version)
-    }
+# @details The environment is cached, in this process and in
+# settings.ENVIRONMENT_CACHE_FILE, by fingerprint of the image and of the host
+# (see __get_fingerprint): the probes (ldd, compilers, distro, ...) are only run
+# once per container.
+def get_environment_details(clang_version=0, use_cache=True):
+    if not use_cache:
+        return {
+            "hardware": __get_hardware_details(),
+            "software": __get_software_details(clang_version)
+        }
+
+    fingerprint = __get_fingerprint(clang_version)
+    if fingerprint not in __environment_cache:
+        env = __read_environment_cache().get(fingerprint)
+        if env is None:
+            env = get_environment_details(clang_version, use_cache=False)
+            __write_environment_cache(fingerprint, env)
+        __environment_cache[fingerprint] = env
 
-    return env
+    return copy.deepcopy(__environment_cache[fingerprint])
 
 
 ## print_environment_details
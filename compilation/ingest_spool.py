@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+
+"""Load results into the database, in bulk
+
+The results stored by TuxML, in spools (see `ResultSpool
+<result_spool.html>`_, e.g. retrieved by ``kernel_generator.py`` in the
+``Spool`` directory) or in JSON files (``--json``), are converted into the
+rows of the database and inserted by batch, each batch in a single
+transaction (see `insert_results_in_bulk <database_management.html>`_).
+The encoded configurations (see `config_codec <config_codec.html>`_) are
+decoded with the tables of ``--codec_directory``.
+
+The rows go to the MySQL database of the settings, or to a SQLite file
+standing in for it with ``--sqlite``::
+
+    python3 -m compilation.ingest_spool Spool/*.db --sqlite results.db \\
+        --codec_directory Spool/config_codecs
+
+:version: 1
+"""
+# @file ingest_spool.py
+
+import argparse
+import base64
+import bz2
+import json
+import sqlite3
+import time
+
+import compilation.settings as settings
+from compilation.config_codec import decode_config
+from compilation.database_management import fetch_connection_to_database, \
+    release_connection_to_database, insert_results_in_bulk
+from compilation.log_compression import decompress_log
+from compilation.result_spool import ResultSpool
+
+HARDWARE_COLUMNS = ["cpu_brand_name", "cpu_max_frequency", "ram_size",
+                    "architecture", "number_cpu_core", "mechanical_disk"]
+SOFTWARE_COLUMNS = ["tuxml_version", "libc_version", "compiler_version",
+                    "system_kernel", "linux_distribution",
+                    "linux_distribution_version", "system_kernel_version"]
+COMPILATION_COLUMNS = ["compilation_date", "compilation_time", "config_file",
+                       "stdout_log_file", "stderr_log_file",
+                       "user_output_file", "compiled_kernel_size",
+                       "compressed_compiled_kernel_size", "dependencies",
+                       "number_cpu_core_used", "compiled_kernel_version"]
+SIZES_COLUMNS = ["size_vmlinux", "size_report_builtin",
+                 "size_report_builtin_coarse"]
+_LOG_COLUMNS = ["stdout_log_file", "stderr_log_file", "user_output_file"]
+
+
+## parser
+# @brief Parse the commandline and return the parsed argument.
+def parser():
+    parser = argparse.ArgumentParser(
+        description="Load the results of spools (.db) or JSON files into "
+                    "the database, by batch."
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="Spools (.db) or JSON files to load."
+    )
+    parser.add_argument(
+        "--sqlite",
+        default=None,
+        help="Optional. Load into this SQLite file instead of the MySQL "
+             "database of the settings. The tables are created if needed."
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1000,
+        help="Optional. Number of results per transaction. Default to 1000."
+    )
+    parser.add_argument(
+        "--codec_directory",
+        default=settings.CONFIG_CODEC_DIRECTORY,
+        help="Optional. Directory of the tables of the encoded "
+             "configurations. Default to {}.".format(
+                 settings.CONFIG_CODEC_DIRECTORY)
+    )
+    parser.add_argument(
+        "--pending_only",
+        action="store_true",
+        help="Optional. Only load the results of the spools that were not "
+             "accepted by the API."
+    )
+    return parser.parse_args()
+
+
+## create_sqlite_tables
+# @brief Create the tables of the database in a SQLite file.
+def create_sqlite_tables(connection):
+    """Create, if needed, the tables of the database in a SQLite file
+    standing in for the MySQL one.
+
+    :param connection: connection to the SQLite file
+    :type connection: `sqlite3.Connection`_
+
+    .. _sqlite3.Connection: https://docs.python.org/3/library/sqlite3.html#connection-objects
+    """
+    tables = {
+        'hardware_environment': ["hid INTEGER PRIMARY KEY AUTOINCREMENT"]
+        + HARDWARE_COLUMNS,
+        'software_environment': ["sid INTEGER PRIMARY KEY AUTOINCREMENT"]
+        + SOFTWARE_COLUMNS,
+        'compilations': ["cid INTEGER PRIMARY KEY AUTOINCREMENT", "hid",
+                         "sid"] + COMPILATION_COLUMNS,
+        'incrementals_compilations_relation': ["cid", "cid_base",
+                                               "incremental_level"],
+        'boot': ["cid", "boot_time", "boot_log_file"],
+        'sizes': ["cid"] + SIZES_COLUMNS
+    }
+    with connection:
+        for table_name, columns in tables.items():
+            connection.execute("CREATE TABLE IF NOT EXISTS {}({})".format(
+                table_name, ", ".join(columns)))
+
+
+## __compressed_log
+# @brief Return a log of a result compressed with bz2, as in the database.
+def __compressed_log(record, name):
+    log = record.get(name)
+    if log is None:
+        return bz2.compress(b"")
+    if 'log_compression' not in record:
+        return bz2.compress(log.encode())
+    log = base64.b64decode(log)
+    if record['log_compression'] == "bz2":
+        return log
+    return bz2.compress(decompress_log(log, record['log_compression']))
+
+
+## record_to_sample
+# @brief Convert a result, as sent to the API, into the rows of the database.
+def record_to_sample(record, codec_directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Convert a result, as sent to the API, into the rows of the
+    database (See `insert_results_in_bulk <database_management.html>`_).
+
+    :param record: the result
+    :type record: dict
+    :param codec_directory: directory of the tables of the encoded\
+    configurations
+    :type codec_directory: str
+    :return: the sample
+    :rtype: dict
+    """
+    compilation = {column: record.get(column)
+                   for column in COMPILATION_COLUMNS}
+    config = record.get('config_file') or ""
+    if record.get('config_encoding') is not None:
+        config = decode_config(config, codec_directory)
+    compilation['config_file'] = bz2.compress(config.encode())
+    for name in _LOG_COLUMNS:
+        compilation[name] = __compressed_log(record, name)
+    sample = {
+        'compilation': compilation,
+        'hardware': {column: record.get(column)
+                     for column in HARDWARE_COLUMNS},
+        'software': {column: record.get(column)
+                     for column in SOFTWARE_COLUMNS},
+        'sizes': None,
+        'boot': None,
+        'cid_base': record.get('cid_base'),
+        'incremental_level': record.get('incremental_level', 1)
+    }
+    if record.get('boot_result') is not None:
+        sample['boot'] = {
+            'boot_time': record['boot_result']['boot_time'],
+            'boot_log_file': bz2.compress(
+                record['boot_result']['boot_log_file'].encode())
+        }
+    if record.get('size_vmlinux', -2) != -2:
+        sample['sizes'] = {column: record.get(column)
+                           for column in SIZES_COLUMNS}
+    return sample
+
+
+## read_records
+# @brief Yield the (cid given by the API, record) of the results of the files.
+def read_records(files, pending_only=False):
+    for file in files:
+        if file.endswith(".json"):
+            with open(file, "r") as json_file:
+                record = json.load(json_file)
+            if not pending_only or not record.get('cid'):
+                yield record.get('cid') or None, record
+            continue
+        spool = ResultSpool(file)
+        try:
+            for _, record, cid in spool.records(pending_only):
+                yield cid, record
+        finally:
+            spool.close()
+
+
+## ingest
+# @brief Insert the results by batch and return the number of results.
+def ingest(connection, records, batch_size=1000,
+           codec_directory=settings.CONFIG_CODEC_DIRECTORY):
+    """Insert the results, each batch in a single transaction. The
+    incremental compilations are linked to their base compilation when it
+    is loaded too.
+
+    :param connection: connection to the database
+    :param records: iterator of ``(cid given by the API, record)``
+    :type records: iterator
+    :param batch_size: number of results per transaction
+    :type batch_size: int
+    :param codec_directory: directory of the tables of the encoded\
+    configurations
+    :type codec_directory: str
+    :return: number of results inserted
+    :rtype: int
+    """
+    # cid given by the API -> cid in this database
+    cids = dict()
+    number = 0
+    batch = list()
+
+    def insert_batch():
+        samples, api_cids = list(), list()
+        batch_indexes = dict()
+        for api_cid, record in batch:
+            sample = record_to_sample(record, codec_directory)
+            base = sample['cid_base']
+            if base in batch_indexes:
+                sample['cid_base'] = ("sample", batch_indexes[base])
+            else:
+                sample['cid_base'] = cids.get(base)
+            if api_cid is not None:
+                batch_indexes[api_cid] = len(samples)
+            samples.append(sample)
+            api_cids.append(api_cid)
+        for api_cid, cid in zip(api_cids,
+                                insert_results_in_bulk(connection, samples)):
+            if api_cid is not None:
+                cids[api_cid] = cid
+
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            insert_batch()
+            number += len(batch)
+            batch = list()
+    if batch:
+        insert_batch()
+        number += len(batch)
+    return number
+
+
+if __name__ == "__main__":
+    args = parser()
+    if args.sqlite is not None:
+        connection = sqlite3.connect(args.sqlite)
+        create_sqlite_tables(connection)
+    else:
+        connection = fetch_connection_to_database(
+            settings.IP_BDD,
+            settings.USERNAME_BDD,
+            settings.PASSWORD_USERNAME_BDD,
+            settings.NAME_BDD)
+    start = time.time()
+    number = ingest(connection,
+                    read_records(args.files, args.pending_only),
+                    args.batch_size, args.codec_directory)
+    elapsed_time = time.time() - start
+    print("{} result(s) loaded in {:.2f} s ({:.0f} results/s).".format(
+        number, elapsed_time, number / elapsed_time if elapsed_time else 0))
+    if args.sqlite is not None:
+        connection.close()
+    else:
+        release_connection_to_database(connection)
@@ -0,0 +1,175 @@
+"""Streaming compression of the log files
+
+Each log file is followed by a ``LogCompressor``: the bytes appended to
+the file since the previous call are compressed, so the whole file is
+never read again nor held in memory. The bytes written directly into the
+file by a subprocess are compressed as well.
+
+The codecs are ``bz2`` (the default, as stored in the database), ``lzma``
+and ``zstd``, which needs the optional ``zstandard`` package.
+
+:version: 1
+"""
+# @file log_compression.py
+
+import bz2
+import lzma
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+## LOG_CODECS
+# @brief Names of the available codecs.
+LOG_CODECS = ["bz2", "lzma"] + (["zstd"] if zstandard is not None else [])
+
+# Size of the blocks read from the followed file
+_BLOCK_SIZE = 1 << 20
+
+
+## _create_compressor
+# @brief Return a new compressor object of the given codec, with the
+# compress/flush interface of bz2.BZ2Compressor.
+def _create_compressor(codec):
+    if codec == "bz2":
+        return bz2.BZ2Compressor(9)
+    if codec == "lzma":
+        return lzma.LZMACompressor(preset=6)
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compressobj()
+    raise ValueError("Unknown or unavailable log codec {}.".format(codec))
+
+
+## compress_log
+# @brief Return data compressed with the given codec, in a single stream.
+def compress_log(data, codec="bz2"):
+    """Compress a log at once, e.g. a part of a log file.
+
+    :param data: the log
+    :type data: bytes
+    :param codec: one of :py:data:`LOG_CODECS`
+    :type codec: str
+    :return: the compressed log, to decompress with\
+    :py:func:`decompress_log`
+    :rtype: bytes
+    """
+    compressor = _create_compressor(codec)
+    return compressor.compress(data) + compressor.flush()
+
+
+## decompress_log
+# @brief Return the content of a log compressed with the given codec.
+def decompress_log(data, codec="bz2"):
+    """Decompress a log compressed by a ``LogCompressor``, made of one or
+    more compressed streams.
+
+    :param data: the compressed log
+    :type data: bytes
+    :param codec: codec of the log
+    :type codec: str
+    :return: the log
+    :rtype: bytes
+    """
+    if codec == "bz2":
+        return bz2.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    if codec == "zstd" and zstandard is not None:
+        content = bytearray()
+        while data:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            content.extend(decompressor.decompress(data))
+            data = decompressor.unused_data
+        return bytes(content)
+    raise ValueError("Unknown or unavailable log codec {}.".format(codec))
+
+
+## LogCompressor
+# @brief Compress a log file as it grows.
+# @details The compressed log is a sequence of complete streams: one per call
+# of get_compressed that found new bytes. It is decompressed as a whole by
+# decompress_log, and by the bz2 and xz tools.
+class LogCompressor:
+    """Compresses a log file as it grows.
+
+    ``update`` compresses the bytes appended to the file since the
+    previous call. ``get_compressed`` gives the compressed content of the
+    whole file, without compressing it again.
+
+    :param path: path to the followed log file
+    :type path: str
+    :param codec: one of :py:data:`LOG_CODECS`
+    :type codec: str
+    """
+    def __init__(self, path, codec="bz2"):
+        self.__path = path
+        self.__codec = codec
+        self.__lock = threading.Lock()
+        self.__reset()
+
+    def __reset(self):
+        self.__offset = 0
+        self.__streams = bytearray()
+        self.__compressor = None
+        self.__pending = bytearray()
+
+    ## reset
+    # @brief Forget the compressed content, when the log file is cleared.
+    def reset(self):
+        """Forget the compressed content, when the followed file is
+        cleared.
+
+        """
+        with self.__lock:
+            self.__reset()
+
+    ## update
+    # @brief Compress the bytes appended to the file since the last call.
+    def update(self):
+        """Compress the bytes appended to the followed file since the
+        previous call.
+
+        """
+        with self.__lock:
+            self.__update()
+
+    def __update(self):
+        try:
+            with open(self.__path, "rb") as log:
+                log.seek(self.__offset)
+                for block in iter(lambda: log.read(_BLOCK_SIZE), b""):
+                    self.__offset += len(block)
+                    if self.__compressor is None:
+                        self.__compressor = _create_compressor(self.__codec)
+                    self.__pending.extend(self.__compressor.compress(block))
+        except FileNotFoundError:
+            pass
+
+    ## get_compressed
+    # @brief Return the compressed content of the whole file.
+    def get_compressed(self):
+        """Gives the compressed content of the followed file, up to now.
+
+        :return: the compressed log, to decompress with\
+        :py:func:`decompress_log`
+        :rtype: bytes
+        """
+        with self.__lock:
+            self.__update()
+            if self.__compressor is not None:
+                self.__pending.extend(self.__compressor.flush())
+                self.__streams.extend(self.__pending)
+                self.__compressor = None
+                self.__pending = bytearray()
+            return bytes(self.__streams)
+
+    ## get_codec
+    def get_codec(self):
+        """Gives the codec of the compressed log
+
+        :return: codec name
+        :rtype: str
+        """
+        return self.__codec
@@ -0,0 +1,126 @@
+"""Retention policy of the logs sent with the results
+
+The logs of a successful compilation are seldom read, but they make most
+of the size of a result. The policy chooses what is kept of the user
+output, stdout and stderr logs before serializing the result:
+
+* ``full``: the whole logs;
+* ``tail``: the last lines of each log;
+* ``errors``: the lines reporting an error only;
+* ``none_on_success``: nothing when the compilation is successful, the
+  whole logs otherwise.
+
+The whole logs stay available with ``kernel_generator.py --logs``.
+
+:version: 1
+"""
+# @file log_retention.py
+
+import os
+import re
+
+from compilation.log_compression import compress_log
+
+## LOG_RETENTION_POLICIES
+# @brief Names of the policies.
+LOG_RETENTION_POLICIES = ["full", "tail", "errors", "none_on_success"]
+
+_ERROR_PATTERN = re.compile(rb"error|\*\*\*", re.IGNORECASE)
+
+# Size of the blocks read backward from the end of a log
+_BLOCK_SIZE = 1 << 16
+
+
+## __tail
+# @brief Return the last lines of a file, reading it from its end.
+def __tail(path, lines):
+    with open(path, "rb") as log:
+        log.seek(0, os.SEEK_END)
+        position = log.tell()
+        content = b""
+        # one more newline than lines: the one ending the last line
+        while position > 0 and content.count(b"\n") <= lines:
+            size = min(_BLOCK_SIZE, position)
+            position -= size
+            log.seek(position)
+            content = log.read(size) + content
+    return b"".join(content.splitlines(keepends=True)[-lines:]) \
+        if lines > 0 else b""
+
+
+## __errors
+# @brief Return the lines of a file reporting an error.
+def __errors(path):
+    with open(path, "rb") as log:
+        return b"".join(line for line in log if _ERROR_PATTERN.search(line))
+
+
+## __read
+def __read(path):
+    with open(path, "rb") as log:
+        return log.read()
+
+
+## is_log_retention_full
+# @brief Return True if the policy keeps the whole logs of a compilation.
+def is_log_retention_full(policy, success):
+    """Tell if the policy keeps the whole logs of a compilation.
+
+    :param policy: one of :py:data:`LOG_RETENTION_POLICIES`
+    :type policy: str
+    :param success: the compilation is successful
+    :type success: bool
+    :rtype: bool
+    """
+    return policy == "full" or (policy == "none_on_success" and not success)
+
+
+## get_retained_logs
+# @brief Return what the policy keeps of the user output, stdout and stderr
+# logs.
+def get_retained_logs(logger, success, policy="full", tail_lines=200,
+                      compressed=True):
+    """Gives what the policy keeps of the logs of a compilation.
+
+    :param logger: the logger
+    :type logger: `Logger <logger.html>`_
+    :param success: the compilation is successful
+    :type success: bool
+    :param policy: one of :py:data:`LOG_RETENTION_POLICIES`
+    :type policy: str
+    :param tail_lines: number of lines kept by the ``tail`` policy
+    :type tail_lines: int
+    :param compressed: compress the logs with the codec of the logger
+    :type compressed: bool
+    :return: ``{'user_output_file': log, 'stdout_log_file': log,\
+    'stderr_log_file': log}``, each log being compressed bytes, or a\
+    string if not compressed
+    :rtype: dict
+    """
+    if policy not in LOG_RETENTION_POLICIES:
+        raise ValueError("Unknown log retention policy {}.".format(policy))
+
+    # The whole logs are already compressed, see log_compression.py
+    if compressed and is_log_retention_full(policy, success):
+        return logger.get_compressed_logs()
+
+    paths = {
+        'user_output_file': logger.get_user_output_file(),
+        'stdout_log_file': logger.get_stdout_file(),
+        'stderr_log_file': logger.get_stderr_file()
+    }
+    logs = dict()
+    for name, path in paths.items():
+        if is_log_retention_full(policy, success):
+            log = __read(path)
+        elif policy == "tail":
+            log = __tail(path, tail_lines)
+        elif policy == "errors":
+            log = __errors(path)
+        else:
+            log = b""
+        if compressed:
+            logs[name] = compress_log(log, logger.get_log_compression())
+        else:
+            logs[name] = log.decode(errors="replace")
+    return logs
@@ -6,6 +6,8 @@
 import time
 import inspect
 
+from compilation.log_compression import LogCompressor
+
 COLOR_SUCCESS = "\033[38;5;10m"
 COLOR_ERROR = "\033[38;5;9m"
 COLOR_DEFAULT = "\033[0m"
@@ -24,6 +26,7 @@ _COLOR_TIME = "\033[38;5;12m"
 # - stderr : stderr of subprocess compilation
 # If silent is True, each message pass to the user output is write in the file,
 # but not display.
+# The three files are compressed as they grow (see log_compression.py).
 class Logger:
     """A wrapper object that manages all the output.
 
@@ -36,6 +39,9 @@ class Logger:
     If ``silent`` is True, each message pass to the user output is
     written in the file, but not display.
 
+    The three files are compressed as they grow (see `LogCompressor
+    <log_compression.html>`_).
+
     :param user_output_file: path to the file to redirect the user's\
                              output
     :type user_output_file: str
@@ -48,10 +54,13 @@ class Logger:
     :type boot_file: str
     :param silent: non verbose option. Default False
     :type silent: bool
+    :param log_compression: codec of the compressed logs. Default\
+    ``"bz2"``
+    :type log_compression: str
 
     """
     def __init__(self, user_output_file, stdout_file, stderr_file,
-                 boot_file, silent=False):
+                 boot_file, silent=False, log_compression="bz2"):
         """Constructor method
         """
         self.__user_output_file = user_output_file
@@ -63,6 +72,13 @@ class Logger:
         self.__stderr = open(stderr_file, mode='w')
         self.__boot = open(boot_file, mode='w')
         self.__silent = silent
+        self.__compressors = {
+            'user_output_file': LogCompressor(user_output_file,
+                                              log_compression),
+            'stdout_log_file': LogCompressor(stdout_file, log_compression),
+            'stderr_log_file': LogCompressor(stderr_file, log_compression)
+        }
+        self.__log_compression = log_compression
 
     ## get_stdout_pipe
     # @author PICARD Michaël
@@ -167,6 +183,18 @@ class Logger:
             date, calling_function, message, end))
         self.__output.flush()
 
+    ## reset_output_pipe
+    # @version 1
+    # @brief Clear the user output file.
+    def reset_output_pipe(self):
+        """Clear the user output file, e.g. between two independent
+        compilations
+
+        """
+        self.__output.close()
+        self.__output = open(self.__user_output_file, 'w')
+        self.__compressors['user_output_file'].reset()
+
     ## reset_stdout_pipe
     # @author PICARD Michaël
     # @version 1
@@ -177,6 +205,7 @@ class Logger:
         """
         self.__stdout.close()
         self.__stdout = open(self.__stdout_file, 'w')
+        self.__compressors['stdout_log_file'].reset()
 
     ## reset_stderr_pipe
     # @author PICARD Michaël
@@ -188,6 +217,7 @@ class Logger:
         """        
         self.__stderr.close()
         self.__stderr = open(self.__stderr_file, 'w')
+        self.__compressors['stderr_log_file'].reset()
 
     ## reset_boot_pipe
     # @author PICARD Michaël
@@ -197,8 +227,8 @@ class Logger:
         """Clear the file that contains the boot messages output
 
         """
-        self.__stderr.close()
-        self.__stderr = open(self.__boot_file, 'w')
+        self.__boot.close()
+        self.__boot = open(self.__boot_file, 'w')
 
     ## get_stdout_file
     # @author PICARD Michaël
@@ -248,6 +278,54 @@ class Logger:
         """
         return self.__boot_file
 
+    ## compress_stdout
+    # @version 1
+    # @brief Compress what was written in the stdout file since the last call.
+    def compress_stdout(self):
+        """Compress what was written in ``stdout`` file since the previous
+        call
+
+        """
+        self.__compressors['stdout_log_file'].update()
+
+    ## compress_stderr
+    # @version 1
+    # @brief Compress what was written in the stderr file since the last call.
+    def compress_stderr(self):
+        """Compress what was written in ``stderr`` file since the previous
+        call
+
+        """
+        self.__compressors['stderr_log_file'].update()
+
+    ## get_compressed_logs
+    # @version 1
+    # @brief Return the compressed content of the user output, stdout and
+    # stderr files.
+    def get_compressed_logs(self):
+        """Gives the compressed content of the log files, only compressing
+        what was written since the previous call.
+
+        :return: ``{'user_output_file': bytes, 'stdout_log_file': bytes,\
+        'stderr_log_file': bytes}``
+        :rtype: dict
+        """
+        for pipe in [self.__output, self.__stdout, self.__stderr]:
+            pipe.flush()
+        return {name: compressor.get_compressed()
+                for name, compressor in self.__compressors.items()}
+
+    ## get_log_compression
+    # @version 1
+    # @brief Return the codec of the compressed logs.
+    def get_log_compression(self):
+        """Gives the codec of the compressed logs
+
+        :return: codec name
+        :rtype: str
+        """
+        return self.__log_compression
+
     # Assure that when deleting logger object, all file are closed.
     def __del__(self):
         """Close every previously opened streams
@@ -4,17 +4,25 @@ import argparse
 import os
 import shutil
 import subprocess
+import time
+import base64
 import bz2
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from compilation.apiManager import APIManager
+from compilation.apiManager import APIManager, Uploader
 from compilation.environment import get_environment_details, print_environment_details
 from compilation.configuration import create_configuration, print_configuration
 from compilation.package_manager import PackageManager
 from compilation.logger import Logger, COLOR_SUCCESS, COLOR_ERROR
 from compilation.compiler import Compiler
 from compilation.boot_checker import BootChecker
-from compilation.database_management import fetch_connection_to_database, insert_if_not_exist_and_fetch_hardware, insert_if_not_exist_and_fetch_software, insert_and_fetch_compilation, insert_incrementals_compilation, insert_boot_result, insert_sizes
+from compilation.boot_farm import BootFarm
+from compilation.size_report import get_size_report, format_size_vmlinux, format_size_report, format_size_report_coarse
+from compilation.size_schema import sizes_record
+from compilation.config_codec import get_config_codec
+from compilation.log_retention import LOG_RETENTION_POLICIES, get_retained_logs, is_log_retention_full
+from compilation.database_management import fetch_connection_to_database, release_connection_to_database, insert_results_in_bulk
 import compilation.settings as settings
 
 
@@ -60,6 +68,15 @@ def parser():
         help="Give a path to specific configuration file. Incompatible with "
              "--tiny argument."
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Optional. Seed of the random configuration (KCONFIG_SEED), "
+             "to generate it again. The incremental compilations use the "
+             "next seeds, and so do the jobs added with --worker_jobs. "
+             "Default to a new one, stored with the result."
+    )
     parser.add_argument(
         "--clang_version",
         type=int,
@@ -90,6 +107,77 @@ def parser():
         action="store_true",
         help="Serialize into a JSON file with informations about the build."
     )
+    parser.add_argument(
+        "--ccache",
+        action="store_true",
+        help="Optional. Compile through ccache, using the cache directory "
+             "mounted by kernel_generator.py."
+    )
+    parser.add_argument(
+        "--api_address",
+        type=str,
+        default=None,
+        help="Optional. Address of the TuxML API to send the results to, "
+             "e.g. a local one on a node without access to the default one."
+    )
+    parser.add_argument(
+        "--log_retention",
+        choices=LOG_RETENTION_POLICIES,
+        default=settings.LOG_RETENTION,
+        help="Optional. What is sent of the logs: full, tail (the last "
+             "--log_tail_lines lines), errors (the error lines only) or "
+             "none_on_success. The whole logs are kept in the logs "
+             "directory. Default to {}.".format(settings.LOG_RETENTION)
+    )
+    parser.add_argument(
+        "--log_tail_lines",
+        type=int,
+        default=settings.LOG_RETENTION_TAIL_LINES,
+        help="Optional. Number of lines kept of each log with "
+             "--log_retention tail."
+    )
+    parser.add_argument(
+        "--worker",
+        metavar="QUEUE_DIRECTORY",
+        default=None,
+        help="Optional. Stay alive and build, one after the other, the jobs "
+             "of the queue directory: configuration files (.config) or JSON "
+             "files with the optional keys \"config\", \"tiny\", "
+             "\"tagbuild\" and \"seed\". The result of each job is written in the done "
+             "subdirectory. Incompatible with incremental compilations."
+    )
+    parser.add_argument(
+        "--worker_jobs",
+        type=int,
+        default=0,
+        help="Optional. With --worker, first add this number of jobs to the "
+             "queue, built with the --tiny, --config and --tagbuild "
+             "arguments."
+    )
+    parser.add_argument(
+        "--worker_parallel",
+        type=int,
+        default=1,
+        help="Optional. With --worker, number of jobs built at the same time "
+             "out of the kernel tree, each one in its own directory of {} "
+             "with its share of the cpu cores. Default to 1.".format(
+                 settings.BUILD_DIRECTORY)
+    )
+    parser.add_argument(
+        "--output_directory",
+        default=None,
+        help="Optional. Build out of the kernel tree (make O=), in this "
+             "directory. The kernel tree is left untouched, e.g. when it is "
+             "shared and mounted read-only."
+    )
+    parser.add_argument(
+        "--worker_timeout",
+        type=float,
+        default=0,
+        help="Optional. With --worker, seconds to wait for new jobs once the "
+             "queue is empty. Default to 0, which means stopping as soon as "
+             "the queue is empty."
+    )
     parser.add_argument(
         "--mount_host_dev",
         action="store_true",
@@ -111,30 +199,40 @@ def parser():
         const='x86_64',
         help="Optional and experimental. Enables to set a specific architecture, default is x86_64"
     )
-    
-    return parser.parse_args()
+
+    args = parser.parse_args()
+    if args.worker is not None and args.incremental > 0:
+        raise NotImplementedError(
+            "You can't use worker and incremental at the same time."
+        )
+    return args
 
 
 ## create_logger
 # @author PICARD Michaël
 # @version 1
 # @brief Create the logger object and return it.
-def create_logger(silent):
+def create_logger(silent, log_directory=None):
     """Creates an object logger
 
+    :param silent: non verbose option
+    :type silent: bool
+    :param log_directory: directory of the log files. Default to None,\
+    which means ``settings.LOG_DIRECTORY``.
+    :type log_directory: str
     :return: the created object logger
     :rtype: `Logger`_
 
     .. _Logger: logger.html
 
     """
-    return Logger(
-        settings.OUTPUT_FILE,
-        settings.STDOUT_FILE,
-        settings.STDERR_FILE,
-        settings.BOOT_FILE,
-        silent
-    )
+    files = [settings.OUTPUT_FILE, settings.STDOUT_FILE,
+             settings.STDERR_FILE, settings.BOOT_FILE]
+    if log_directory is not None:
+        os.makedirs(log_directory, exist_ok=True)
+        files = [os.path.join(log_directory, os.path.basename(file))
+                 for file in files]
+    return Logger(*files, silent, settings.LOG_COMPRESSION)
 
 
 ## retrieve_and_display_environment
@@ -182,8 +280,10 @@ def retrieve_and_display_configuration(logger, args):
 
 ## retrieve_sizes
 # @author SAFFRAY Paul
-# @version 1
-# @brief Retrieve the additional sizes with more specific commands
+# @version 2
+# @brief Retrieve the additional sizes of vmlinux and of each subsystem
+# @details The ELF and ar files are read directly (see size_report.py), in a
+# single pass, instead of running size on each of them.
 def retrieve_sizes(path, kernel_version):
     """Retrieve additional sizes
 
@@ -192,16 +292,11 @@ def retrieve_sizes(path, kernel_version):
     :param kernel_version: version of the compiled Linux kernel to\
     retrieve the size from
     :type kernel_version: str
-    :return: info about the retrieved sizes
+    :return: info about the retrieved sizes: the text reports and the\
+    structured one (``size_report``, see\
+    `get_size_report <size_report.html>`_)
     :rtype: dict
     """
-    sizes_result = {}
-    sizes_result['size_vmlinux'] = subprocess.run(['size {}/vmlinux'.format(path)], shell=True, stdout=subprocess.PIPE).stdout.decode('utf-8')
-
-    # too much (deprecated)
-    # sizes_result['nm_size_vmlinux'] = bz2.compress(
-    #                                subprocess.run(["nm --size -r {}/vmlinux | sed 's/^[0]*//'".format(path)], shell=True, stdout=subprocess.PIPE).stdout)
-
     kversion = kernel_version.split(".") # eg 4.16 will give [4, 16]
     major = int(kversion[0]) # 4
     if len(kversion) >= 2:        
@@ -215,15 +310,12 @@ def retrieve_sizes(path, kernel_version):
     else:
         builtin="built-in.o"
 
-    # size_report should be preferred (some might be deprecated in the future)
-    # limitation: does not include totals per built-in (deprecated)
-    # sizebuilt1 = subprocess.run(['size {}/*/{}'.format(path, builtin)], shell=True, stdout=subprocess.PIPE).stdout.decode('utf-8') 
-    # sizebuilt2 = subprocess.run(['size {}/arch/*/{}'.format(path, builtin)], shell=True, stdout=subprocess.PIPE).stdout.decode('utf-8') 
-    # sizes_result['size_builtin'] = sizebuilt1 + "\n" + sizebuilt2
-
-    # two arguments for the bash scripts: path and kind of built-in (.a or .o)
-    sizes_result['size_report_builtin'] = subprocess.run(['bash {} {} {}'.format(settings.SIZE_REPORT_FILE, path, builtin)], shell=True, stdout=subprocess.PIPE).stdout.decode('utf-8') # full report 
-    sizes_result['size_report_builtin_coarse'] = subprocess.run(['bash {} {} {}'.format(settings.SIZE_REPORT_COARSE_FILE, path, builtin)], shell=True, stdout=subprocess.PIPE).stdout.decode('utf-8') # coarse grained report (rough summary)
+    report = get_size_report(path, builtin)
+    sizes_result = {}
+    sizes_result['size_report'] = report
+    sizes_result['size_vmlinux'] = format_size_vmlinux(report, path)
+    sizes_result['size_report_builtin'] = format_size_report(report, path, builtin) # full report 
+    sizes_result['size_report_builtin_coarse'] = format_size_report_coarse(report, path, builtin) # coarse grained report (rough summary)
     return sizes_result
 
 
@@ -237,7 +329,11 @@ def retrieve_sizes(path, kernel_version):
 # it should be called multiple time for multiple compilation.
 def run(boot, check_size, logger, configuration, environment,
         package_manager, tiny=False, config_file=None,
-        cid_before=None, json_bool=False, clang_version=0, tagbuild=None, arch='x86_64'):
+        cid_before=None, json_bool=False, clang_version=0, tagbuild=None, arch='x86_64',
+        ccache=False, incremental_level=0, uploader=None, boot_farm=None,
+        log_retention=settings.LOG_RETENTION,
+        log_tail_lines=settings.LOG_RETENTION_TAIL_LINES, json_filename=None,
+        output_path=None, seed=None, log_archive_name=None):
     """Do all the tests, from compilation to sending the results to the
     database.
 
@@ -263,13 +359,49 @@ def run(boot, check_size, logger, configuration, environment,
     :type tiny: bool
     :param config_file: path to a configuration file
     :type config_file: str
-    :param cid_before:
-    :type cid_before:
+    :param cid_before: cid (or future of the cid) of the base compilation,\
+    for an incremental compilation
+    :type cid_before: int
     :param clang_version: Clang version to use. 0 to use GCC. Only 9 and 11 are
         supported on Debian 11.
     :type clang_version: int
     :type tag: str
+    :param ccache: compile through ccache
+    :type ccache: bool
+    :param incremental_level: number of the incremental compilation since\
+    the base one. 0 for the base compilation.
+    :type incremental_level: int
+    :param uploader: uploader sending the results to the API in\
+    background. Default to None, which means the result is sent before\
+    returning.
+    :type uploader: `Uploader <apiManager.html>`_
+    :param boot_farm: boot farm booting the kernel in background. Default\
+    to None, which means the kernel is booted before returning.
+    :type boot_farm: `BootFarm <boot_farm.html>`_
+    :param log_retention: what is sent of the logs (See\
+    `log_retention <log_retention.html>`_)
+    :type log_retention: str
+    :param log_tail_lines: number of lines kept of each log with the\
+    ``tail`` policy
+    :type log_tail_lines: int
+    :param json_filename: path to the JSON file to create (if asked).\
+    Default to None, which means the default one of the build.
+    :type json_filename: str
+    :param output_path: directory of the built files (``make O=``).\
+    Default to None, which means building in the kernel tree.
+    :type output_path: str
+    :param seed: seed of the random configuration. Default to None, which\
+    means a new one.
+    :type seed: int
+    :param log_archive_name: name of the directory of the log directory\
+    where the whole logs are kept when they are not all sent (See\
+    :py:func:`archive_log`). Default to None, which means\
+    ``build_<incremental_level>``.
+    :type log_archive_name: str
+    :return: future of the cid given by the API (0 on failure)
+    :rtype: `concurrent.futures.Future`_
 
+    .. _concurrent.futures.Future: https://docs.python.org/3/library/concurrent.futures.html#future-objects
     """
     compiler_exec = 'gcc'
     if clang_version == 9:
@@ -286,7 +418,10 @@ def run(boot, check_size, logger, configuration, environment,
         tiny=tiny,
         config_file=config_file,
         compiler_exec=compiler_exec, 
-        arch=arch # TODO: save the information in the JSON/database
+        arch=arch, # TODO: save the information in the JSON/database
+        ccache=ccache,
+        output_path=output_path,
+        seed=seed
     )
 
     compiler.run()
@@ -295,32 +430,46 @@ def run(boot, check_size, logger, configuration, environment,
     compilation_result = compiler.get_compilation_dictionary()
     environmenthard = environment['hardware']
     environmentsoft = environment["software"]
-  
+    # vmlinux and the bzImage are in the output directory, if any
+    build_path = compiler.get_output_path()
 
 
     boot_result = None
     # by default size report is not performed
-    sizes_result = {'size_vmlinux': -2, 'size_report_builtin': None, 'size_report_builtin_coarse': None}  
+    sizes_result = {'size_vmlinux': -2, 'size_report_builtin': None, 'size_report_builtin_coarse': None, 'size_report': None}  
     if compiler.is_successful():
         if check_size:
-            sizes_result = retrieve_sizes(configuration['kernel_path'], configuration['kernel_version_compilation']) 
-        if boot:
-            boot_checker = BootChecker(logger, configuration['kernel_path'])
+            sizes_result = retrieve_sizes(build_path, configuration['kernel_version_compilation']) 
+        if boot and boot_farm is not None:
+            # resolved by the uploader before sending the result
+            boot_result = boot_record_future(logger,
+                                             boot_farm.submit(build_path))
+        elif boot:
+            boot_checker = BootChecker(logger, build_path)
             boot_checker.run()
-            boot_result = boot_checker.get_boot_dictionary()
+            boot_result = boot_record(boot_checker.get_boot_dictionary())
         else:
             logger.reset_boot_pipe()
 
-    cid = 0
     tagbuild_str = ""
     if tagbuild:
         tagbuild_str = ' '.join(tagbuild)
 
     # may happen that config file generation fails
     try:
-        configfile = open("{}/.config".format(compiler.get_kernel_path()), "r").read() # TODO: already set in set_compilation_results (with bz2 compress...)
+        configfile = open("{}/.config".format(build_path), "r").read() # TODO: already set in set_compilation_results (with bz2 compress...)
     except:
         configfile = "" # bytes()
+    # A fraction of the size of the .config in the spool and the JSON file,
+    # sent in the encoding of the API (see config_codec.py)
+    config_codec = None
+    if settings.SPOOL_CONFIG_ENCODING is not None:
+        config_codec = get_config_codec(
+            configuration['kernel_path'],
+            configuration['kernel_version_compilation'], arch, compiler_exec)
+    if config_codec is not None:
+        configfile = config_codec.encode(configfile,
+                                         settings.SPOOL_CONFIG_ENCODING)
 
     json_data = {'cid': 0, 'compilation_date': compilation_result['compilation_date'],
                  'compilation_time': compilation_result['compilation_time'],
@@ -328,10 +477,16 @@ def run(boot, check_size, logger, configuration, environment,
                  'compiled_kernel_version': compilation_result['compiled_kernel_version'],
                  'dependencies': compilation_result['dependencies'],
                  'number_cpu_core_used': compilation_result['number_cpu_core_used'],
+                 'cache_hit_rate': compilation_result['cache_hit_rate'],
+                 # to generate the configuration again, see config_generator.py
+                 'config_generator': compilation_result['config_generator'],
+                 'config_seed': compilation_result['config_seed'],
                  'compressed_compiled_kernel_size': compilation_result['compressed_compiled_kernel_size'],
-                 'stdout_log_file': open(logger.get_stdout_file(), "r").read(),
-                 'stderr_log_file': open(logger.get_stderr_file(), "r").read(),
-                 'user_output_file': open(logger.get_user_output_file(), "r").read(),
+                 # typed sizes, see size_schema.py
+                 'compressed_sizes': compilation_result['compressed_sizes'],
+                 # "estimated" from a single build or "measured", see compressed_size.py
+                 'compressed_sizes_method': compilation_result['compressed_sizes_method'],
+                 'sizes': sizes_record(sizes_result['size_report']),
                  'compiler_version': environmentsoft["compiler_version"],
                  'tiny': tiny, 'config_file': configfile, 'boot': boot,
                  'cpu_brand_name': environmenthard['cpu_brand_name'],
@@ -349,11 +504,125 @@ def run(boot, check_size, logger, configuration, environment,
                  'size_report_builtin_coarse': sizes_result['size_report_builtin_coarse']
                  }
                  # 
+    # The whole logs are already compressed (see log_compression.py): only
+    # the lines written since the compilation are compressed here. The
+    # retention policy may keep a part of them only.
+    logs = get_retained_logs(logger, compiler.is_successful(), log_retention,
+                             log_tail_lines, settings.UPLOAD_COMPRESSED_LOGS)
+    if settings.UPLOAD_COMPRESSED_LOGS:
+        for name, log in logs.items():
+            json_data[name] = base64.b64encode(log).decode()
+        json_data['log_compression'] = logger.get_log_compression()
+    else:
+        json_data.update(logs)
+    json_data['log_retention'] = log_retention
+    if config_codec is not None:
+        json_data['config_encoding'] = settings.SPOOL_CONFIG_ENCODING
+    # The whole logs of this compilation are kept aside, see remove_logs_file
+    if not is_log_retention_full(log_retention, compiler.is_successful()):
+        if log_archive_name is None:
+            log_archive_name = "build_{}".format(incremental_level)
+        archive_log(log_archive_name,
+                    os.path.dirname(logger.get_stdout_file()))
+
+    if boot_result is not None:
+        json_data['boot_result'] = boot_result
+    if cid_before is not None:
+        json_data['cid_base'] = cid_before
+        json_data['incremental_level'] = incremental_level
+
+    # The result is sent in background: the compilation never waits for the
+    # network. The JSON file is created once the cid is known.
+    own_uploader = uploader is None
+    if own_uploader:
+        uploader = Uploader()
+    future_cid = uploader.submit(json_data)
+    future_cid.add_done_callback(
+        lambda future: log_upload_result(logger, future.result(), json_data,
+                                         json_bool, incremental_level,
+                                         json_filename))
+    if own_uploader:
+        uploader.close()
 
-    apiManager = APIManager()
-    response = apiManager.sendPost(json_data)
-    if (response.status_code == 201): 
-        cid = response.json()
+    return future_cid
+
+
+## boot_record
+# @brief Return the boot dictionary as sent to the API.
+def boot_record(boot_dictionary):
+    """Convert the boot dictionary (See `BootChecker <boot_checker.html>`_)
+    into the ``boot_result`` of the result sent to the API, serializable
+    in JSON.
+
+    :param boot_dictionary: the boot dictionary
+    :type boot_dictionary: dict
+    :return: ``{'boot_time': int, 'boot_log_file': str}``
+    :rtype: dict
+    """
+    return {
+        'boot_time': boot_dictionary['boot_time'],
+        'boot_log_file': bz2.decompress(
+            boot_dictionary['boot_log_file']).decode(errors="replace")
+    }
+
+
+## boot_record_future
+# @brief Return the future of the boot record of a boot made by the boot farm.
+# @details A failed boot gives a boot_time of -1 and the error as log, so that
+# the result is sent anyway.
+def boot_record_future(logger, boot_future):
+    """Gives the future of the ``boot_result`` of a kernel booted by the
+    boot farm (See :py:func:`boot_record`).
+
+    :param logger: the logger
+    :type logger: `Logger`_
+    :param boot_future: future of the boot dictionary, given by\
+    `BootFarm.submit <boot_farm.html>`_
+    :type boot_future: `concurrent.futures.Future`_
+    :return: future of the boot record, never failing
+    :rtype: `concurrent.futures.Future`_
+    """
+    future = Future()
+
+    def set_boot_record(done_future):
+        try:
+            future.set_result(boot_record(done_future.result()))
+        except Exception as error:
+            logger.timed_print_output(
+                "Unable to boot the kernel: {}".format(error),
+                color=COLOR_ERROR)
+            future.set_result({'boot_time': -1,
+                               'boot_log_file': str(error)})
+
+    boot_future.add_done_callback(set_boot_record)
+    return future
+
+
+## log_upload_result
+# @version 1
+# @brief Log the answer of the API and create the JSON file, once the result
+# has been sent.
+def log_upload_result(logger, cid, json_data, json_bool=False,
+                      incremental_level=0, json_filename=None):
+    """Log the answer of the TuxML API and create the JSON file (if asked),
+    once the result has been sent.
+
+    :param logger: the logger
+    :type logger: `Logger`_
+    :param cid: cid given by the API, ``0`` if it did not accept the result
+    :type cid: int
+    :param json_data: the sent result
+    :type json_data: dict
+    :param json_bool: create the JSON file
+    :type json_bool: bool
+    :param incremental_level: number of the incremental compilation since\
+    the base one. 0 for the base compilation.
+    :type incremental_level: int
+    :param json_filename: path to the JSON file. Default to None, which\
+    means the default one of the build.
+    :type json_filename: str
+    """
+    if cid:
         logger.timed_print_output(
             "Compilation send to TuxML API.",
             color=COLOR_SUCCESS
@@ -362,30 +631,28 @@ def run(boot, check_size, logger, configuration, environment,
             "CID received from database : " + str(cid),
             color=COLOR_SUCCESS
         )
-
     else:
         logger.timed_print_output(
-            "Error received from TuxML API when sending compilation.",
-            color=COLOR_ERROR
-        )
-        logger.timed_print_output(
-            "Status code : " + str(response.status_code),
-            color=COLOR_ERROR
-        )
-        logger.timed_print_output(
-            "Error message : " + response.text,
+            "Error received from TuxML API when sending compilation. "
+            "The result is kept in {} to be sent again.".format(
+                settings.SPOOL_FILE),
             color=COLOR_ERROR
         )
-        
-    if json_bool :
-        create_json_file(cid, json_data)
 
-    return cid
+    if json_bool :
+        json_data = {key: value.result() if isinstance(value, Future) else value
+                     for key, value in json_data.items()}
+        create_json_file(cid, json_data, incremental_level, json_filename)
 
-def create_json_file(cid, json_data):
+def create_json_file(cid, json_data, incremental_level=0, json_filename=None):
     json_data["cid"] = cid
 
-    with open(settings._JSON_INTERNAL_FILENAME, 'w') as json_file:
+    if json_filename is None:
+        json_filename = settings._JSON_INTERNAL_FILENAME
+        if incremental_level > 0:
+            json_filename = settings._JSON_INCREMENTAL_FILENAME.format(
+                incremental_level)
+    with open(json_filename, 'w') as json_file:
         json.dump(json_data, json_file)
 
 
@@ -395,21 +662,22 @@ def create_json_file(cid, json_data):
 # @version 1
 # @brief Retrieve the logs file, create a directory named <cid>, and put the log
 # in the created directory.
-def archive_log(cid):
-    directory = "{}/{}".format(settings.LOG_DIRECTORY, cid)
-    os.makedirs(directory)
-    file_list = [file for file in os.listdir(settings.LOG_DIRECTORY)
-                 if os.path.isfile(os.path.join(settings.LOG_DIRECTORY, file))]
+def archive_log(cid, log_directory=settings.LOG_DIRECTORY):
+    directory = "{}/{}".format(log_directory, cid)
+    os.makedirs(directory, exist_ok=True)
+    file_list = [file for file in os.listdir(log_directory)
+                 if os.path.isfile(os.path.join(log_directory, file))]
     for file in file_list:
         shutil.copy2(
-            os.path.join(settings.LOG_DIRECTORY, file),
+            os.path.join(log_directory, file),
             os.path.join(directory, file))
 
 
 ## insert_result_into_database
 # @author PICARD Michaël
-# @version 1
+# @version 2
 # @brief Send the sample result onto the data.
+# @details All the rows of the sample are inserted in a single transaction.
 def insert_result_into_database(logger, compilation, hardware, software,
                                 sizes=None, cid_incremental=None, boot=None):
     logger.timed_print_output("Sending result to database.")
@@ -418,23 +686,17 @@ def insert_result_into_database(logger, compilation, hardware, software,
         settings.USERNAME_BDD,
         settings.PASSWORD_USERNAME_BDD,
         settings.NAME_BDD)
-    cursor = connection.cursor()
-
-    hid = insert_if_not_exist_and_fetch_hardware(connection, cursor, hardware)
-    sid = insert_if_not_exist_and_fetch_software(connection, cursor, software)
-    compilation['hid'] = hid
-    compilation['sid'] = sid
-    cid = insert_and_fetch_compilation(connection, cursor, compilation)
-    if cid_incremental is not None:
-        insert_incrementals_compilation(
-            connection, cursor,
-            {'cid': cid, 'cid_base': cid_incremental, 'incremental_level': 1})
-    if boot is not None:
-        boot['cid'] = cid
-        insert_boot_result(connection, cursor, boot)
-    if sizes is not None:
-        sizes['cid'] = cid
-        insert_sizes(connection, cursor, sizes)
+
+    cid = insert_results_in_bulk(connection, [{
+        'compilation': compilation,
+        'hardware': hardware,
+        'software': software,
+        'sizes': sizes,
+        'boot': boot,
+        'cid_base': cid_incremental,
+        'incremental_level': 1
+    }])[0]
+    release_connection_to_database(connection)
 
     logger.timed_print_output("Successfully sent results with cid : {}".format(
         cid), color=COLOR_SUCCESS)
@@ -443,6 +705,250 @@ def insert_result_into_database(logger, compilation, hardware, software,
     return cid
 
 
+## add_worker_jobs
+# @version 1
+# @brief Add jobs to the queue directory of a worker.
+def add_worker_jobs(queue_directory, number, tiny=False, config_file=None,
+                    tagbuild=None, seed=None):
+    """Add jobs to the queue directory of a worker (See\
+    :py:func:`run_worker`).
+
+    :param queue_directory: path to the queue directory
+    :type queue_directory: str
+    :param number: number of jobs to add
+    :type number: int
+    :param tiny: use a tiny configuration or not
+    :type tiny: bool
+    :param config_file: path to a configuration file
+    :type config_file: str
+    :param tagbuild: tags of the compilations
+    :type tagbuild: list
+    :param seed: seed of the random configuration of the first job, the\
+    next jobs using the next seeds. Default to None, which means new ones.
+    :type seed: int
+    """
+    os.makedirs(queue_directory, exist_ok=True)
+    job = {'tiny': tiny, 'config': config_file, 'tagbuild': tagbuild}
+    prefix = "{:.6f}_{}".format(time.time(), os.getpid())
+    for i in range(number):
+        if seed is not None:
+            job['seed'] = seed + i
+        path = os.path.join(queue_directory, "{}_{}.json".format(prefix, i))
+        # written aside and renamed, so that a worker never reads half a job
+        with open("{}.tmp".format(path), 'w') as job_file:
+            json.dump(job, job_file)
+        os.replace("{}.tmp".format(path), path)
+
+
+## claim_worker_job
+# @version 1
+# @brief Move the next job of the queue into the running subdirectory and
+# return it.
+# @details The rename is atomic: many workers can share the same queue.
+def claim_worker_job(queue_directory):
+    """Take the next job of the queue directory, the oldest name first.
+
+    :param queue_directory: path to the queue directory
+    :type queue_directory: str
+    :return: ``(name, job)``, job being None if it can't be read, or None\
+    if the queue is empty
+    :rtype: tuple
+    """
+    running_directory = os.path.join(queue_directory, "running")
+    os.makedirs(running_directory, exist_ok=True)
+    for name in sorted(os.listdir(queue_directory)):
+        path = os.path.join(queue_directory, name)
+        if not os.path.isfile(path) or not name.endswith((".json", ".config")):
+            continue
+        claimed = os.path.join(running_directory, name)
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue  # taken by another worker
+        if name.endswith(".config"):
+            return name, {'config': claimed}
+        try:
+            with open(claimed, 'r') as job_file:
+                return name, json.load(job_file)
+        except ValueError:
+            return name, None
+    return None
+
+
+## reset_kernel_tree
+# @version 2
+# @brief Remove every file generated in the kernel tree by the previous
+# compilation.
+# @details With an output directory, the kernel tree is untouched: the output
+# directory is removed instead.
+def reset_kernel_tree(logger, kernel_path, output_path=None):
+    """Bring the kernel tree back to its initial state with ``make
+    mrproper``, so that a compilation does not depend on the previous one.
+
+    :param logger: the logger
+    :type logger: `Logger`_
+    :param kernel_path: path to the Linux kernel
+    :type kernel_path: str
+    :param output_path: directory of the built files (``make O=``), to\
+    remove instead. Default to None, which means the files are built in\
+    the kernel tree.
+    :type output_path: str
+    """
+    if output_path is not None:
+        logger.timed_print_output("Cleaning the output directory.")
+        shutil.rmtree(output_path, ignore_errors=True)
+        return
+    logger.timed_print_output("Cleaning the kernel tree.")
+    subprocess.run(
+        args=["make", "-C", kernel_path, "mrproper"],
+        stdout=subprocess.DEVNULL,
+        stderr=logger.get_stderr_pipe()
+    )
+
+
+## run_worker
+# @version 2
+# @brief Build the jobs of a queue directory, one after the other, in the same
+# container.
+# @details Each job is moved from the queue directory to running/ then to done/,
+# where the JSON result of the job is written once sent. With
+# args.worker_parallel, as many slots build the jobs at the same time, out of
+# the kernel tree.
+def run_worker(args, logger, configuration, environment, package_manager,
+               uploader, boot_farm=None):
+    """Build the jobs of the queue directory ``args.worker``, one after
+    the other, resetting the kernel tree between them. It avoids starting
+    a new container for each compilation.
+
+    With ``args.worker_parallel`` over 1, the jobs are built by as many
+    slots at the same time, sharing the cpu cores. Each slot builds out of
+    the kernel tree, in its own directory of ``settings.BUILD_DIRECTORY``,
+    and logs in its own directory of ``settings.LOG_DIRECTORY``. The
+    slots share ``package_manager``, which installs one package at a time.
+
+    A job is either a configuration file (``.config``) or a JSON file
+    with the optional keys ``"config"`` (path to a configuration file),
+    ``"tiny"``, ``"tagbuild"`` and ``"seed"`` (of the random
+    configuration). It is moved into the ``running`` subdirectory while
+    building, then into the ``done`` one, with the result
+    ``<job>.result.json``. The whole logs of a job, when they are not all
+    sent, are kept in the ``build_<job>`` directory of the logs.
+
+    :param args: parsed arguments
+    :type args: `argparse.Namespace`_
+    :param logger: the logger
+    :type logger: `Logger`_
+    :param configuration: configuration info
+    :type configuration: dict
+    :param environment: environment info
+    :type environment: dict
+    :param package_manager: package manager
+    :type package_manager: `PackageManager <package_manager.html>`_
+    :param uploader: uploader sending the results to the API
+    :type uploader: `Uploader <apiManager.html>`_
+    :param boot_farm: boot farm, if the kernels are booted
+    :type boot_farm: `BootFarm <boot_farm.html>`_
+    :return: number of jobs built
+    :rtype: int
+    """
+    queue_directory = args.worker
+    os.makedirs(os.path.join(queue_directory, "done"), exist_ok=True)
+    if args.worker_jobs > 0:
+        add_worker_jobs(queue_directory, args.worker_jobs, args.tiny,
+                        args.config, args.tagbuild, args.seed)
+
+    if args.worker_parallel <= 1:
+        number = __run_worker_slot(args, logger, configuration, environment,
+                                   package_manager, uploader, boot_farm,
+                                   args.output_directory)
+    else:
+        slots = list()
+        for slot in range(args.worker_parallel):
+            slot_logger = create_logger(args.silent, os.path.join(
+                settings.LOG_DIRECTORY, "slot_{}".format(slot)))
+            # The cores are split between the slots
+            cores = configuration['core_used'] // args.worker_parallel
+            if slot < configuration['core_used'] % args.worker_parallel:
+                cores += 1
+            slots.append((
+                slot_logger,
+                dict(configuration, core_used=max(1, cores)),
+                os.path.join(settings.BUILD_DIRECTORY, "slot_{}".format(slot))
+            ))
+        with ThreadPoolExecutor(max_workers=len(slots)) as executor:
+            futures = [
+                executor.submit(__run_worker_slot, args, slot_logger,
+                                slot_configuration, environment,
+                                package_manager, uploader, boot_farm,
+                                output_path)
+                for slot_logger, slot_configuration, output_path in slots]
+            number = sum(future.result() for future in futures)
+    logger.timed_print_output("Worker stopped after {} job(s).".format(number))
+    return number
+
+
+## __run_worker_slot
+# @brief Build the jobs of the queue directory one after the other and return
+# their number.
+def __run_worker_slot(args, logger, configuration, environment,
+                      package_manager, uploader, boot_farm, output_path):
+    queue_directory = args.worker
+    done_directory = os.path.join(queue_directory, "done")
+    number = 0
+    deadline = time.time() + args.worker_timeout
+    while True:
+        claimed = claim_worker_job(queue_directory)
+        if claimed is None:
+            if time.time() >= deadline:
+                break
+            time.sleep(1)
+            continue
+        name, job = claimed
+        running_job = os.path.join(queue_directory, "running", name)
+        if job is None:
+            logger.timed_print_output(
+                "Unable to read the job {}, skipped.".format(name),
+                color=COLOR_ERROR)
+            os.replace(running_job, os.path.join(done_directory, name))
+            continue
+
+        if number > 0:
+            reset_kernel_tree(logger, configuration['kernel_path'],
+                              output_path)
+        logger.reset_output_pipe()
+        logger.timed_print_output("Job {}: {}.".format(number + 1, name))
+        run(
+            args.boot,
+            args.check_size,
+            logger=logger,
+            configuration=configuration,
+            environment=environment,
+            package_manager=package_manager,
+            tiny=job.get('tiny', False),
+            config_file=job.get('config'),
+            json_bool=True,
+            clang_version=args.clang_version,
+            tagbuild=job.get('tagbuild', args.tagbuild),
+            arch=args.arch,
+            ccache=args.ccache,
+            uploader=uploader,
+            boot_farm=boot_farm,
+            log_retention=args.log_retention,
+            log_tail_lines=args.log_tail_lines,
+            json_filename=os.path.join(
+                done_directory,
+                "{}.result.json".format(os.path.splitext(name)[0])),
+            output_path=output_path,
+            seed=job.get('seed'),
+            # the directory of the slot is reused by all its jobs
+            log_archive_name="build_{}".format(os.path.splitext(name)[0])
+        )
+        os.replace(running_job, os.path.join(done_directory, name))
+        number += 1
+        deadline = time.time() + args.worker_timeout
+    return number
+
+
 ## remove_logs_file
 # @author PICARD Michaël
 # @version 1
@@ -463,22 +969,74 @@ if __name__ == "__main__":
     package_manager.update_system()
     environment = retrieve_and_display_environment(logger, args.clang_version)
     configuration = retrieve_and_display_configuration(logger, args)
+    api_manager = APIManager()
+    if args.api_address is not None:
+        api_manager.setAddress(args.api_address)
+    uploader = Uploader(api_manager)
+    # The kernels are booted in background, while the next ones compile
+    boot_farm = None
+    if args.boot:
+        boot_farm = BootFarm(logger)
 
-    # Do a compilation, do the test and send result
-    run(
-        args.boot,
-        args.check_size,
-        logger=logger,
-        configuration=configuration,
-        environment=environment,
-        package_manager=package_manager,
-        tiny=args.tiny,
-        config_file=args.config,
-        json_bool=args.json,
-        clang_version=args.clang_version,
-        tagbuild=args.tagbuild,
-        arch=args.arch
-    )
+    if args.worker is not None:
+        # Many compilations in this container, see run_worker
+        run_worker(args, logger, configuration, environment, package_manager,
+                   uploader, boot_farm)
+    else:
+        # Do a compilation, do the test and send result
+        cid = run(
+            args.boot,
+            args.check_size,
+            logger=logger,
+            configuration=configuration,
+            environment=environment,
+            package_manager=package_manager,
+            tiny=args.tiny,
+            config_file=args.config,
+            json_bool=args.json,
+            clang_version=args.clang_version,
+            tagbuild=args.tagbuild,
+            arch=args.arch,
+            ccache=args.ccache,
+            uploader=uploader,
+            boot_farm=boot_farm,
+            log_retention=args.log_retention,
+            log_tail_lines=args.log_tail_lines,
+            output_path=args.output_directory,
+            seed=args.seed
+        )
+
+        # Incremental compilations: new random configurations built in the same
+        # tree, without cleaning it, and linked to the base compilation
+        for level in range(1, args.incremental + 1):
+            logger.timed_print_output(
+                "Incremental compilation {}/{}.".format(level, args.incremental))
+            run(
+                args.boot,
+                args.check_size,
+                logger=logger,
+                configuration=configuration,
+                environment=environment,
+                package_manager=package_manager,
+                cid_before=cid,
+                json_bool=args.json,
+                clang_version=args.clang_version,
+                tagbuild=args.tagbuild,
+                arch=args.arch,
+                ccache=args.ccache,
+                incremental_level=level,
+                uploader=uploader,
+                boot_farm=boot_farm,
+                log_retention=args.log_retention,
+                log_tail_lines=args.log_tail_lines,
+                output_path=args.output_directory,
+                seed=args.seed + level if args.seed is not None else None
+            )
+
+    # Waiting for the boots to end and the results to be sent
+    if boot_farm is not None:
+        boot_farm.close()
+    uploader.close()
 
     # Cleaning the container
     del logger
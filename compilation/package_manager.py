@@ -3,9 +3,18 @@
 :version: 2
 """
 
+import dbm
+import os
 import subprocess
+import threading
+import time
 
 from compilation.logger import COLOR_SUCCESS, COLOR_ERROR, COLOR_WARNING
+import compilation.settings as settings
+
+# apt can't run twice at the same time, e.g. for the builds of a worker. The
+# lock is reentrant since fixing the dependencies installs packages.
+_INSTALL_LOCK = threading.RLock()
 
 
 ## PackageManager
@@ -31,20 +40,51 @@ class PackageManager:
     """
     # @param dependencies_file Path to the file containing all the installed
     # packages.
-    def __init__(self, logger, dependencies_file):
+    def __init__(self, logger, dependencies_file,
+                 file_index=settings.FILE_PACKAGE_INDEX,
+                 installed_packages_file=settings.INSTALLED_PACKAGES_FILE):
         self.__logger = logger
         with open(dependencies_file, "r") as dependencies:
             self.__package_list = [x.strip() for y in dependencies.read().splitlines()
                                    for x in y.split(' ')]
+        self.__file_index_path = file_index
+        self.__update_time = 0
+        self.__file_index = None
+        self.__installed_packages = None
+        if os.path.exists(installed_packages_file):
+            with open(installed_packages_file, "r") as installed:
+                self.__installed_packages = set(installed.read().split())
 
     ## update_system
     # @author LE FLEM Erwan, LEBRETON Mickaël, MERZOUK Fahim, PICARD Michaël
-    # @version 2
+    # @version 3
     # @brief Update package list and upgrade package who need it.
-    def update_system(self):
+    # @details Skipped if the lists were updated less than
+    # settings.APT_UPDATE_TTL seconds ago.
+    def update_system(self, marker_file=settings.APT_UPDATE_MARKER_FILE,
+                      ttl=settings.APT_UPDATE_TTL):
         """Update package list and upgrade if in need
            some issues may happen https://stackoverflow.com/questions/68802802/repository-http-security-debian-org-debian-security-buster-updates-inrelease
+
+        The update is skipped if ``marker_file`` was touched less than
+        ``ttl`` seconds ago, e.g. when the image is fresh.
+
+        :param marker_file: file touched after each update
+        :type marker_file: str
+        :param ttl: seconds during which the packages lists are\
+        considered up to date
+        :type ttl: int
         """
+        if os.path.exists(marker_file):
+            age = time.time() - os.path.getmtime(marker_file)
+            if 0 <= age < ttl:
+                self.__logger.timed_print_output(
+                    "Packages repositories updated {} ago, no need to update "
+                    "them.".format(time.strftime("%H:%M:%S", time.gmtime(age))),
+                    color=COLOR_SUCCESS
+                )
+                return
+        start_update_timer = time.time()
         try:
             self.__logger.timed_print_output("Updating packages repositories.")
             subprocess.run(
@@ -54,6 +94,8 @@ class PackageManager:
                 stdout=subprocess.DEVNULL,
                 stderr=self.__logger.get_stderr_pipe()
             )
+            with open(marker_file, 'w'):
+                pass
             self.__logger.timed_print_output(
                 "Packages repositories updated and packages upgraded.",
                 color=COLOR_SUCCESS
@@ -63,12 +105,29 @@ class PackageManager:
                 "Packages repositories updated and packages upgraded: possible issues (see error logs)",
                 color=COLOR_WARNING
             )
+        self.__update_time += time.time() - start_update_timer
+
+    ## pop_update_time
+    # @version 1
+    # @brief Return the time spent updating the system since the last call.
+    def pop_update_time(self):
+        """Gives the time spent updating the packages repositories since the
+        last call, so that it is accounted once.
+
+        :return: time in seconds
+        :rtype: float
+        """
+        update_time = self.__update_time
+        self.__update_time = 0
+        return update_time
 
     ## install_package
     # @author LE FLEM Erwan, LEBRETON Mickaël, MERZOUK Fahim, PICARD Michaël
-    # @version 2
+    # @version 3
     # @brief Install a list of package and add them to the list of installed
     # package.
+    # @details All the packages are installed in a single apt-get transaction.
+    # If it fails, they are installed one by one to find the faulty one.
     # @return True if successful.
     def install_package(self, package_list):
         """Install a package and add it to the list of installed packages.
@@ -78,19 +137,56 @@ class PackageManager:
         :return: either the package was installed successfully or not
         :rtype: bool
         """
-        self.__logger.timed_print_output(
-            "Installing package(s) : {}".format(" ".join(package_list)))
-        for package in package_list:
-            if not self.__install_one_package(package):
+        with _INSTALL_LOCK:
+            self.__logger.timed_print_output(
+                "Installing package(s) : {}".format(" ".join(package_list)))
+            if len(package_list) > 1 and self.__install_packages(package_list):
                 self.__logger.timed_print_output(
-                    "Error while installing the package {}.".format(package),
-                    color=COLOR_ERROR
+                    "All the packages were found and installed.",
+                    color=COLOR_SUCCESS
                 )
-                return False
-        self.__logger.timed_print_output(
-            "All the packages were found and installed.",
-            color=COLOR_SUCCESS
-        )
+                return True
+            for package in package_list:
+                if not self.__install_one_package(package):
+                    self.__logger.timed_print_output(
+                        "Error while installing the package {}.".format(package),
+                        color=COLOR_ERROR
+                    )
+                    return False
+            self.__logger.timed_print_output(
+                "All the packages were found and installed.",
+                color=COLOR_SUCCESS
+            )
+            return True
+
+    ## __install_packages
+    # @version 1
+    # @brief Install packages in a single transaction and add them to the list
+    # of installed package.
+    # @return True if successful.
+    def __install_packages(self, package_list):
+        """Install packages in a single ``apt-get`` transaction and add them
+        to the list of installed packages
+
+        :param package_list: packages to install
+        :type package_list: list
+        :return: either the packages were installed successfully or not
+        :rtype: bool
+        """
+        try:
+            subprocess.run(
+                "apt-get -y install {}".format(" ".join(package_list)),
+                shell=True,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=self.__logger.get_stderr_pipe()
+            )
+        except subprocess.CalledProcessError:
+            return False
+        for package in package_list:
+            self.__package_list.append(package)
+            if self.__installed_packages is not None:
+                self.__installed_packages.add(package)
         return True
 
     ## __install_one_package
@@ -116,6 +212,8 @@ class PackageManager:
                 stderr=self.__logger.get_stderr_pipe()
             )
             self.__package_list.append(package)
+            if self.__installed_packages is not None:
+                self.__installed_packages.add(package)
             return True
         except subprocess.CalledProcessError:
             return False
@@ -136,6 +234,27 @@ class PackageManager:
         :return: either the dependencies were fixed or not
         :rtype: bool
         """
+        # The slots of a worker share the package manager: they must not
+        # search and install the same packages at the same time.
+        with _INSTALL_LOCK:
+            return self.__fix_missing_dependencies(missing_files,
+                                                   missing_packages)
+
+    ## __fix_missing_dependencies
+    # @version 1
+    # @brief Body of fix_missing_dependencies, called under _INSTALL_LOCK.
+    # @return True if successful.
+    def __fix_missing_dependencies(self, missing_files, missing_packages):
+        """Body of ``fix_missing_dependencies``, called under the install
+        lock.
+
+        :param missing_files: files that are missing
+        :type missing_files: list
+        :param missing_packages: packages that are missing
+        :type missing_packages: list
+        :return: either the dependencies were fixed or not
+        :rtype: bool
+        """
         self.__logger.timed_print_output(
             "Fixing missing file(s)/package(s) dependencies."
         )
@@ -143,54 +262,33 @@ class PackageManager:
 
         # Getting new package for each missing file.
         for file in missing_files:
-            try:
-                output = subprocess.check_output(
-                    args="apt-file search {}".format(file),
-                    shell=True,
-                    stderr=self.__logger.get_stderr_pipe()
-                ).decode(errors="replace")
-                lines = output.splitlines()
-
-                # We could have multiple package proposed. In this case, we
-                # select to install the first package who isn't already
-                # installed. Also, we have to be sure that the result is really
-                # the requested file.
-                package_found = False
-                for line in lines:
-                    package = line.split(":")[0]
-                    file_check = line.split(':')[1].split('/')[-1]
-                    if file_check != file:
-                        continue  # Not the right file
-                    if package in self.__package_list:
-                        continue  # Already installed
-
-                    # Because of the linux self management package
-                    # dependencies, we can't be 100% sure that our
-                    # package is already here. So we verify with a
-                    # subprocess call.  A call returning 1 mean that
-                    # the package isn't installed.  Note that if it is
-                    # already installed, we could have add it to the
-                    # __package_list, but we choose to don't do it,
-                    # because it will be present, whether we check it
-                    # or not and this could mess with the
-                    # database. This behaviour could be changed later.
-                    if subprocess.call(
-                        args="dpkg-query -l | grep {}".format(package),
-                        shell=True,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL
-                    ):
-                        # Not need to add a package twice to the list of new
-                        # packages.
-                        if package not in new_packages:
-                            new_packages.append(package)
-                        package_found = True
-                        break
-                if not package_found:
-                    # Not the proper way, but we avoid recopying code
-                    # with this.
-                    raise subprocess.CalledProcessError(0, '')
-            except subprocess.CalledProcessError:
+            # We could have multiple package proposed. In this case, we
+            # select to install the first package who isn't already
+            # installed. Also, we have to be sure that the result is really
+            # the requested file.
+            package_found = False
+            for package, path in self.__search_file(file):
+                if not path.endswith("/{}".format(file)):
+                    continue  # Not the right file
+                if package in self.__package_list:
+                    continue  # Already installed
+
+                # Because of the linux self management package
+                # dependencies, we can't be 100% sure that our
+                # package is already here. So we verify it.  Note that
+                # if it is already installed, we could have add it to
+                # the __package_list, but we choose to don't do it,
+                # because it will be present, whether we check it or
+                # not and this could mess with the database. This
+                # behaviour could be changed later.
+                if not self.__is_installed(package):
+                    # Not need to add a package twice to the list of new
+                    # packages.
+                    if package not in new_packages:
+                        new_packages.append(package)
+                    package_found = True
+                    break
+            if not package_found:
                 self.__logger.timed_print_output(
                     "Unable to find the missing package for missing file : "
                     "{}".format(file),
@@ -227,6 +325,69 @@ class PackageManager:
             )
         return ret
 
+    ## __search_file
+    # @version 1
+    # @brief Return the packages providing a file with the same basename.
+    # @details Look in the index built with the image, and fall back on
+    # apt-file if the index is missing or does not know the file.
+    # @return list((package, path))
+    def __search_file(self, file):
+        """Gives the packages providing a file with the same basename as
+        ``file``. The index built with the image is used if possible, and
+        ``apt-file`` otherwise.
+
+        :param file: missing file
+        :type file: str
+        :return: list of ``(package, path)``
+        :rtype: list
+        """
+        if self.__file_index is None and dbm.whichdb(self.__file_index_path):
+            try:
+                self.__file_index = dbm.open(self.__file_index_path, 'r')
+            except dbm.error:
+                self.__file_index_path = ""  # Not trying again
+        if self.__file_index is not None:
+            lines = self.__file_index.get(file.split('/')[-1])
+            if lines is not None:
+                return [tuple(line.split(':', 1))
+                        for line in lines.decode().splitlines()]
+
+        try:
+            output = subprocess.check_output(
+                args="apt-file search {}".format(file),
+                shell=True,
+                stderr=self.__logger.get_stderr_pipe()
+            ).decode(errors="replace")
+        except subprocess.CalledProcessError:
+            return list()
+        result = list()
+        for line in output.splitlines():
+            package, _, path = line.partition(": ")
+            result.append((package, path.strip()))
+        return result
+
+    ## __is_installed
+    # @version 1
+    # @brief Return True if the package is installed in the container.
+    def __is_installed(self, package):
+        """Predicate on the installation of a package. The list of the
+        packages installed with the image is used if possible, and
+        ``dpkg-query`` otherwise.
+
+        :param package: package name
+        :type package: str
+        :return: either the package is installed or not
+        :rtype: bool
+        """
+        if self.__installed_packages is not None:
+            return package in self.__installed_packages
+        return "install ok installed" in subprocess.run(
+            args=["dpkg-query", "-W", "-f=${Status}", package],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True
+        ).stdout
+
     ## get_package_list_copy
     # @author PICARD Michaël
     # @version 1
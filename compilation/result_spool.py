@@ -0,0 +1,187 @@
+"""Local store of the results, to send them again to the TuxML API
+
+Every result is appended to a SQLite file before being sent, with its
+content compressed. Once the API accepts it, its cid is recorded. The
+results without cid are the pending ones: they can be sent again later,
+e.g. with ``kernel_generator.py --replay-spool``. The results the API may
+have stored without giving their cid (e.g. timeout) get the cid
+``UNCERTAIN_CID``: they are only sent again on demand, with
+``kernel_generator.py --replay-spool --replay-uncertain``, since they may
+be duplicated.
+
+:version: 1
+"""
+# @file result_spool.py
+
+import bz2
+import json
+import sqlite3
+import threading
+import time
+
+## UNCERTAIN_CID
+# @brief cid of the results the API may have stored, without giving their cid.
+UNCERTAIN_CID = -1
+
+
+## ResultSpool
+# @brief Append-only store of the results, with the cid given by the API.
+class ResultSpool:
+    """Append-only store of the results, with the cid given by the API
+    to each of them. Can be shared between threads.
+
+    :param path: path to the SQLite file. Created if needed.
+    :type path: str
+    """
+    def __init__(self, path):
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "rid INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "creation_date REAL NOT NULL, "
+                "content BLOB NOT NULL, "
+                "cid INTEGER)")
+
+    ## append
+    # @brief Store a new result and return its id in the spool.
+    def append(self, record):
+        """Store a new result.
+
+        :param record: the result, serializable in JSON
+        :type record: dict
+        :return: id of the result in the spool
+        :rtype: int
+        """
+        content = bz2.compress(json.dumps(record).encode())
+        with self.__lock, self.__connection:
+            return self.__connection.execute(
+                "INSERT INTO results(creation_date, content) VALUES(?, ?)",
+                (time.time(), content)).lastrowid
+
+    ## mark_sent
+    # @brief Record the cid given by the API to a result.
+    def mark_sent(self, rid, cid):
+        """Record the cid given by the API to a result.
+
+        :param rid: id of the result in the spool
+        :type rid: int
+        :param cid: cid given by the API, or :py:data:`UNCERTAIN_CID`
+        :type cid: int
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "UPDATE results SET cid = ? WHERE rid = ?", (cid, rid))
+
+    ## pending
+    # @brief Return the results not accepted by the API yet.
+    def pending(self, limit=None):
+        """Gives the results that were not accepted by the API yet, the
+        oldest first.
+
+        :param limit: maximum number of results. Default to None, which\
+        means all of them.
+        :type limit: int
+        :return: list of ``(rid, record)``
+        :rtype: list
+        """
+        query = "SELECT rid, content FROM results " \
+                "WHERE cid IS NULL OR cid = 0 ORDER BY rid"
+        parameters = ()
+        if limit is not None:
+            query = "{} LIMIT ?".format(query)
+            parameters = (limit,)
+        with self.__lock:
+            rows = self.__connection.execute(query, parameters).fetchall()
+        return [(rid, json.loads(bz2.decompress(content).decode()))
+                for rid, content in rows]
+
+    ## uncertain
+    # @brief Return the results the API may have stored.
+    def uncertain(self):
+        """Gives the results the API may have stored without giving their
+        cid, the oldest first.
+
+        :return: list of ``(rid, record)``
+        :rtype: list
+        """
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT rid, content FROM results WHERE cid = ? "
+                "ORDER BY rid", (UNCERTAIN_CID,)).fetchall()
+        return [(rid, json.loads(bz2.decompress(content).decode()))
+                for rid, content in rows]
+
+    ## records
+    # @brief Yield every result of the spool, sent or not, the oldest first.
+    def records(self, pending_only=False):
+        """Gives the results of the spool, the oldest first, without loading
+        all of them in memory.
+
+        :param pending_only: only the results not accepted by the API yet
+        :type pending_only: bool
+        :return: iterator of ``(rid, record, cid)``, cid being None for a\
+        pending or uncertain result
+        :rtype: iterator
+        """
+        query = "SELECT rid, content, cid FROM results"
+        if pending_only:
+            query = "{} WHERE cid IS NULL OR cid = 0".format(query)
+        last_rid = 0
+        while True:
+            with self.__lock:
+                rows = self.__connection.execute(
+                    "SELECT * FROM ({}) WHERE rid > ? ORDER BY rid "
+                    "LIMIT 256".format(query), (last_rid,)).fetchall()
+            if not rows:
+                return
+            for rid, content, cid in rows:
+                yield rid, json.loads(bz2.decompress(content).decode()), \
+                    cid if cid and cid > 0 else None
+            last_rid = rows[-1][0]
+
+    ## count_pending
+    # @brief Return the number of results not accepted by the API yet.
+    def count_pending(self):
+        """Gives the number of results not accepted by the API yet.
+
+        :return: number of pending results
+        :rtype: int
+        """
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM results "
+                "WHERE cid IS NULL OR cid = 0").fetchone()[0]
+
+    ## count_uncertain
+    # @brief Return the number of results the API may have stored.
+    def count_uncertain(self):
+        """Gives the number of results the API may have stored without
+        giving their cid.
+
+        :return: number of uncertain results
+        :rtype: int
+        """
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM results WHERE cid = ?",
+                (UNCERTAIN_CID,)).fetchone()[0]
+
+    ## get_path
+    def get_path(self):
+        """Gives the path to the SQLite file
+
+        :return: path to the SQLite file
+        :rtype: str
+        """
+        return self.__path
+
+    ## close
+    def close(self):
+        """Close the SQLite file
+
+        """
+        with self.__lock:
+            self.__connection.close()
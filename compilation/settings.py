@@ -10,6 +10,19 @@ OUTPUT_FILE = "{}/user_output.log".format(LOG_DIRECTORY)
 STDOUT_FILE = "{}/stdout.log".format(LOG_DIRECTORY)
 STDERR_FILE = "{}/stderr.log".format(LOG_DIRECTORY)
 BOOT_FILE = "{}/boot.log".format(LOG_DIRECTORY)
+# codec of the logs, compressed while written: "bz2", "lzma" or "zstd" (needs
+# the zstandard package)
+LOG_COMPRESSION = "bz2"
+# number of lines of make output between two compressions of the new lines
+LOG_COMPRESSION_LINES = 1000
+# send the compressed logs (base64) to the API instead of the plain text. The
+# API stores the logs as text and can't read them compressed: only for an API
+# that decodes them with log_compression
+UPLOAD_COMPRESSED_LOGS = False
+# what is sent of the logs (see log_retention.py): "full", "tail", "errors" or
+# "none_on_success", and the number of lines kept by "tail"
+LOG_RETENTION = "full"
+LOG_RETENTION_TAIL_LINES = 200
 
 # TINY_CONFIG_SEED_FILE = "/TuxML/compilation/x64.config" # deprecated! 
 # preset applies to tiny and randconfig 
@@ -18,19 +31,77 @@ BOOT_FILE = "{}/boot.log".format(LOG_DIRECTORY)
 CONFIG_PRESET_FILE = "/TuxML/compilation/preset.config" # "/TuxML/compilation/x64.config" # "/TuxML/compilation/tuxml.config"
 
 DEPENDENCIES_FILE = "/dependencies.txt"
+# basename of the header files -> packages providing them, built with the
+# image (see docker_management/file_package_index.py)
+FILE_PACKAGE_INDEX = "/file_package_index"
+# packages installed in the image
+INSTALLED_PACKAGES_FILE = "/installed_packages.txt"
+# touched each time the packages lists are updated (also when building the
+# image). The update is skipped if it is more recent than APT_UPDATE_TTL
+# seconds.
+APT_UPDATE_MARKER_FILE = "/apt_update_marker"
+APT_UPDATE_TTL = 24 * 60 * 60
 KERNEL_VERSION_FILE = "/kernel_version.txt"
+# generate the random configurations in process with kconfiglib, when it is
+# installed, instead of make randconfig (see config_generator.py)
+KCONFIGLIB_RANDCONFIG = True
+# encoding of the configurations stored in the spool and the JSON files:
+# "bitset", "diff" (see config_codec.py) or None for the plain .config. Needs
+# kconfiglib, the plain .config is stored without it.
+SPOOL_CONFIG_ENCODING = "bitset"
+# encoding of the configurations sent to the API. None for the plain .config:
+# the API has not the tables to decode them.
+CONFIG_ENCODING = None
+# tables of the encodings, one per kernel version, to decode the
+# configurations (retrieved by kernel_generator.py in Spool/config_codecs)
+CONFIG_CODEC_DIRECTORY = "/TuxML/config_codecs"
+# environment details of the container, cached by fingerprint of the image and
+# of the host (see environment.py)
+ENVIRONMENT_CACHE_FILE = "/TuxML/environment_cache.json"
 
 KERNEL_COMPRESSION_TYPE = ["GZIP", "BZIP2", "LZMA", "XZ", "LZO", "LZ4"]
 KERNEL_COMPRESSION_EXTENSIONS = [".gz", ".bz2", ".lzma", ".xz", ".lzo", ".lz4"]
+# stop make as soon as a missing file/command is found in its error output,
+# instead of waiting for the other jobs of the failed build. Off by default:
+# such a line is not always fatal (e.g. an optional tool probed by the
+# Makefiles), and aborting would then make a successful build fail
+ABORT_COMPILATION_ON_MISSING_DEPENDENCY = False
 
+# compute the compressed sizes from the only build (see compressed_size.py)
+# instead of rebuilding the kernel once per compression type. The bzImage and
+# vmlinux sizes are then estimated, which the results tell with
+# compressed_sizes_method
+FAST_COMPRESSED_KERNEL_SIZE = True
 
-# full report with total per builtin 
-SIZE_REPORT_FILE = '/TuxML/compilation/size_report.sh'
-# coarse grained (smaller report)
-SIZE_REPORT_COARSE_FILE = '/TuxML/compilation/size_report_coarse.sh'
+
+# compiler cache shared between the containers (mounted by kernel_generator.py
+# with --ccache)
+CCACHE_DIRECTORY = "/ccache"
+CCACHE_MAX_SIZE = "20G"
 
 BOOTING_KERNEL_PATH = "{}/arch/x86/boot/bzImage"
 INITRAMFS_PATH = "/root/kdev/build/initramfs-busybox-x86.cpio.gz"
 MAX_TIME_BOOT = 300
+# resources of each virtual machine booting a kernel
+BOOT_MEMORY = "512M"
+BOOT_CPUS = 1
+# maximum number of kernels booted at the same time (see boot_farm.py)
+MAX_CONCURRENT_BOOTS = 4
+
+# every result, stored before being sent to the TuxML API (see
+# result_spool.py). The ones not accepted are sent again later.
+SPOOL_FILE = "/TuxML/spool.db"
+# queue directory of main.py --worker, used by kernel_generator.py
+# --builds_per_container
+WORKER_QUEUE_DIRECTORY = "/TuxML/queue"
+# output directories (make O=) of the jobs built at the same time by a worker
+BUILD_DIRECTORY = "/TuxML/build"
+# maximum number of results sent in a single request to the API
+UPLOAD_BATCH_SIZE = 32
+# seconds between two attempts to send the spooled results
+UPLOAD_FLUSH_INTERVAL = 30
+# per-phase timings written by benchmark.py
+BENCHMARK_FILE = "/TuxML/benchmark.json"
 
 _JSON_INTERNAL_FILENAME='build.json'
+_JSON_INCREMENTAL_FILENAME='build_{}.json'
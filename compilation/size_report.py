@@ -0,0 +1,322 @@
+"""Size of the compiled kernel, per section and per subsystem
+
+The section headers of ``vmlinux`` and of every object of the
+``built-in.[ao]`` of each subsystem are read directly, in a single pass,
+instead of running ``size`` on each of them. The ``ar`` archives, thin or
+not, and the ELF files (32 or 64 bits, any endianness) are parsed with
+the standard library only.
+
+The sizes are counted the same way as ``size`` (Berkeley format) does:
+``text`` is the allocated code and read-only data, ``data`` the
+allocated writable data and ``bss`` the allocated sections without
+content.
+
+:version: 1
+"""
+# @file size_report.py
+
+import glob
+import os
+import struct
+
+_AR_MAGIC = b"!<arch>\n"
+_AR_THIN_MAGIC = b"!<thin>\n"
+_AR_HEADER_LENGTH = 60
+_ELF_MAGIC = b"\x7fELF"
+
+_SHF_WRITE = 0x1
+_SHF_ALLOC = 0x2
+_SHF_EXECINSTR = 0x4
+_SHT_NOBITS = 8
+
+# "size -t" columns
+_SIZE_HEADER = "   text\t   data\t    bss\t    dec\t    hex\tfilename"
+_SIZE_LINE = "{:7d}\t{:7d}\t{:7d}\t{:7d}\t{:7x}\t{}"
+
+
+## __elf_sections
+# @brief Return the list of (name, type, flags, size) of the sections of the
+# ELF file starting at offset in the opened file, None if it is not one.
+def __elf_sections(file, offset=0):
+    file.seek(offset)
+    ident = file.read(16)
+    if len(ident) < 16 or ident[:4] != _ELF_MAGIC:
+        return None
+    is_64 = ident[4] == 2
+    endian = "<" if ident[5] == 1 else ">"
+    if is_64:
+        header_format = endian + "HHIQQQIHHHHHH"
+        section_format = endian + "IIQQQQIIQQ"
+    else:
+        header_format = endian + "HHIIIIIHHHHHH"
+        section_format = endian + "IIIIIIIIII"
+    header = file.read(struct.calcsize(header_format))
+    if len(header) < struct.calcsize(header_format):
+        return None
+    (_, _, _, _, _, shoff, _, _, _, _, shentsize, shnum,
+     shstrndx) = struct.unpack(header_format, header)
+    if not shoff:
+        return list()
+
+    section_length = struct.calcsize(section_format)
+    file.seek(offset + shoff)
+    first = struct.unpack(section_format, file.read(section_length))
+    # More than 0xff00 sections (e.g. -ffunction-sections): the real numbers
+    # are in the first section header
+    if shnum == 0:
+        shnum = first[5]
+    if shstrndx == 0xffff:
+        shstrndx = first[6]
+
+    file.seek(offset + shoff)
+    table = file.read(shentsize * shnum)
+    headers = [struct.unpack_from(section_format, table, i * shentsize)
+               for i in range(len(table) // shentsize)]
+    # name, type, flags, addr, offset, size, ...
+    names = b""
+    if shstrndx < len(headers):
+        file.seek(offset + headers[shstrndx][4])
+        names = file.read(headers[shstrndx][5])
+    sections = list()
+    for section in headers:
+        end = names.find(b"\0", section[0])
+        name = names[section[0]:end if end >= 0 else None].decode(
+            errors="replace")
+        sections.append((name, section[1], section[2], section[5]))
+    return sections
+
+
+## __berkeley_sizes
+# @brief Return the (text, data, bss) sizes of a list of sections, like size.
+def __berkeley_sizes(sections):
+    text, data, bss = 0, 0, 0
+    for _, section_type, flags, size in sections:
+        if not flags & _SHF_ALLOC:
+            continue
+        if flags & _SHF_EXECINSTR or not flags & _SHF_WRITE:
+            text += size
+        elif section_type != _SHT_NOBITS:
+            data += size
+        else:
+            bss += size
+    return text, data, bss
+
+
+## __archive_members
+# @brief Yield the (name, sections) of each ELF object of an ar archive.
+# @details The members of a thin archive are the files next to it, and may be
+# thin archives themselves.
+def __archive_members(path):
+    with open(path, "rb") as archive:
+        magic = archive.read(len(_AR_MAGIC))
+        if magic not in (_AR_MAGIC, _AR_THIN_MAGIC):
+            return
+        thin = magic == _AR_THIN_MAGIC
+        long_names = b""
+        position = len(magic)
+        while True:
+            archive.seek(position)
+            header = archive.read(_AR_HEADER_LENGTH)
+            if len(header) < _AR_HEADER_LENGTH:
+                return
+            name = header[:16].decode(errors="replace").rstrip()
+            size = int(header[48:58].decode().strip() or 0)
+            data_position = position + _AR_HEADER_LENGTH
+            # Only the symbol table and the long names are stored in a thin
+            # archive
+            special = name in ("/", "//", "/SYM64/")
+            stored = special or not thin
+            position = data_position + (size + size % 2 if stored else 0)
+
+            if name == "//":
+                archive.seek(data_position)
+                long_names = archive.read(size)
+                continue
+            if special:
+                continue
+            if name.startswith("/"):
+                start = int(name[1:])
+                end = long_names.find(b"\n", start)
+                name = long_names[start:end].decode(errors="replace")
+            name = name.rstrip("/")
+
+            if not thin:
+                sections = __elf_sections(archive, data_position)
+                if sections is not None:
+                    yield name, sections
+                continue
+            member_path = os.path.join(os.path.dirname(path), name)
+            if not os.path.isfile(member_path):
+                continue
+            with open(member_path, "rb") as member:
+                sections = __elf_sections(member)
+            if sections is not None:
+                yield name, sections
+            else:
+                for nested in __archive_members(member_path):
+                    yield nested
+
+
+## __objects
+# @brief Yield the (name, sections) of each object of a built-in.[ao].
+def __objects(path):
+    with open(path, "rb") as file:
+        sections = __elf_sections(file)
+    if sections is not None:
+        yield os.path.basename(path), sections
+    else:
+        for member in __archive_members(path):
+            yield member
+
+
+## __count_lines
+def __count_lines(path):
+    if not os.path.isfile(path):
+        return -1
+    lines = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+    return lines
+
+
+## get_size_report
+# @brief Compute the sizes of vmlinux and of each subsystem in a single pass.
+def get_size_report(path, builtin="built-in.a"):
+    """Compute the sizes of ``vmlinux``, per section, and of the
+    ``built-in`` of each subsystem (first level directories and
+    ``arch/*``), with the sizes of each of their objects.
+
+    :param path: path to the compiled Linux kernel
+    :type path: str
+    :param builtin: name of the built-in files: ``built-in.a`` or\
+    ``built-in.o`` (before Linux 4.17)
+    :type builtin: str
+    :return: ``{'vmlinux': {'text', 'data', 'bss', 'sections'},\
+    'subsystems': {subsystem: {'text', 'data', 'bss', 'objects'}},\
+    'symvers_lines': int, 'vmlinux_lines': int}``, where ``objects`` is\
+    the list of ``[name, text, data, bss]`` and ``vmlinux`` is None if\
+    it does not exist
+    :rtype: dict
+    """
+    vmlinux = None
+    vmlinux_path = os.path.join(path, "vmlinux")
+    if os.path.isfile(vmlinux_path):
+        with open(vmlinux_path, "rb") as file:
+            sections = __elf_sections(file)
+        if sections is not None:
+            text, data, bss = __berkeley_sizes(sections)
+            vmlinux = {
+                'text': text, 'data': data, 'bss': bss,
+                'sections': {name: size
+                             for name, _, flags, size in sections
+                             if flags & _SHF_ALLOC}
+            }
+
+    subsystems = dict()
+    builtins = sorted(glob.glob(os.path.join(path, "*", builtin))) \
+        + sorted(glob.glob(os.path.join(path, "arch", "*", builtin)))
+    for builtin_path in builtins:
+        subsystem = os.path.relpath(os.path.dirname(builtin_path), path)
+        objects = [[name] + list(__berkeley_sizes(sections))
+                   for name, sections in __objects(builtin_path)]
+        subsystems[subsystem] = {
+            'text': sum(sizes[1] for sizes in objects),
+            'data': sum(sizes[2] for sizes in objects),
+            'bss': sum(sizes[3] for sizes in objects),
+            'objects': objects
+        }
+
+    return {
+        'vmlinux': vmlinux,
+        'subsystems': subsystems,
+        'symvers_lines': __count_lines(os.path.join(path, "vmlinux.symvers")),
+        'vmlinux_lines': __count_lines(vmlinux_path)
+    }
+
+
+## __size_line
+def __size_line(text, data, bss, filename):
+    total = text + data + bss
+    return _SIZE_LINE.format(text, data, bss, total, total, filename)
+
+
+## format_size_vmlinux
+# @brief Format the size of vmlinux like "size vmlinux".
+def format_size_vmlinux(report, path):
+    """Format the size of ``vmlinux`` like ``size vmlinux`` does.
+
+    :param report: size report (See :py:func:`get_size_report`)
+    :type report: dict
+    :param path: path to the compiled Linux kernel
+    :type path: str
+    :return: the text report, empty if there is no ``vmlinux``
+    :rtype: str
+    """
+    vmlinux = report['vmlinux']
+    if vmlinux is None:
+        return ""
+    return "{}\n{}\n".format(_SIZE_HEADER, __size_line(
+        vmlinux['text'], vmlinux['data'], vmlinux['bss'],
+        "{}/vmlinux".format(path)))
+
+
+## format_size_report
+# @brief Format the size of each subsystem like size_report.sh did.
+def format_size_report(report, path, builtin="built-in.a"):
+    """Format the size of each object of each subsystem, with the totals
+    per subsystem, like ``size -t`` on each ``built-in``.
+
+    :param report: size report (See :py:func:`get_size_report`)
+    :type report: dict
+    :param path: path to the compiled Linux kernel
+    :type path: str
+    :param builtin: name of the built-in files
+    :type builtin: str
+    :return: the text report
+    :rtype: str
+    """
+    lines = [path, "size in subsys"]
+    for subsystem, sizes in report['subsystems'].items():
+        builtin_path = "{}/{}/{}".format(path, subsystem, builtin)
+        lines.append(builtin_path)
+        lines.append(_SIZE_HEADER)
+        for name, text, data, bss in sizes['objects']:
+            lines.append(__size_line(
+                text, data, bss, "{} (ex {})".format(name, builtin_path)))
+        lines.append(__size_line(sizes['text'], sizes['data'], sizes['bss'],
+                                 "(TOTALS)"))
+        lines.append("==========")
+    return "\n".join(lines) + "\n"
+
+
+## format_size_report_coarse
+# @brief Format the number of objects of each subsystem like
+# size_report_coarse.sh did.
+def format_size_report_coarse(report, path, builtin="built-in.a"):
+    """Format the number of objects of each subsystem, with the total,
+    and the number of lines of ``vmlinux.symvers`` and ``vmlinux``.
+
+    :param report: size report (See :py:func:`get_size_report`)
+    :type report: dict
+    :param path: path to the compiled Linux kernel
+    :type path: str
+    :param builtin: name of the built-in files
+    :type builtin: str
+    :return: the text report
+    :rtype: str
+    """
+    lines = [path, "sym subsys"]
+    total = 0
+    for subsystem, sizes in report['subsystems'].items():
+        number = len(sizes['objects'])
+        total += number
+        lines.append("{:04d} {}/{}/{}".format(number, path, subsystem,
+                                              builtin))
+    lines.append("==========")
+    lines.append("{:04d} total".format(total))
+    lines.append("==========")
+    lines.append("{} {}/vmlinux.symvers".format(report['symvers_lines'],
+                                                path))
+    lines.append("{} {}/vmlinux".format(report['vmlinux_lines'], path))
+    return "\n".join(lines) + "\n"
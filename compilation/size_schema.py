@@ -0,0 +1,114 @@
+"""Typed records of the sizes of a compiled kernel
+
+The sizes are flat dictionaries of integers, whose keys are fixed column
+names, so that the results of many builds can be loaded as columns
+without parsing any text. ``-1`` means the size could not be computed.
+
+* the compressed sizes: ``<COMPRESSION>-bzImage``,
+  ``<COMPRESSION>-vmlinux`` and ``<COMPRESSION>`` (the compressed payload)
+  for each compression of ``settings.KERNEL_COMPRESSION_TYPE``, in this
+  order (see :py:data:`COMPRESSED_SIZE_COLUMNS`);
+* the additional sizes: ``vmlinux-text``, ``vmlinux-data`` and
+  ``vmlinux-bss``, then ``<subsystem>-text``, ``<subsystem>-data``,
+  ``<subsystem>-bss`` and ``<subsystem>-objects`` for each subsystem
+  (e.g. ``kernel``, ``arch/x86``).
+
+The former text format of the compressed sizes, ``"GZIP-bzImage : 123 ,
+GZIP-vmlinux : 456 , ..."``, is still produced for the database.
+
+:version: 1
+"""
+# @file size_schema.py
+
+import compilation.settings as settings
+
+## COMPRESSED_SIZE_COLUMNS
+# @brief Names of the compressed sizes, in order.
+COMPRESSED_SIZE_COLUMNS = [
+    "{}{}".format(compression, typ)
+    for compression in settings.KERNEL_COMPRESSION_TYPE
+    for typ in ["-bzImage", "-vmlinux", ""]
+]
+
+
+## compressed_sizes_record
+# @brief Return the record of the compressed sizes given by
+# get_compressed_sizes.
+def compressed_sizes_record(sizes=None):
+    """Build the record of the compressed sizes.
+
+    :param sizes: ``{compression: (bzImage, vmlinux, payload)}``, as given\
+    by `get_compressed_sizes <compressed_size.html>`_. Default to None,\
+    which means every size is unknown.
+    :type sizes: dict
+    :return: ``{column: size}`` for each column of\
+    :py:data:`COMPRESSED_SIZE_COLUMNS`
+    :rtype: dict
+    """
+    record = dict.fromkeys(COMPRESSED_SIZE_COLUMNS, -1)
+    for compression, compression_sizes in (sizes or dict()).items():
+        for typ, size in zip(["-bzImage", "-vmlinux", ""], compression_sizes):
+            record["{}{}".format(compression, typ)] = int(size)
+    return record
+
+
+## format_compressed_sizes
+# @brief Return the former text format of a record of the compressed sizes.
+def format_compressed_sizes(record):
+    """Format the compressed sizes like ``"<column> : <size> , ..."``, as
+    stored in the database.
+
+    :param record: record of the compressed sizes
+    :type record: dict
+    :return: the compressed sizes as text
+    :rtype: str
+    """
+    return " , ".join("{} : {}".format(column, record[column])
+                      for column in COMPRESSED_SIZE_COLUMNS)
+
+
+## parse_compressed_sizes
+# @brief Return the record of compressed sizes stored in the text format.
+def parse_compressed_sizes(text):
+    """Parse the compressed sizes stored as text, e.g. by the former
+    versions of TuxML.
+
+    :param text: compressed sizes like ``"<column> : <size> , ..."``
+    :type text: str
+    :return: record of the compressed sizes
+    :rtype: dict
+    """
+    record = dict.fromkeys(COMPRESSED_SIZE_COLUMNS, -1)
+    for item in text.split(" , "):
+        column, _, size = item.partition(" : ")
+        if column.strip() in record:
+            try:
+                record[column.strip()] = int(size)
+            except ValueError:
+                pass
+    return record
+
+
+## sizes_record
+# @brief Return the record of the additional sizes of a size report.
+def sizes_record(report=None):
+    """Build the record of the additional sizes, from the report of
+    `get_size_report <size_report.html>`_.
+
+    :param report: size report. Default to None, which means the sizes\
+    were not computed.
+    :type report: dict
+    :return: ``{column: size}``, empty if there is no report
+    :rtype: dict
+    """
+    record = dict()
+    if report is None:
+        return record
+    vmlinux = report['vmlinux'] or dict()
+    for section in ["text", "data", "bss"]:
+        record["vmlinux-{}".format(section)] = vmlinux.get(section, -1)
+    for subsystem, sizes in report['subsystems'].items():
+        for section in ["text", "data", "bss"]:
+            record["{}-{}".format(subsystem, section)] = sizes[section]
+        record["{}-objects".format(subsystem)] = len(sizes['objects'])
+    return record
@@ -116,8 +116,11 @@ def create_sub_image_tuxml_compressed(NameContent, tmp_location):
         shutil.copy2(
             "{}/dependencies_tree_fixer.py".format(os.path.dirname(os.path.abspath(__file__))),
             "{}/dependencies_tree_fixer.py".format(tmp_location))
+        shutil.copy2(
+            "{}/file_package_index.py".format(os.path.dirname(os.path.abspath(__file__))),
+            "{}/file_package_index.py".format(tmp_location))
 
-    content = "{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}".format(
+    content = "{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}\n{}".format(
         MyNameContent['DEBIAN_VERSION'],
         MyNameContent['MKDIR_TUXML'],
         MyNameContent['LINUX_TAR'],
@@ -128,6 +131,7 @@ def create_sub_image_tuxml_compressed(NameContent, tmp_location):
         MyNameContent['RUN_PIP'],
         MyNameContent['CPRUN_BB'],
         MyNameContent['ADD_DEP'],
+        MyNameContent['FILE_INDEX'],
         MyNameContent['DEV']
     )
     create_dockerfile(
@@ -141,6 +145,7 @@ def create_sub_image_tuxml_compressed(NameContent, tmp_location):
         os.remove("{}/installBusyBox.sh".format(tmp_location))
         os.remove("{}/init".format(tmp_location))
         os.remove("{}/dependencies_tree_fixer.py".format(tmp_location))
+        os.remove("{}/file_package_index.py".format(tmp_location))
 #################################################
 # 1
 #################################################
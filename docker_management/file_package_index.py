@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+
+## @file file_package_index.py
+# @brief Build, when creating the base image, the index used by
+# compilation/package_manager.py to find the package providing a missing file.
+# @details The index is a dbm database whose keys are the basenames of all the
+# header files known by apt-file, and whose values are the lines
+# "<package>:<path>" of the packages providing a file with this basename. It
+# turns each "apt-file search" made while compiling into a dictionary lookup.
+
+import dbm
+import subprocess
+import sys
+
+INDEX_PATH = "/file_package_index"
+
+
+def build_index(index_path=INDEX_PATH):
+    entries = dict()
+    search = subprocess.Popen(
+        args=["apt-file", "--regexp", "search", r"\.h$"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True
+    )
+    for line in search.stdout:
+        package, _, path = line.strip().partition(": ")
+        if not path:
+            continue
+        basename = path.split('/')[-1]
+        entries.setdefault(basename, list()).append(
+            "{}:{}".format(package, path))
+    if search.wait():
+        print("apt-file search failed, no index built.")
+        return False
+
+    with dbm.open(index_path, 'n') as index:
+        for basename, lines in entries.items():
+            index[basename] = "\n".join(lines)
+    print("File index built: {} basenames.".format(len(entries)))
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        build_index(sys.argv[1])
+    else:
+        build_index()
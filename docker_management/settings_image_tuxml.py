@@ -3,10 +3,17 @@ LINUX_KERNEL = 'linux-4.13.3'
 ## Information about the base image
 NAME_BASE_IMAGE = "tuxml/basetuxml-gcc6"
 
-BASIC_DEP = "gcc g++ make binutils util-linux kmod readline-common e2fsprogs jfsutils xfsprogs btrfs-progs pcmciautils ppp grub iptables openssl bc reiserfsprogs squashfs-tools quotatool nfs-kernel-server procps libssl-dev wget qemu-system qemu-utils initramfs-tools lzop liblz4-tool dialog moreutils bison libelf-dev flex libdb5.3-dev qemu python3-distro"
+BASIC_DEP = "gcc g++ make binutils util-linux kmod readline-common e2fsprogs jfsutils xfsprogs btrfs-progs pcmciautils ppp grub iptables openssl bc reiserfsprogs squashfs-tools quotatool nfs-kernel-server procps libssl-dev wget qemu-system qemu-utils initramfs-tools lzop liblz4-tool dialog moreutils bison libelf-dev flex libdb5.3-dev qemu python3-distro ccache"
 
 CLANG_DEP = "clang clang-9"
 
+# Save the list of the installed packages, used by
+# compilation/package_manager.py to know if a package is already installed
+INSTALLED_PACKAGES_CMD = "dpkg-query -W -f='${Package}\\n' > /installed_packages.txt"
+# Mark the packages lists as fresh, so that compilation/package_manager.py does
+# not update them again when the image is recent
+APT_UPDATE_MARKER_CMD = "apt-file update && touch /apt_update_marker"
+
 COMPILER_GCC_DEV_6 = "gcc-6-plugin-dev"
 COMPILER_GCC_DEV_8 = "gcc-8-plugin-dev"
 COMPILER_GCC_DEV_10 = "gcc-10-plugin-dev"
@@ -24,7 +31,7 @@ CONTENT_BASE_IMAGE = {
     'RUN_DEP': "RUN apt-get -qq -y update && apt-get -qq -y install python3 python3-dev python3-pip python3-setuptools default-libmysqlclient-dev apt-file apt-utils && apt-get install -qq -y --no-install-recommends --download-only " +
             BASIC_DEP + " " + COMPILER_GCC_DEV_6,
     'RUN_DEP_FILE': "RUN echo " + BASIC_DEP + " " + COMPILER_GCC_DEV_6 + " > /dependencies.txt",
-    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests",
+    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests kconfiglib",
     'CPRUN_BB': "COPY installBusyBox.sh /installBusyBox.sh\n"
                 "COPY init /init\n"
                 "RUN ./installBusyBox.sh\n"
@@ -32,6 +39,9 @@ CONTENT_BASE_IMAGE = {
     'ADD_DEP': "COPY dependencies_tree_fixer.py /dependencies_tree_fixer.py\n"
                "RUN ./dependencies_tree_fixer.py\n"
                "RUN rm /dependencies_tree_fixer.py",
+    'FILE_INDEX': "COPY file_package_index.py /file_package_index.py\n"
+                  "RUN apt-file update && python3 /file_package_index.py\n"
+                  "RUN rm /file_package_index.py",
     'DEV' : "RUN cat /etc/issue"
 }
 
@@ -55,7 +65,8 @@ CONTENT_BIG_IMAGE = {
     'PREVIMG_VERSION': "FROM " + NAME_IMAGE,
     'LINUX_UNTAR': "RUN tar xf /TuxML/linux-4.13.3.tar.xz -C /TuxML && rm /TuxML/linux-4.13.3.tar.xz",
     'TUXML_UNTAR': "RUN tar xf /TuxML/TuxML.tar.xz -C /TuxML && rm /TuxML/TuxML.tar.xz",
-    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)",
+    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)"
+                    " && " + INSTALLED_PACKAGES_CMD + " && " + APT_UPDATE_MARKER_CMD,
     'DEV' : "RUN cat /etc/issue"
 }
 
@@ -80,7 +91,7 @@ CONTENT_BASE_IMAGE_2 = {
     'RUN_DEP': "RUN apt-get -qq -y update && apt-get -qq -y install python3 python3-dev python3-pip python3-setuptools default-libmysqlclient-dev apt-file apt-utils && apt-get install -qq -y --no-install-recommends --download-only " +
             BASIC_DEP + " " + COMPILER_GCC_DEV_8,
     'RUN_DEP_FILE': "RUN echo " + BASIC_DEP + " " + COMPILER_GCC_DEV_8 + " > /dependencies.txt",
-    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests",
+    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests kconfiglib",
     'CPRUN_BB': "COPY installBusyBox.sh /installBusyBox.sh\n"
                 "COPY init /init\n"
                 "RUN ./installBusyBox.sh\n"
@@ -88,6 +99,9 @@ CONTENT_BASE_IMAGE_2 = {
     'ADD_DEP': "COPY dependencies_tree_fixer.py /dependencies_tree_fixer.py\n"
                "RUN ./dependencies_tree_fixer.py\n"
                "RUN rm /dependencies_tree_fixer.py",
+    'FILE_INDEX': "COPY file_package_index.py /file_package_index.py\n"
+                  "RUN apt-file update && python3 /file_package_index.py\n"
+                  "RUN rm /file_package_index.py",
     'DEV' : "RUN cat /etc/issue"
 }
 
@@ -111,7 +125,8 @@ CONTENT_BIG_IMAGE_2 = {
     'PREVIMG_VERSION': "FROM " + NAME_IMAGE_2,
     'LINUX_UNTAR': "RUN tar xf /TuxML/linux-4.13.3.tar.xz -C /TuxML && rm /TuxML/linux-4.13.3.tar.xz",
     'TUXML_UNTAR': "RUN tar xf /TuxML/TuxML.tar.xz -C /TuxML && rm /TuxML/TuxML.tar.xz",
-    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)",
+    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)"
+                    " && " + INSTALLED_PACKAGES_CMD + " && " + APT_UPDATE_MARKER_CMD,
     'DEV' : "RUN cat /etc/issue"
 }
 
@@ -137,7 +152,7 @@ CONTENT_BASE_IMAGE_3 = {
     'RUN_DEP': "RUN apt-get -qq -y update && apt-get -qq -y install python3 python3-dev python3-pip python3-setuptools default-libmysqlclient-dev apt-file apt-utils && apt-get install -qq -y --no-install-recommends --download-only " +
             BASIC_DEP + " " + COMPILER_GCC_DEV_10 + " " + CLANG_DEP ,
     'RUN_DEP_FILE': "RUN echo " + BASIC_DEP + " " + COMPILER_GCC_DEV_10 + " " + CLANG_DEP + " > /dependencies.txt",
-    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests",
+    'RUN_PIP': "RUN pip3 install wheel mysqlclient psutil pytest pytest-cov requests kconfiglib",
     'CPRUN_BB': "COPY installBusyBox.sh /installBusyBox.sh\n"
                 "COPY init /init\n"
                 "RUN ./installBusyBox.sh\n"
@@ -145,6 +160,9 @@ CONTENT_BASE_IMAGE_3 = {
     'ADD_DEP': "COPY dependencies_tree_fixer.py /dependencies_tree_fixer.py\n"
                "RUN ./dependencies_tree_fixer.py\n"
                "RUN rm /dependencies_tree_fixer.py",
+    'FILE_INDEX': "COPY file_package_index.py /file_package_index.py\n"
+                  "RUN apt-file update && python3 /file_package_index.py\n"
+                  "RUN rm /file_package_index.py",
     'DEV' : "RUN cat /etc/issue"
 }
 
@@ -168,6 +186,7 @@ CONTENT_BIG_IMAGE_3 = {
     'PREVIMG_VERSION': "FROM " + NAME_IMAGE_3,
     'LINUX_UNTAR': "RUN tar xf /TuxML/linux-4.13.3.tar.xz -C /TuxML && rm /TuxML/linux-4.13.3.tar.xz",
     'TUXML_UNTAR': "RUN tar xf /TuxML/TuxML.tar.xz -C /TuxML && rm /TuxML/TuxML.tar.xz",
-    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)",
+    'RUN_DEP_FILE': "RUN apt-get update && apt-get install -y --no-install-recommends $(cat /dependencies.txt)"
+                    " && " + INSTALLED_PACKAGES_CMD + " && " + APT_UPDATE_MARKER_CMD,
     'DEV' : "RUN cat /etc/issue"
 }
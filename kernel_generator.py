@@ -9,11 +9,20 @@ import argparse
 import subprocess
 import os
 import shutil
+import sys
+import time
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import compilation.settings as settings
+from compilation.result_spool import ResultSpool
 
 __COMPRESSED_IMAGE = "tuxml/tartuxml-gcc6"
 __IMAGE = "tuxml/tuxml-gcc6"
 __DEFAULT_V4 = "4.13.3"
+# Where the spools of the containers are stored (see retrieve_spool)
+__SPOOL_DIRECTORY = "Spool"
+__BENCHMARK_DIRECTORY = "Benchmark"
 # __sudo_right: internal global variable whose goal is to use sudo if the user
 # isn't in the docker group.
 __sudo_right = ""
@@ -273,6 +282,19 @@ def docker_pull(image, tag=None):
     subprocess.call(args=str_pull, shell=True)
 
 
+## __seed_argument
+# @brief Return the value of --seed, telling about its former meaning when it
+# is not an integer.
+def __seed_argument(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "{} is not an integer. --seed is now the seed of the random "
+            "configurations, the preset file formerly given with --seed is "
+            "given with --preset.".format(value))
+
+
 # parser
 # @author PICARD Michaël
 # @version 1
@@ -341,7 +363,27 @@ def parser():
     )
     parser.add_argument(
         "--preset",
-        help="Give a path to a specific preset options file. These options will be activated/deactivated before the others are randomly chosen (works also for tiny). The file will replace compilation/tuxml.config (note: previously known as --seed)"
+        help="Give a path to a specific preset options file. These options will be activated/deactivated before the others are randomly chosen (works also for tiny). The file will replace compilation/tuxml.config. This option used to be named --seed, which is now the seed of the random configurations."
+    )
+    parser.add_argument(
+        "--seed",
+        type=__seed_argument,
+        default=None,
+        help="Optional. Seed (integer) of the random configuration of the "
+             "first compilation (KCONFIG_SEED), the next compilations using "
+             "the next seeds. Incompatible with --tiny and --configs. Note: "
+             "--seed used to give the preset file, which is now given with "
+             "--preset."
+    )
+    parser.add_argument(
+        "--seed-range",
+        dest="seed_range",
+        metavar="START:STOP",
+        default=None,
+        help="Optional. Compile one random configuration for each seed from "
+             "START to STOP (excluded), which sets the number of containers. "
+             "Disjoint ranges shard a campaign between nodes. Incompatible "
+             "with --seed, --tiny and --configs."
     )
     parser.add_argument(
         "--linux_version",
@@ -374,6 +416,15 @@ def parser():
              "--linux_version, --silent, --fetch_kernel and incremental "
              "feature during runtime."
     )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Optional. Build the benchmark configurations (tinyconfig with "
+             "each preset of the image, and --configs if given) and save the "
+             "time spent in each phase of TuxML into the {} directory. "
+             "Nothing is sent to the database. Uses --boot, --checksize and "
+             "--number_cpu.".format(__BENCHMARK_DIRECTORY)
+    )
     parser.add_argument(
         "-n",
         "--number_cpu",
@@ -381,6 +432,24 @@ def parser():
              "Useful if your computer can't handle the process at full power.",
         type=int
     )
+    parser.add_argument(
+        "--parallel",
+        help="Optional. Number of containers to keep compiling at the same "
+             "time. The cpu cores given with --number_cpu (or all the cores "
+             "by default) are split between them. Default to 1, which means "
+             "one container after the other.",
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        "--builds_per_container",
+        help="Optional. Number of compilations made one after the other in "
+             "each container, which stays alive between them (see the "
+             "--worker argument of compilation/main.py). Default to 1. "
+             "Incompatible with --incremental.",
+        type=int,
+        default=1
+    )
     parser.add_argument(
         "--json",
         type=str,
@@ -392,6 +461,62 @@ def parser():
         action="store_true",
         help="Optional. Enables to use the local source scripts/files without recreating the Docker images"
     )
+    parser.add_argument(
+        "--api_address",
+        type=str,
+        default=None,
+        help="Optional. Address of the TuxML API to send the results to, "
+             "e.g. a local one on a node without access to the default one."
+    )
+    parser.add_argument(
+        "--log_retention",
+        choices=["full", "tail", "errors", "none_on_success"],
+        default=None,
+        help="Optional. What is sent of the logs of each compilation: full, "
+             "tail (the last lines), errors (the error lines only) or "
+             "none_on_success. The whole logs can still be saved with --logs."
+    )
+    parser.add_argument(
+        "--shared_sources",
+        type=str,
+        default=None,
+        help="Optional. Host directory where the Linux sources of each "
+             "version are extracted once. Each container builds in a "
+             "copy-on-write overlay of this pristine tree instead of its own "
+             "copy, so the containers start at once, share the page cache "
+             "and only store the files they write."
+    )
+    parser.add_argument(
+        "--replay-spool",
+        dest="replay_spool",
+        action="store_true",
+        help="Send again to the TuxML API the results it did not accept, "
+             "from the spools retrieved in the {} directory. Prevent any "
+             "compilation to happen.".format(__SPOOL_DIRECTORY)
+    )
+    parser.add_argument(
+        "--replay-uncertain",
+        dest="replay_uncertain",
+        action="store_true",
+        help="Optional. With --replay-spool, send again the results the "
+             "TuxML API may have stored without giving their cid (e.g. "
+             "timeout) too. They may be duplicated in the database."
+    )
+    parser.add_argument(
+        "--replay_jobs",
+        type=int,
+        default=4,
+        help="Optional. Number of requests sent at the same time to the "
+             "TuxML API with --replay-spool. Default to 4."
+    )
+    parser.add_argument(
+        "--ccache",
+        type=str,
+        default=None,
+        help="Optional. Path to a host directory used as a compiler cache "
+             "(ccache) shared by all the containers. Builds of repeated or "
+             "similar configurations reuse the objects already compiled."
+    )
 
     parser.add_argument(
         "--tagbuild",
@@ -458,6 +583,42 @@ def check_precondition_and_warning(args):
         raise NotImplementedError(
             "You can't compile with a negative or null number of cpu."
         )
+    if args.parallel <= 0:
+        raise ValueError(
+            "You can't run less than 1 container at the same time.")
+    if args.replay_jobs <= 0:
+        raise ValueError(
+            "You can't send less than 1 request at the same time.")
+    if args.replay_uncertain and not args.replay_spool:
+        raise NotImplementedError(
+            "You can't use replay-uncertain without replay-spool.")
+    if args.builds_per_container <= 0:
+        raise ValueError(
+            "You can't make less than 1 compilation per container.")
+    if args.builds_per_container > 1 and args.incremental > 0:
+        raise NotImplementedError(
+            "You can't use builds_per_container with incremental "
+            "compilations."
+        )
+    if args.seed is not None or args.seed_range is not None:
+        if args.tiny or args.configs is not None:
+            raise NotImplementedError(
+                "You can't use a seed with tiny or config parameter.")
+        if args.seed is not None and args.seed_range is not None:
+            raise NotImplementedError(
+                "You can't use seed and seed-range at the same time.")
+    if args.seed_range is not None:
+        start, _, stop = args.seed_range.partition(":")
+        try:
+            args.seed_range = (int(start), int(stop))
+        except ValueError:
+            raise ValueError("The seed range must be like START:STOP.")
+        builds = args.builds_per_container * (args.incremental + 1)
+        if args.seed_range[1] <= args.seed_range[0] \
+                or (args.seed_range[1] - args.seed_range[0]) % builds:
+            raise ValueError(
+                "The seed range must hold a multiple of {} seeds, the "
+                "number of compilations per container.".format(builds))
 
     if args.compiler != "gcc6" and args.compiler != "gcc8" and args.compiler != "gcc10" and args.compiler != "clang9" and args.compiler != "clang11":
         raise ValueError("Only gcc6, gcc8, gcc10, clang9, and clang11 are supported")
@@ -468,12 +629,6 @@ def check_precondition_and_warning(args):
         args.configs = None
         args.silent = None
 
-    # not implemented yet
-    if args.incremental > 0:
-        raise NotImplementedError(
-            "Currently unsupported."
-        )
-
     # warning
     set_prompt_color("Orange")
     # user right : sudo or docker group
@@ -496,6 +651,9 @@ def check_precondition_and_warning(args):
         print("--json | You will save the build information locally into a JSON file.")
     if args.mount_host_dev:
         print("--mount_host_dev | You will use your local code instead of the one contained in docker image. Usefull for development only.")
+    if args.ccache is not None:
+        print("--ccache | You will share the compiler cache {} between the "
+              "containers.".format(args.ccache))
     if args.configs is not None:
         print("--configs | You are using the following configuration(s):")
         for conf in args.configs:
@@ -504,9 +662,28 @@ def check_precondition_and_warning(args):
         print("--preset | You are using a specific set of options' values (preset=", args.preset, ")")
     if args.tagbuild is not None:
         print("--tagbuild | You are tagging build(s)")
+    if args.parallel > 1:
+        print("--parallel | You will run up to {} containers at the same "
+              "time.".format(args.parallel))
+    if args.builds_per_container > 1:
+        print("--builds_per_container | Each container will make {} "
+              "compilations.".format(args.builds_per_container))
+    if args.seed is not None:
+        print("--seed | The random configurations will use the seeds from "
+              "{}.".format(args.seed))
+    if args.seed_range is not None:
+        print("--seed-range | You will compile the random configurations of "
+              "the seeds {} to {}.".format(args.seed_range[0],
+                                          args.seed_range[1] - 1))
+    if args.shared_sources is not None:
+        print("--shared_sources | The containers will share the Linux sources "
+              "extracted in {}.".format(args.shared_sources))
     if args.unit_testing:
         print("--unit_testing | You will unit test the project, which will not compile any "
               "kernel and could have disabled a few of your option choice.")
+    if args.benchmark:
+        print("--benchmark | You will time the phases of TuxML on a fixed set "
+              "of configurations, without sending any result.")
     set_prompt_color()
 
 
@@ -526,8 +703,11 @@ def docker_uncompress_image(tag):
     content = "{}\n" \
               "RUN tar xf /TuxML/linux-4.13.3.tar.xz -C /TuxML && rm /TuxML/linux-4.13.3.tar.xz\n" \
               "RUN tar xf /TuxML/TuxML.tar.xz -C /TuxML && rm /TuxML/TuxML.tar.xz\n" \
-              "RUN apt-get update && apt-get install -qq -y --no-install-recommends $(cat /dependencies.txt)".format(
-                  content)
+              "RUN apt-get update && apt-get install -qq -y --no-install-recommends $(cat /dependencies.txt)" \
+              " && dpkg-query -W -f='${{Package}}\\n' > {}" \
+              " && apt-file update && touch {}".format(
+                  content, settings.INSTALLED_PACKAGES_FILE,
+                  settings.APT_UPDATE_MARKER_FILE)
     create_dockerfile(content=content, path=".")
     docker_build(
         image=__IMAGE,
@@ -644,7 +824,7 @@ def docker_image_auto_cleaner(tag, old_image_id=None):
 # image tag.
 # @pre The __IMAGE:tag image already exist.
 # @return The corresponding tag.
-def docker_build_version_image(tag, version):
+def docker_build_version_image(tag, version, shared_sources=False):
     """Download and create an image with different Linux kernel versions
     inside. Builds only if in need, otherwise return the image tag.
 
@@ -659,23 +839,35 @@ def docker_build_version_image(tag, version):
     :param v4: Linux v4 version. If you need 4.14.152, you need to write\
     ``"14.152"``
     :type v4: str
+    :param shared_sources: the sources are mounted from the host (See\
+    :py:func:`prepare_shared_sources`), hence not stored in the image
+    :type shared_sources: bool
     :return: image's tag
     :rtype: str
 
     """
     tagv = "{}-v{}".format(tag, version)
+    if shared_sources:
+        tagv = "{}-shared".format(tagv)
     if not docker_image_exist(__IMAGE, tagv):
         set_prompt_color("Purple")
         print("Building specific image for linux v{} ...".format(version))
         set_prompt_color()
         linux_kernel = "linux-{}.tar.xz".format(version)
-        get_linux_kernel(linux_kernel[:-7])
-        docker_file_content = "FROM {0}:{1}\n" \
-                              "COPY {2} /TuxML/{2}\n" \
-                              "RUN echo \"{3}\" > /kernel_version.txt\n" \
-                              "RUN tar xf /TuxML/{2} -C /TuxML && rm /TuxML/{2}\n" \
-                              "RUN rm -rf /TuxML/linux-4.13.3".format(
-                                  __IMAGE, tag, linux_kernel, version)
+        if shared_sources:
+            docker_file_content = "FROM {0}:{1}\n" \
+                                  "RUN echo \"{2}\" > /kernel_version.txt\n" \
+                                  "RUN rm -rf /TuxML/linux-4.13.3 && " \
+                                  "mkdir /TuxML/linux-{2}".format(
+                                      __IMAGE, tag, version)
+        else:
+            get_linux_kernel(linux_kernel[:-7])
+            docker_file_content = "FROM {0}:{1}\n" \
+                                  "COPY {2} /TuxML/{2}\n" \
+                                  "RUN echo \"{3}\" > /kernel_version.txt\n" \
+                                  "RUN tar xf /TuxML/{2} -C /TuxML && rm /TuxML/{2}\n" \
+                                  "RUN rm -rf /TuxML/linux-4.13.3".format(
+                                      __IMAGE, tag, linux_kernel, version)
         create_dockerfile(docker_file_content)
         docker_build(__IMAGE, tagv)
         os.remove("Dockerfile")
@@ -726,6 +918,87 @@ def get_linux_kernel(name, path=None):
         print("Linux kernel found.")
 
 
+def prepare_shared_sources(directory, version):
+    """Extract the Linux sources of a version once in a host directory,
+    shared by all the containers (See :py:func:`create_source_overlay`).
+    Nothing is done if they are already extracted.
+
+    :param directory: host directory of the shared sources
+    :type directory: str
+    :param version: Linux kernel version
+    :type version: str
+    :return: path to the pristine Linux tree
+    :rtype: str
+    """
+    directory = os.path.abspath(directory)
+    name = "linux-{}".format(version)
+    path = os.path.join(directory, name)
+    # Written once the whole tree is extracted
+    marker = "{}.extracted".format(path)
+    if not os.path.exists(marker):
+        set_prompt_color("Purple")
+        print("Extracting the shared sources of linux v{} ...".format(version))
+        set_prompt_color()
+        os.makedirs(directory, exist_ok=True)
+        shutil.rmtree(path, ignore_errors=True)
+        get_linux_kernel(name)
+        subprocess.run(
+            args="tar xf {}.tar.xz -C {}".format(name, directory),
+            shell=True,
+            check=True
+        )
+        open(marker, "w").close()
+    return path
+
+
+def create_source_overlay(source_path, directory, name):
+    """Create a docker volume mounting a copy-on-write overlay of the
+    pristine Linux tree: the container reads the shared files and only
+    stores the ones it writes, in ``<directory>/overlays/<name>``.
+
+    :param source_path: path to the pristine Linux tree (See\
+    :py:func:`prepare_shared_sources`)
+    :type source_path: str
+    :param directory: host directory of the shared sources
+    :type directory: str
+    :param name: name of the volume, unique among the running containers
+    :type name: str
+    :return: name of the volume
+    :rtype: str
+    """
+    overlay = os.path.join(os.path.abspath(directory), "overlays", name)
+    os.makedirs(os.path.join(overlay, "upper"), exist_ok=True)
+    os.makedirs(os.path.join(overlay, "work"), exist_ok=True)
+    subprocess.run(
+        args="{}docker volume create --driver local --opt type=overlay "
+             "--opt device=overlay --opt o=lowerdir={},upperdir={},workdir={} "
+             "{}".format(__sudo_right, source_path,
+                        os.path.join(overlay, "upper"),
+                        os.path.join(overlay, "work"), name),
+        shell=True,
+        stdout=subprocess.DEVNULL,
+        check=True
+    )
+    return name
+
+
+def delete_source_overlay(directory, name):
+    """Delete the docker volume of an overlay and the files written in it
+
+    :param directory: host directory of the shared sources
+    :type directory: str
+    :param name: name of the volume
+    :type name: str
+    """
+    subprocess.call(
+        "{}docker volume rm {}".format(__sudo_right, name), shell=True,
+        stdout=subprocess.DEVNULL)
+    # The files written by the container belong to its user
+    subprocess.call(
+        "{}rm -rf {}".format(__sudo_right, os.path.join(
+            os.path.abspath(directory), "overlays", name)), shell=True)
+
+
 # docker_image_exist
 # @author Picard Michaël
 # @version 1
@@ -756,8 +1029,10 @@ def docker_image_exist(image, tag=None):
 
 
 def run_docker_compilation(image, incremental, tiny, config, preset,
-                           silent, cpu_cores, boot, check_size, json, mount_host_dev, tagbuild, compiler, arch
-                           ):
+                           silent, cpu_cores, boot, check_size, json, mount_host_dev, tagbuild, compiler, arch,
+                           ccache=None, api_address=None, log_retention=None,
+                           builds_per_container=1, source_volume=None,
+                           linux_version=__DEFAULT_V4, seed=None):
     """Run a docker container to compiler a Linux kernel
 
     :param image: docker image
@@ -779,23 +1054,50 @@ def run_docker_compilation(image, incremental, tiny, config, preset,
     :param check_size: check the size information of the compiled kernel
     :type check_size: bool
     :type tagbuild: str
+    :param ccache: host directory to mount as the shared compiler cache.\
+    Default to None, which means no cache.
+    :type ccache: str
+    :param api_address: address of the TuxML API. Default to None, which\
+    means the default one.
+    :type api_address: str
+    :param log_retention: what is sent of the logs. Default to None, which\
+    means the default policy of the image.
+    :type log_retention: str
+    :param builds_per_container: number of compilations made one after the\
+    other in the container
+    :type builds_per_container: int
+    :param source_volume: docker volume mounted as the Linux tree (See\
+    :py:func:`create_source_overlay`). Default to None, which means the\
+    tree of the image.
+    :type source_volume: str
+    :param linux_version: Linux kernel version of the image
+    :type linux_version: str
+    :param seed: seed of the random configuration of the first\
+    compilation, the next ones using the next seeds. Default to None,\
+    which means new ones.
+    :type seed: int
     :return: id of the running container
     :rtype: str
     """
     # Starting the container
+    volumes = ""
     if mount_host_dev:
-        container_id = subprocess.check_output(
-            args="{}docker run -i -v $PWD/compilation:/TuxML/compilation -d {}".format(
-                __sudo_right, image),
-            shell=True
-        ).decode('UTF-8')
-        container_id = container_id.split("\n")[0]
-    else :
-        container_id = subprocess.check_output(
-        args="{}docker run -i -d {}".format(__sudo_right, image),
+        volumes = "{}-v $PWD/compilation:/TuxML/compilation ".format(volumes)
+    if ccache is not None:
+        volumes = "{}-v {}:{} ".format(
+            volumes, os.path.abspath(ccache), settings.CCACHE_DIRECTORY)
+    if source_volume is not None:
+        # The overlay hides the tree of the image, if any
+        volumes = "{}--mount type=volume,source={},target=/TuxML/linux-{} ".format(
+            volumes, source_volume, linux_version)
+    # Hardware acceleration of the boot tests, when the host supports it
+    if boot and os.path.exists("/dev/kvm"):
+        volumes = "{}--device /dev/kvm ".format(volumes)
+    container_id = subprocess.check_output(
+        args="{}docker run -i {}-d {}".format(__sudo_right, volumes, image),
         shell=True
-        ).decode('UTF-8')
-        container_id = container_id.split("\n")[0]
+    ).decode('UTF-8')
+    container_id = container_id.split("\n")[0]
     # Converting parameter
     specific_configuration = ""
     if tiny:
@@ -841,6 +1143,26 @@ def run_docker_compilation(image, incremental, tiny, config, preset,
         check_size = "--check_size"
     else:
         check_size = ""
+    if ccache is not None:
+        ccache = "--ccache"
+    else:
+        ccache = ""
+    if api_address is not None:
+        api_address = "--api_address {}".format(api_address)
+    else:
+        api_address = ""
+    if log_retention is not None:
+        log_retention = "--log_retention {}".format(log_retention)
+    else:
+        log_retention = ""
+    if seed is not None:
+        seed = "--seed {}".format(seed)
+    else:
+        seed = ""
+    worker = ""
+    if builds_per_container > 1:
+        worker = "--worker {} --worker_jobs {}".format(
+            settings.WORKER_QUEUE_DIRECTORY, builds_per_container)
 
     compiler_instr = "" # gcc by default and no need to mention clang version
     # if compiler != "gcc6":        
@@ -855,7 +1177,7 @@ def run_docker_compilation(image, incremental, tiny, config, preset,
     else:
         sarch = ''
 
-    docker_args = "{}docker exec -t {} /bin/bash -c '/TuxML/compilation/main.py {} {} {} {} {} {} {} {} {} {} | ts -s'".format(
+    docker_args = "{}docker exec -t {} /bin/bash -c '/TuxML/compilation/main.py {} {} {} {} {} {} {} {} {} {} {} {} {} {} {} | ts -s'".format(
             __sudo_right,
             container_id,
             incremental,
@@ -867,7 +1189,12 @@ def run_docker_compilation(image, incremental, tiny, config, preset,
             json, 
             tagb,
             compiler_instr, 
-            sarch
+            sarch,
+            ccache,
+            api_address,
+            log_retention,
+            worker,
+            seed
         )
     print("Docker command ", docker_args)
     set_prompt_color()
@@ -934,9 +1261,153 @@ def feedback_user(nbcontainer, nbincremental):
     set_prompt_color()
 
 
+def feedback_throughput(nbbuild, elapsed_time):
+    """ Print on standard output the throughput of the whole run
+
+    :param nbbuild: number of builds done
+    :type nbbuild: int
+    :param elapsed_time: wall time of the whole run, in seconds
+    :type elapsed_time: float
+    """
+    builds_per_hour = 0
+    if elapsed_time > 0:
+        builds_per_hour = nbbuild * 3600 / elapsed_time
+
+    set_prompt_color("Light_Blue")
+    print("Total time : ", end="")
+    set_prompt_color("Green")
+    print(time.strftime("%H:%M:%S", time.gmtime(elapsed_time)))
+    set_prompt_color("Light_Blue")
+    print("Throughput : ", end="")
+    set_prompt_color("Green")
+    print("{:.2f}".format(builds_per_hour), end="")
+    set_prompt_color("Light_Blue")
+    print(" builds per hour.")
+    set_prompt_color()
+
+
+# get_cpu_cores_per_container
+# @version 1
+# @brief Split the cpu cores to use between the running containers.
+def get_cpu_cores_per_container(number_cpu, parallel):
+    """Split the cpu cores to use between the containers running at the
+    same time.
+
+    :param number_cpu: number of cpu cores to use. None means all the\
+    cores of the host.
+    :type number_cpu: int
+    :param parallel: number of containers running at the same time
+    :type parallel: int
+    :return: number of cpu cores per container. None when the split is\
+    not needed (every container will use all the cores).
+    :rtype: int
+    """
+    if parallel <= 1:
+        return number_cpu
+    if number_cpu is None:
+        number_cpu = os.cpu_count()
+    return max(1, number_cpu // parallel)
+
+
+# get_container_output_name
+# @version 1
+# @brief Suffix a logs directory or a JSON filename with the container number.
+def get_container_output_name(name, number):
+    """Suffix a logs directory or a JSON filename with the container number,
+    so that containers never overwrite the output of each other.
+
+    :param name: logs directory or JSON filename
+    :type name: str
+    :param number: number of the container
+    :type number: int
+    :return: the suffixed name
+    :rtype: str
+    """
+    root, extension = os.path.splitext(name.rstrip("/"))
+    return "{}_{}{}".format(root, number, extension)
+
+
+def compilation_one_container(image, args, number, config, cpu_cores,
+                              separate_outputs, seed=None):
+    """Runs the compilation in one container, fetch its results and delete
+    it.
+
+    :param image: docker image
+    :type image: str
+    :param args: parsed argument options
+    :type args: `argparse.Namespace`_
+    :param number: number of the container
+    :type number: int
+    :param config: path to a configuration file
+    :type config: str
+    :param cpu_cores: number of cpu cores for the compilation
+    :type cpu_cores: int
+    :param separate_outputs: store the logs and the JSON of this container\
+    apart from the other ones
+    :type separate_outputs: bool
+    :param seed: seed of the random configuration of the first compilation\
+    of this container
+    :type seed: int
+    """
+    if not args.silent:
+        set_prompt_color("Light_Blue")
+        print("\n=============== Docker number ", number, " ===============")
+        set_prompt_color()
+    source_volume = None
+    if args.shared_sources is not None:
+        source_volume = create_source_overlay(
+            args.shared_source_path, args.shared_sources,
+            "tuxml-linux-{}-{}-{}".format(args.linux_version, os.getpid(),
+                                          number))
+    container_id = run_docker_compilation(
+        image,
+        args.incremental,
+        args.tiny,
+        config,
+        args.preset,
+        args.silent,
+        cpu_cores,
+        args.boot,
+        args.checksize,
+        args.json,
+        args.mount_host_dev,
+        tagbuild=args.tagbuild,
+        compiler=args.compiler,
+        arch=args.arch,
+        ccache=args.ccache,
+        api_address=args.api_address,
+        log_retention=args.log_retention,
+        builds_per_container=args.builds_per_container,
+        source_volume=source_volume,
+        linux_version=args.linux_version,
+        seed=seed
+    )
+    if args.logs is not None:
+        logs = args.logs
+        if separate_outputs:
+            logs = get_container_output_name(args.logs, number)
+            os.makedirs(logs, exist_ok=True)
+        fetch_logs(container_id, logs, args.silent)
+    if args.json:
+        json_filename = args.json
+        if separate_outputs:
+            json_filename = get_container_output_name(args.json, number)
+        if args.builds_per_container > 1:
+            retrieve_worker_results(container_id, json_filename)
+        else:
+            retrieve_Json(container_id, json_filename, args.incremental)
+    retrieve_spool(container_id)
+    delete_docker_container(container_id)
+    if source_volume is not None:
+        delete_source_overlay(args.shared_sources, source_volume)
+
+
 def compilation(image, args):
     """Runs the compilation on the specified number of container.
 
+    With ``--parallel``, up to ``args.parallel`` containers are kept busy
+    at the same time and the cpu cores are split between them.
+
     :param image: docker image
     :type image: str
     :param args: parsed argument options
@@ -946,44 +1417,46 @@ def compilation(image, args):
     # case when a list of configs is given as argument
     if args.configs is not None:
         nbcontainer = len(args.configs)
-    config = None
-    for i in range(nbcontainer):
-        if not args.silent:
-            set_prompt_color("Light_Blue")
-            print("\n=============== Docker number ", i, " ===============")
-            set_prompt_color()
-        # If the user gives a list of configurations to --config
-        if args.configs is not None:
-            if len(args.configs) >= 1:
-                config = args.configs[i]
-            # We do not need the following condition because
-            # we will never reach it since nbcontainer = args.configs
-            # elif len(args.configs) == 1:
-            #     config = args.config[0]
-            # else is already handled by config = None earlier
-        container_id = run_docker_compilation(
-            image,
-            args.incremental,
-            args.tiny,
-            config,
-            args.preset,
-            args.silent,
-            args.number_cpu,
-            args.boot,
-            args.checksize,
-            args.json,
-            args.mount_host_dev,
-            tagbuild=args.tagbuild,
-            compiler=args.compiler, 
-            arch=args.arch
-        )
-        if args.logs is not None:
-            fetch_logs(container_id, args.logs, args.silent)
-        if args.json :
-            retrieve_Json(container_id, args.json)
-        delete_docker_container(container_id)
+    # If the user gives a list of configurations to --config, each container
+    # gets its own one
+    configs = [None] * nbcontainer
+    if args.configs is not None:
+        configs = args.configs
+    # Each container uses the seeds following the ones of the previous
+    # container, one per compilation
+    builds = args.builds_per_container * (args.incremental + 1)
+    first_seed = args.seed
+    if args.seed_range is not None:
+        first_seed = args.seed_range[0]
+        nbcontainer = (args.seed_range[1] - args.seed_range[0]) // builds
+        configs = [None] * nbcontainer
+    seeds = [None] * nbcontainer
+    if first_seed is not None:
+        seeds = [first_seed + i * builds for i in range(nbcontainer)]
+    parallel = min(args.parallel, nbcontainer)
+    cpu_cores = get_cpu_cores_per_container(args.number_cpu, parallel)
+    separate_outputs = parallel > 1
+
+    start_time = time.time()
+    if parallel <= 1:
+        for i in range(nbcontainer):
+            compilation_one_container(image, args, i, configs[i], cpu_cores,
+                                      separate_outputs, seeds[i])
+    else:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [
+                executor.submit(compilation_one_container, image, args, i,
+                                configs[i], cpu_cores, separate_outputs,
+                                seeds[i])
+                for i in range(nbcontainer)]
+            for future in futures:
+                future.result()
+    elapsed_time = time.time() - start_time
+
     if not args.silent:
         feedback_user(nbcontainer, args.incremental)
+        feedback_throughput(nbcontainer * (args.incremental + 1)
+                            * args.builds_per_container, elapsed_time)
 
 
 def run_unit_testing(image):
@@ -1008,6 +1481,57 @@ def run_unit_testing(image):
     delete_docker_container(container_id)
 
 
+def run_benchmark(image, args):
+    """Runs the benchmark of TuxML (See ``compilation/benchmark.py``) on the
+    image and copies its timings into the benchmark directory
+
+    :param image: docker image
+    :type image: str
+    :param args: parsed argument options
+    :type args: `argparse.Namespace`_
+    """
+    volumes = ""
+    if args.boot and os.path.exists("/dev/kvm"):
+        volumes = "--device /dev/kvm "
+    container_id = subprocess.check_output(
+        args="{}docker run -i {}-d {}".format(__sudo_right, volumes, image),
+        shell=True
+    ).decode('UTF-8')
+    container_id = container_id.split("\n")[0]
+    options = ""
+    if args.number_cpu:
+        options = "{} --cpu_cores {}".format(options, args.number_cpu)
+    if args.boot:
+        options = "{} --boot".format(options)
+    if args.checksize:
+        options = "{} --check_size".format(options)
+    if args.configs is not None:
+        for i, config in enumerate(args.configs):
+            subprocess.call(
+                args="{}docker cp {} {}:/TuxML/benchmark_{}.config".format(
+                    __sudo_right, config, container_id, i),
+                shell=True
+            )
+        options = "{} --config {}".format(options, " ".join(
+            "/TuxML/benchmark_{}.config".format(i)
+            for i in range(len(args.configs))))
+    subprocess.call(
+        args="{}docker exec -t {} /TuxML/compilation/benchmark.py{}".format(
+            __sudo_right, container_id, options),
+        shell=True
+    )
+    os.makedirs(__BENCHMARK_DIRECTORY, exist_ok=True)
+    filename = "{}/{}.json".format(
+        __BENCHMARK_DIRECTORY, time.strftime("%Y%m%d-%H%M%S"))
+    subprocess.run(
+        args="{}docker cp {}:{} {}".format(
+            __sudo_right, container_id, settings.BENCHMARK_FILE, filename),
+        shell=True, stdout=subprocess.DEVNULL
+    )
+    print("Benchmark saved into {}".format(filename))
+    delete_docker_container(container_id)
+
+
 # fetch_logs
 # @author PICARD Michaël
 # @version 1
@@ -1038,28 +1562,170 @@ def fetch_logs(container_id, directory, silent=False):
         print("Done", flush=True)
 
 
-def retrieve_Json(container_id, json_filename=None):
+def retrieve_Json(container_id, json_filename=None, incremental=0):
+    """Copy the JSON files of the builds from the container into the Json
+    directory
+
+    :param container_id: id of the container
+    :type container_id: str
+    :param json_filename: name of the JSON file of the base build. Default\
+    to None, which means ``<container_id>.json``
+    :type json_filename: str
+    :param incremental: number of incremental builds whose JSON file has to\
+    be retrieved too, as ``<json_filename>_<level>``
+    :type incremental: int
+    """
     set_prompt_color("Light_Blue")
     if json_filename is None: # TODO: actually there is a precondition that precludes the call of the function so we could "return/stop" directly 
         json_filename = str(container_id) + ".json" # by default, the container ID is the name of the JSON filename
 
-    print("Creating JSON file locally: {}".format(json_filename))
+    files = [(settings._JSON_INTERNAL_FILENAME, json_filename)]
+    for level in range(1, incremental + 1):
+        files.append((settings._JSON_INCREMENTAL_FILENAME.format(level),
+                      get_container_output_name(json_filename, level)))
+    for internal_filename, local_filename in files:
+        set_prompt_color("Light_Blue")
+        print("Creating JSON file locally: {}".format(local_filename))
+        try:
+            cmd = "{}docker cp {}:{} Json/{}".format(
+                __sudo_right, container_id, internal_filename, local_filename)
+            subprocess.run(args=cmd, shell=True, stdout=subprocess.DEVNULL, check=True)
+        except subprocess.CalledProcessError as e:
+            set_prompt_color("Red")
+            print("JSON file was not created locally")
+        else:
+            set_prompt_color("Green")
+            print("JSON successfully retrieved!")
+    set_prompt_color()
+
+
+def retrieve_worker_results(container_id, json_filename):
+    """Copy the results of the compilations made by the worker of the
+    container (the ``done`` subdirectory of its queue) into the Json
+    directory
+
+    :param container_id: id of the container
+    :type container_id: str
+    :param json_filename: name of the directory to create in the Json\
+    directory
+    :type json_filename: str
+    """
+    directory = "Json/{}".format(os.path.splitext(json_filename)[0])
+    set_prompt_color("Light_Blue")
+    print("Retrieving the results of the worker into {}".format(directory))
     try:
-        cmd = "{}docker cp {}:{} Json/{}".format(
-            __sudo_right, container_id, settings._JSON_INTERNAL_FILENAME, json_filename)
-        subprocess.run(args=cmd, shell=True, stdout=subprocess.DEVNULL, check=True)
-    except subprocess.CalledProcessError as e:
+        cmd = "{}docker cp {}:{}/done {}".format(
+            __sudo_right, container_id, settings.WORKER_QUEUE_DIRECTORY,
+            directory)
+        subprocess.run(args=cmd, shell=True, stdout=subprocess.DEVNULL,
+                       check=True)
+    except subprocess.CalledProcessError:
+        set_prompt_color("Red")
+        print("The results of the worker were not retrieved")
+    else:
+        set_prompt_color("Green")
+        print("Results successfully retrieved!")
+    set_prompt_color()
+
+
+def retrieve_spool(container_id):
+    """Copy the spool of the container, where all its results are stored,
+    into the spool directory. The results the TuxML API did not accept
+    can then be sent again with ``--replay-spool``. The tables decoding
+    their configurations are copied into its ``config_codecs``\
+    subdirectory.
+
+    :param container_id: id of the container
+    :type container_id: str
+    """
+    os.makedirs(__SPOOL_DIRECTORY, exist_ok=True)
+    cmd = "{}docker cp {}:{} {}/{}.db".format(
+        __sudo_right, container_id, settings.SPOOL_FILE, __SPOOL_DIRECTORY,
+        container_id)
+    subprocess.run(args=cmd, shell=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    cmd = "{}docker cp {}:{}/. {}/config_codecs".format(
+        __sudo_right, container_id, settings.CONFIG_CODEC_DIRECTORY,
+        __SPOOL_DIRECTORY)
+    subprocess.run(args=cmd, shell=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+
+
+def replay_spool(jobs, api_address=None, uncertain=False):
+    """Send again to the TuxML API the results it did not accept, from the
+    spools of the spool directory. The results are sent by batch, with at
+    most ``jobs`` requests at the same time.
+
+    :param jobs: maximum number of requests sent at the same time
+    :type jobs: int
+    :param api_address: address of the TuxML API. Default to None, which\
+    means the default one.
+    :type api_address: str
+    :param uncertain: send again the results the API may have stored too\
+    (See `ResultSpool <result_spool.html>`_)
+    :type uncertain: bool
+    :return: number of results still pending
+    :rtype: int
+    """
+    # Imported here: only replaying needs requests on the host
+    from compilation.apiManager import APIManager, send_records
+
+    local = threading.local()
+
+    def send_chunk(spool, chunk):
+        if not hasattr(local, "api_manager"):
+            local.api_manager = APIManager()
+            if api_address is not None:
+                local.api_manager.setAddress(api_address)
+        cids = send_records(local.api_manager,
+                            [record for _, record in chunk],
+                            os.path.join(__SPOOL_DIRECTORY, "config_codecs"))
+        for (rid, _), cid in zip(chunk, cids):
+            if cid:
+                spool.mark_sent(rid, cid)
+        return len([cid for cid in cids if cid > 0])
+
+    spools = [ResultSpool(path) for path in sorted(
+        glob.glob(os.path.join(__SPOOL_DIRECTORY, "*.db")))]
+    chunks = list()
+    for spool in spools:
+        pending = spool.pending()
+        if uncertain:
+            pending += spool.uncertain()
+        for i in range(0, len(pending), settings.UPLOAD_BATCH_SIZE):
+            chunks.append((spool, pending[i:i + settings.UPLOAD_BATCH_SIZE]))
+    nbpending = sum(len(chunk) for _, chunk in chunks)
+
+    set_prompt_color("Light_Blue")
+    print("Sending {} pending result(s) from {} spool(s)...".format(
+        nbpending, len(spools)))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        nbsent = sum(executor.map(lambda item: send_chunk(*item), chunks))
+    remaining = sum(spool.count_pending() for spool in spools)
+    nbuncertain = sum(spool.count_uncertain() for spool in spools)
+    for spool in spools:
+        spool.close()
+
+    if remaining or nbuncertain:
         set_prompt_color("Red")
-        print("JSON file was not created locally")
     else:
         set_prompt_color("Green")
-        print("JSON successfully retrieved!")
+    print("{} result(s) sent, {} still pending, {} maybe stored by the API "
+          "(sent again with --replay-uncertain).".format(
+              nbsent, remaining, nbuncertain))
+    set_prompt_color()
+    return remaining
 
 
 if __name__ == "__main__":
     args = parser()
     check_precondition_and_warning(args)
 
+    if args.replay_spool:
+        replay_spool(args.replay_jobs, args.api_address,
+                     args.replay_uncertain)
+        sys.exit(0)
+
     # Set the image tag to use.
     if args.dev:
         tag = "dev"
@@ -1086,13 +1752,19 @@ if __name__ == "__main__":
         set_prompt_color()
         docker_uncompress_image(tag)
 
+    if args.shared_sources is not None:
+        args.shared_source_path = prepare_shared_sources(
+            args.shared_sources, args.linux_version)
     if args.linux_version != __DEFAULT_V4:
-        tag = docker_build_version_image(tag, args.linux_version)
+        tag = docker_build_version_image(tag, args.linux_version,
+                                         args.shared_sources is not None)
 
     # Setting image name to run (useful later with linux_version)
     image = "{}:{}".format(__IMAGE, tag)
 
     if args.unit_testing:
         run_unit_testing(image)
+    elif args.benchmark:
+        run_benchmark(image, args)
     else:
         compilation(image, args)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import subprocess
 import re
 import MySQLdb
@@ -11,6 +12,14 @@ sys.path.append('..')
 from core import tuxml_settings as tset
 import flash_compare
 
+# Names of the compressed sizes, in the order of the columns (see
+# compilation/size_schema.py)
+COMPRESSED_SIZE_COLUMNS = [
+    compression + typ
+    for compression in ["GZIP", "BZIP2", "LZMA", "XZ", "LZO", "LZ4"]
+    for typ in ["-bzImage", "-vmlinux", ""]
+]
+
 # Class kernel to compare two of them
 
 
@@ -34,6 +43,14 @@ class kernel:
         final = list([self.entry[0]] + [str(self.entry[1])] +
                      [str(self.entry[2])] + [self.entry[7]])
 
+        # Typed compressed sizes (compilation/size_schema.py), stored as a
+        # JSON object
+        if str(self.entry[8]).lstrip().startswith("{"):
+            record = json.loads(self.entry[8])
+            final += [str(record.get(column, -1))
+                      for column in COMPRESSED_SIZE_COLUMNS]
+            return final
+
         compressed = self.entry[8].split(" , ")
         parse_array = []
         cprss = []
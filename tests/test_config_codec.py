@@ -0,0 +1,72 @@
+from pytest import raises
+from unittest import TestCase  #Usefull when testing classes
+import pytest
+
+import compilation.config_codec as config_codec
+import compilation.config_generator as config_generator
+
+__SYMBOLS = ["MODULES", "A", "B", "NR_CPUS", "CMDLINE", "KERNEL_GZIP"]
+__BASELINE = {"MODULES": "n", "A": "n", "NR_CPUS": "1", "CMDLINE": '""',
+              "KERNEL_GZIP": "y"}
+__CONFIG = """#
+# Automatically generated file; DO NOT EDIT.
+#
+CONFIG_MODULES=y
+CONFIG_A=y
+CONFIG_B=m
+CONFIG_NR_CPUS=64
+CONFIG_CMDLINE=""
+# CONFIG_KERNEL_GZIP is not set
+CONFIG_UNKNOWN=y
+"""
+
+
+def __codec():
+    return config_codec.ConfigCodec("4.13.3", __SYMBOLS, __BASELINE)
+
+
+@pytest.mark.parametrize("codec", config_codec.CONFIG_CODECS)
+def test_round_trip(codec):
+    encoded = __codec().encode(__CONFIG, codec)
+    assert encoded.startswith("{}:4.13.3:".format(codec))
+    decoded = __codec().decode(encoded)
+    assert config_codec.parse_config(decoded) \
+        == config_codec.parse_config(__CONFIG)
+    assert list(config_codec.parse_config(decoded)) \
+        == list(config_codec.parse_config(__CONFIG))
+
+
+def test_decode_with_saved_table(tmp_path):
+    encoded = __codec().encode(__CONFIG)
+    __codec().save(str(tmp_path))
+    assert config_codec.decode_config(encoded, str(tmp_path)) \
+        == config_codec.format_config(config_codec.parse_config(__CONFIG))
+    other = config_codec.ConfigCodec("4.13.3", __SYMBOLS, {})
+    with raises(ValueError):
+        other.decode(encoded)
+
+
+@pytest.mark.skipif(config_generator.kconfiglib is None,
+                    reason="kconfiglib is needed")
+def test_get_config_codec(tmp_path):
+    (tmp_path / "Kconfig").write_text(
+        "config A\n\tbool \"A\"\nconfig B\n\ttristate \"B\"\n\tdepends on A\n")
+    codec = config_codec.get_config_codec(
+        str(tmp_path), "4.13.3", directory=str(tmp_path / "codecs"))
+    config = "CONFIG_A=y\n# CONFIG_B is not set\n"
+    assert codec.decode(codec.encode(config)) == config
+    assert (tmp_path / "codecs" / "4.13.3-{}.json".format(
+        codec.get_digest())).exists()
+
+
+def test_recode_record(tmp_path):
+    __codec().save(str(tmp_path))
+    record = {'config_file': __codec().encode(__CONFIG),
+              'config_encoding': "bitset"}
+    plain = config_codec.recode_record(record, None, str(tmp_path))
+    assert 'config_encoding' not in plain
+    assert plain['config_file'] \
+        == config_codec.format_config(config_codec.parse_config(__CONFIG))
+    diff = config_codec.recode_record(record, "diff", str(tmp_path))
+    assert diff['config_file'].startswith("diff:")
+    assert config_codec.recode_record(plain, "diff", str(tmp_path)) is plain
@@ -0,0 +1,64 @@
+from pytest import raises
+from unittest import TestCase  #Usefull when testing classes
+import pytest
+
+import compilation.config_generator as config_generator
+
+needs_kconfiglib = pytest.mark.skipif(
+    config_generator.kconfiglib is None, reason="kconfiglib is needed")
+
+__KCONFIG = """
+config MODULES
+	bool "modules"
+	option modules
+config A
+	bool "A"
+config B
+	tristate "B"
+	depends on A
+choice
+	prompt "compression"
+config KERNEL_GZIP
+	bool "gzip"
+config KERNEL_XZ
+	bool "xz"
+	depends on A
+endchoice
+"""
+
+
+def __generator(path):
+    (path / "Kconfig").write_text(__KCONFIG)
+    return config_generator.ConfigGenerator(str(path))
+
+
+@needs_kconfiglib
+def test_generate_is_reproducible(tmp_path):
+    generator = __generator(tmp_path)
+    seed = generator.generate(str(tmp_path / "first.config"))
+    generator.generate(str(tmp_path / "other.config"))
+    assert generator.generate(str(tmp_path / "again.config"), seed=seed) \
+        == seed
+    assert (tmp_path / "first.config").read_text() \
+        == (tmp_path / "again.config").read_text()
+
+
+@needs_kconfiglib
+def test_generate_keeps_preset(tmp_path):
+    generator = __generator(tmp_path)
+    (tmp_path / "preset.config").write_text("# CONFIG_A is not set\n")
+    for seed in range(20):
+        generator.generate(str(tmp_path / ".config"),
+                           str(tmp_path / "preset.config"), seed)
+        config = (tmp_path / ".config").read_text()
+        assert "# CONFIG_A is not set" in config
+        # B and KERNEL_XZ depend on A
+        assert "CONFIG_B=" not in config
+        assert "CONFIG_KERNEL_XZ=y" not in config
+
+
+def test_source_architecture():
+    environment = config_generator.get_kconfig_environment(
+        "/linux", "x86_64", "true")
+    assert environment["SRCARCH"] == "x86"
+    assert environment["srctree"] == "/linux"
@@ -0,0 +1,49 @@
+from pytest import raises
+from unittest import TestCase  #Usefull when testing classes
+import argparse
+import os
+
+import compilation.main as main
+
+
+class __Logger:
+    def timed_print_output(self, *args, **kwargs):
+        pass
+
+    def reset_output_pipe(self):
+        pass
+
+
+def test_worker_keeps_the_logs_of_each_job(tmp_path, monkeypatch):
+    log_directory = tmp_path / "logs"
+    log_directory.mkdir()
+    archives = list()
+
+    # what run does with the logs when they are not all sent
+    def run(*args, **kwargs):
+        job = os.path.basename(kwargs['json_filename'])
+        (log_directory / "stdout.log").write_text(job)
+        main.archive_log(kwargs['log_archive_name'], str(log_directory))
+        archives.append(kwargs['log_archive_name'])
+
+    monkeypatch.setattr(main, "run", run)
+    main.add_worker_jobs(str(tmp_path / "queue"), 2)
+    args = argparse.Namespace(
+        worker=str(tmp_path / "queue"), worker_jobs=0, worker_parallel=1,
+        worker_timeout=0, output_directory=str(tmp_path / "build"),
+        boot=False, check_size=False, clang_version=0, tagbuild=None,
+        arch="x86_64", ccache=False, log_retention="tail",
+        log_tail_lines=200)
+    assert main.run_worker(args, __Logger(), {'kernel_path': "/linux"}, {},
+                           None, None) == 2
+
+    assert len(set(archives)) == 2
+    for archive in archives:
+        assert (log_directory / archive / "stdout.log").read_text() \
+            == "{}.result.json".format(archive[len("build_"):])
+
+
+def test_worker_rejects_incremental(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["main.py", "1", "--worker", "queue"])
+    with raises(NotImplementedError):
+        main.parser()
@@ -0,0 +1,57 @@
+from pytest import raises
+from unittest import TestCase  #Usefull when testing classes
+import shutil
+import subprocess
+
+import pytest
+
+import compilation.size_report as size_report
+
+needs_toolchain = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ["gcc", "ar", "size"]),
+    reason="gcc, ar and size are needed")
+
+
+def __build_tree(path):
+    (path / "kernel" / "sub").mkdir(parents=True)
+    (path / "mm").mkdir()
+    (path / "kernel" / "x.c").write_text(
+        "int a=1; int b[100]; const char s[]=\"hi\"; int f(){return a+b[2];}")
+    (path / "kernel" / "sub" / "y.c").write_text(
+        "static int z[50]; int g(int i){return z[i]++;}")
+    (path / "mm" / "m.c").write_text("int h(){return 3;}")
+    for source in ["kernel/x", "kernel/sub/y", "mm/m"]:
+        subprocess.run(["gcc", "-O2", "-c", "{}.c".format(source),
+                        "-o", "{}.o".format(source)], cwd=path, check=True)
+    # thin archives, as built by Linux, and a regular one
+    subprocess.run(["ar", "cDPrST", "built-in.a", "y.o"],
+                   cwd=path / "kernel" / "sub", check=True)
+    subprocess.run(["ar", "cDPrST", "built-in.a", "x.o", "sub/built-in.a"],
+                   cwd=path / "kernel", check=True)
+    subprocess.run(["ar", "cr", "built-in.a", "m.o"], cwd=path / "mm",
+                   check=True)
+
+
+def __size_totals(path):
+    totals = subprocess.run(["size", "-t", str(path)], check=True,
+                            stdout=subprocess.PIPE).stdout.decode()
+    return [int(size) for size in totals.splitlines()[-1].split()[:3]]
+
+
+@needs_toolchain
+def test_get_size_report_same_sizes_as_size(tmp_path):
+    __build_tree(tmp_path)
+    report = size_report.get_size_report(str(tmp_path))
+    assert list(report['subsystems']) == ["kernel", "mm"]
+    for subsystem, sizes in report['subsystems'].items():
+        assert [sizes['text'], sizes['data'], sizes['bss']] == \
+            __size_totals(tmp_path / subsystem / "built-in.a")
+    assert len(report['subsystems']['kernel']['objects']) == 2
+    assert report['vmlinux'] is None
+
+
+def test_get_size_report_without_build(tmp_path):
+    report = size_report.get_size_report(str(tmp_path))
+    assert report['subsystems'] == {}
+    assert report['symvers_lines'] == -1
+    assert size_report.format_size_vmlinux(report, str(tmp_path)) == ""
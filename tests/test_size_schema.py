@@ -0,0 +1,30 @@
+from pytest import raises
+from unittest import TestCase  #Usefull when testing classes
+
+import compilation.size_schema as size_schema
+
+
+def test_compressed_sizes_record_unknown_sizes():
+    record = size_schema.compressed_sizes_record()
+    assert list(record) == size_schema.COMPRESSED_SIZE_COLUMNS
+    assert set(record.values()) == {-1}
+
+
+def test_format_and_parse_compressed_sizes():
+    record = size_schema.compressed_sizes_record({"GZIP": (10, 20, 30)})
+    text = size_schema.format_compressed_sizes(record)
+    assert text.startswith("GZIP-bzImage : 10 , GZIP-vmlinux : 20 , GZIP : 30")
+    assert size_schema.parse_compressed_sizes(text) == record
+
+
+def test_sizes_record():
+    report = {
+        'vmlinux': {'text': 1, 'data': 2, 'bss': 3, 'sections': {}},
+        'subsystems': {'arch/x86': {'text': 4, 'data': 5, 'bss': 6,
+                                    'objects': [["a.o", 4, 5, 6]]}}
+    }
+    record = size_schema.sizes_record(report)
+    assert record['vmlinux-text'] == 1
+    assert record['arch/x86-bss'] == 6
+    assert record['arch/x86-objects'] == 1
+    assert size_schema.sizes_record(None) == {}